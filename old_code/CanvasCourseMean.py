@@ -5,115 +5,72 @@
 __author__ = "Leo Shen, Dhruba Paul"
 __copyright__ = "Copyright 2022, Canvas Course Mean Project"
 
+# Only what the login window needs is imported here: pandas/pandastable (results display), numpy/lxml (grade
+# computation), requests (Canvas API) and the Chrome webdriver are imported where they are first used,
+# so that the login window shows up right away (see benchmark.py startup)
+import argparse
+import sqlite3
+import subprocess
 import time
+from concurrent.futures import ThreadPoolExecutor
 from threading import Thread
-from tkinter import ttk
-from tkinter.ttk import Progressbar
-import pandas as pd
-from pandastable import Table
 from tkinter import *
-from selenium import webdriver
-from selenium.common.exceptions import WebDriverException, NoSuchElementException
+from selenium.common.exceptions import TimeoutException, WebDriverException
 from selenium.webdriver import Keys
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as ec
-from bs4 import BeautifulSoup
-from selenium.webdriver.chrome.service import Service as ChromeService
-from subprocess import CREATE_NO_WINDOW  # This flag will only be available in windows
-
-# Global Variables
-COURSE_DF = pd.DataFrame()  # Empty Dataframe
-
-
-def clear_COURSE_DF():
+from browser_wait import (BackoffWait, LoginOutcome, login_form, course_list_links, LOGIN_FORM_TIMEOUT,
+                          LOGIN_OUTCOME_TIMEOUT, COURSE_LIST_TIMEOUT, BAD_PASSWORD, DUO_TIMED_OUT, DUO_DENIED,
+                          LOGGED_IN)
+from grade_cache import GradeCache
+from grade_history import GradeHistory
+from refresh_scheduler import COURSE_ADDED, DEFAULT_INTERVAL, RefreshScheduler, api_courses
+from results_view import ResultsView
+from session_store import SessionStore, resume_session
+from pipeline import COMPUTE_WORKERS
+import tracing
+
+# Messages shown for the login outcomes other than LOGGED_IN (None: no outcome before the deadline)
+LOGIN_ERRORS = {BAD_PASSWORD: "Login Failed. Username or password incorrect",
+                DUO_TIMED_OUT: "Login Timed Out. Try again!",
+                DUO_DENIED: "Login request denied. User must accept login request!",
+                None: "Login did not complete in time. Try again!"}
+
+def start_driver():
     """
-    Empties the Course dataframe
+    Starts the webdriver in headless mode and loads the Canvas login page (run in the background while the
+    user types their credentials)
 
-    :return: None
+    :return: selenium webdriver
     """
-    global COURSE_DF
-    COURSE_DF = pd.DataFrame()  # Empty Dataframe
-
-
-# Checking if the argument is a float value
-def is_number(s):
+    from selenium import webdriver
+    from selenium.webdriver.chrome.options import Options
+    from selenium.webdriver.chrome.service import Service as ChromeService
+
+    with tracing.span("browser start"):
+        options = Options()
+        options.headless = True
+        # options.add_experimental_option('excludeSwitches', ['enable-logging'])  # Gets rid of Dev Tool Message
+        chrome_service = ChromeService('chromedriver')  # To get rid of terminal window
+        chrome_service.creationflags = getattr(subprocess, "CREATE_NO_WINDOW", 0)  # only available in windows
+        dvr = webdriver.Chrome(options=options, service=chrome_service)
+        dvr.get("https://canvas.wisc.edu/")
+    return dvr
+
+
+def quit_driver(driver_future):
     """
     Helper Method.
-    Checks if the string argument is a number or not
+    Quits the webdriver once it has started (nothing to quit if it could not start)
 
-    :param s: a string
-    :return: True if it is a number, false otherwise
+    :param driver_future: Future of the selenium webdriver (see start_driver)
+    :return: None
     """
     try:
-        float(s)
-        return True
-    except ValueError:
-        return False
-
-
-# Finding the groups, total scores, and average scores of ALL ASSIGNMENTS ##########################################
-def start_with_illegal_val(tr_ID):
-    """
-    Helper Method.
-    checking if the tr_ID starts with one of the illegal expression
-
-    :param tr_ID: the ID of the tr tag
-    :return: True if the tr ID starts with an illegal expression, false otherwise
-    """
-    illegal_expressions = ['submission_group', "submission_final-grade", 'grade_info_final', 'grade_info_group']
-    for f in illegal_expressions:
-        if tr_ID.startswith(f):
-            return True
-    return False
+        driver_future.result().quit()
+    except (WebDriverException, OSError):
+        pass
 
 
-# Calculating course mean and student grade with pandas dataframe
-def calculate_grade(group_list, mean_list, total_list, dropped_list, student_score_list, group_weights):
-    """
-    Helper Method.
-    Calculates course average grade, and student grade with a pandas dataframe
-
-    :param group_list: list of all the assignment groups within a course
-    :param mean_list: list of average scores for all assignments
-    :param total_list: list of total scores for all assignments
-    :param dropped_list: boolean list indicating whether an assignment has been dropped or not
-    :param student_score_list: list of student scores achieved on all assignments
-    :param group_weights: dictionary with assignment groups and their corresponding weights
-    :return: A tuple (course avg. grade, student grade)
-    """
-    global COURSE_DF
-    df = pd.DataFrame()
-    df["groups"] = group_list
-    df["mean_sum"] = mean_list
-    df["student_score_sum"] = student_score_list
-    df["total_sum"] = total_list
-    df["dropped"] = dropped_list
-
-    # Counting number of dropped courses per group
-    dropped_count = df[["groups", "dropped"]]
-    dropped_count = dropped_count.groupby("groups").sum()
-
-    df = df[df["dropped"] == False]  # dropping rows with dropped assignments
-    df = df.astype({'mean_sum': 'float', 'total_sum': 'float', 'student_score_sum': 'float'})  # type conversion
-    df = df.groupby("groups").sum()  # getting mean_sum and total_sum
-    df["dropped"] = dropped_count  # getting count for the number of assignments dropped
-
-    df = df.reset_index()  # resetting index to use the groups values
-    df["weights"] = df["groups"].apply(lambda x: group_weights[x])  # Fetching weights
-    df = df.astype({'weights': 'float'})  # type conversion
-    # weighted percentages (class average)
-    df["weighted_percentage (course avg)"] = df["mean_sum"] / df["total_sum"] * df["weights"]
-    # weighted percentages (student score)
-    df["student_weighted_percentage (student grade)"] = df["student_score_sum"] / df["total_sum"] * df["weights"]
-    print(df.to_string())
-    COURSE_DF = df
-
-    return df["weighted_percentage (course avg)"].sum(), df["student_weighted_percentage (student grade)"].sum()
-
-
-def login_canvas(dvr, root, label_obj, net_id, password):
+def login_canvas(driver_future, root, label_obj, net_id, password, session_store=None, watch_interval=DEFAULT_INTERVAL):
     """
     Logs into the students canvas account.
 
@@ -122,13 +79,13 @@ def login_canvas(dvr, root, label_obj, net_id, password):
 
     :param password: Password for the student to login
     :param net_id: The user_ID required for the login
-    :param dvr: selenium webdriver object
+    :param driver_future: Future of the selenium webdriver object (see start_driver)
     :param root: tkinter window object
     :param label_obj: a label object
+    :param session_store: SessionStore the session cookies are saved to after the login (None to not save them)
+    :param watch_interval: seconds between two checks of the courses when watching them for changes
     :return: True if login is successful, false otherwise
     """
-    dvr.get("https://canvas.wisc.edu/")
-
     # Clearing message when new login attempt starts
     label_obj["text"] = ""
     root.update()
@@ -139,160 +96,66 @@ def login_canvas(dvr, root, label_obj, net_id, password):
         label_obj["fg"] = "red"
         return False
 
-    # Logging in (polling)
-    while True:
+    # Waiting for the browser started in the background (usually ready by the time the user has typed)
+    if not driver_future.done():
+        label_obj["text"] = "Starting browser..."
+        label_obj["fg"] = "blue"
+        root.update()
+    try:
+        dvr = driver_future.result()
+    except (WebDriverException, OSError) as e:
+        label_obj["text"] = f"Could not start the browser: {e}"
+        label_obj["fg"] = "red"
+        return False
+    dvr.get("https://canvas.wisc.edu/")
+
+    # Logging in (as soon as the login form has loaded)
+    with tracing.span("login"):
         try:
-            dvr.find_element(by="tag name", value="input").send_keys(net_id)
-            dvr.find_element(by="name", value="j_password").send_keys(password, Keys.RETURN)
-            break
-        except WebDriverException:
-            time.sleep(0.2)
+            input_net_id, input_password = BackoffWait(dvr, LOGIN_FORM_TIMEOUT).until(login_form)
+        except TimeoutException:
+            label_obj["text"] = "Canvas login page did not load. Try again!"
+            label_obj["fg"] = "red"
+            return False
+        input_net_id.send_keys(net_id)
+        input_password.send_keys(password, Keys.RETURN)
 
     # Notifying user to authenticate login (on DUO)
     label_obj["text"] = "Notification pushed to user's device. Waiting for user authentication..."
     label_obj["fg"] = "blue"
     root.update()
 
-    while True:
+    # Waiting for whichever comes first: wrong password, Duo timed out or denied, or the dashboard
+    with tracing.span("duo") as duo_span:
         try:
-            # Checking if password is incorrect
-            try:
-                dvr.find_element(by="tag name", value="strong")
-                label_obj["text"] = "Login Failed. Username or password incorrect"
-                label_obj["fg"] = "red"
-                return False
-            except NoSuchElementException:
-                pass
-
-            # Checking if Login has timed out or if login request is denied
-            try:
-                # switching to iframe
-                iframe = dvr.find_element(by="id", value="duo_iframe")  # iframe
-                dvr.switch_to.frame(iframe)  # switching to DOM under "#document"
-
-                # Explicit polling until the iframe DOM fully loads (waiting to a maximum of 10 secs)
-                elem = WebDriverWait(driver, 10).until(
-                    ec.presence_of_element_located((By.CSS_SELECTOR, "#messages-view > div > div > div > span"))
-                )
-
-                if elem.text == "Login timed out.":
-                    label_obj["text"] = "Login Timed Out. Try again!"
-                    label_obj["fg"] = "red"
-                    return False
-
-                if elem.text == "Login request denied.":
-                    label_obj["text"] = "Login request denied. User must accept login request!"
-                    label_obj["fg"] = "red"
-                    return False
-            except NoSuchElementException:
-                pass
-            finally:
-                dvr.switch_to.parent_frame()
-
-            # Checking if the dashboard has loaded yet
-            dvr.find_element(by="id", value="dashboard_header_container")
-            root.destroy()  # Closing the login window when user is successfully logged in
-            course_selection_gui(driver)  # prompts user for course url to compute course avg
-            return True
-        except WebDriverException:
-            # time.sleep(10)
-            time.sleep(0.2)
-
-
-def scrape_and_calculate(html):
-    """
-    Scrapes the "grade" page of the course, and uses the information to computer the course avg and student grades.
+            outcome = BackoffWait(dvr, LOGIN_OUTCOME_TIMEOUT).until(LoginOutcome())
+        except TimeoutException:
+            outcome = None
+        duo_span.set(outcome=outcome)
 
-    :param html: The html code that is to be scraped with BeautifulSoup
-    :return: A Tuple --> (True if scraping is successful, false other), (a string with useful information for the user)
-    """
-    soup = BeautifulSoup(html, features="lxml")
-
-    # Adding course name to return string
-    course_name = soup.find(id='breadcrumbs').find_all("span")[2].text
-    print(course_name)
-    return_str = course_name + "\n"
-
-    # Getting the weights
-    try:
-        # Creating a dictionary of groups corresponding to the weights
-        unweighted_assignments = soup.find(id="assignments-not-weighted")
-        unweighted_assignments_tbody = unweighted_assignments.find("tbody")
-        groups = [tag.text for tag in unweighted_assignments_tbody.find_all("th")]
-        weights = [tag.text[:-1] for tag in unweighted_assignments.find_all("td")]
-        group_weights = dict(zip(groups, weights))
-    except AttributeError:
-        print("Class has no weights")
-        return_str = return_str + "Class has no weights\n"
-        return return_str
-
-    # The "tr" tags represent assignment label (assignment group), grade info (has mean and total scores),
-    # or grader comments (we don't need)
-    grade_summary = soup.find(id="grades_summary").find("tbody")
-    tr_lst = grade_summary.find_all("tr")
-    mean_list = []
-    student_score_list = []
-    total_list = []
-    group_list = []
-    dropped_list = []
-
-    # Looping over all the tr tags
-    for tr in tr_lst:
-        tr_id_val = tr.get("id", -1)
-        tr_class_val = tr.get("class", "")
-
-        # Skipping elements without ids
-        if tr_id_val == -1:
-            continue
-
-        # Get student's own grade from Canvas
-        if tr_id_val.startswith('submission_final-grade'):
-            student_grade = tr.find_all("span")[2].text.strip()
-            print("Your Grade on Canvas: " + student_grade)
-            return_str = return_str + "Your Grade on Canvas: " + student_grade + "\n"
-
-        # Skips if the tr ID start with an illegal expression
-        if start_with_illegal_val(tr_id_val):
-            continue
-
-        # Adding groups and total scores and "dropped boolean" values to their respective lists
-        if tr_id_val.startswith("submission"):
-            total_list.append(tr.find_all("td")[-2].text.strip())  # total
-            group_list.append(tr.find("div").text)  # group
-            student_score_string = tr.find_all("td")[-3].text.split()[-5]
-            student_score_list.append(student_score_string if is_number(student_score_string) else 0.0)  # student score
-
-            # grade info has attribute if assignment is dropped
-            grade_info = tr.find("td", {"class": "details"}).find("a").attrs.get("aria-expanded", -1)
-            dropped_list.append("dropped" in tr_class_val or "excused" in tr_class_val or grade_info != -1)  # dropped
-            continue
-
-        # Adding mean to its respective lists
-        if tr_id_val.startswith("grade_info"):
-            try:
-                # throws exception when assignment is ungraded
-                mean_string = tr.find("tbody").find("td").text
-                mean_list.append(mean_string.split(":")[-1].strip())  # Mean
-            except AttributeError:
-                mean_list.append(0)
-
-    # Calculating course mean and student grade with pandas dataframe
-    course_avg, student_grade = calculate_grade(group_list, mean_list, total_list,
-                                                dropped_list, student_score_list, group_weights)
+    if outcome != LOGGED_IN:
+        label_obj["text"] = LOGIN_ERRORS[outcome]
+        label_obj["fg"] = "red"
+        return False
 
-    print('Course Average: ' + str(course_avg))
-    print('Student Grade: ' + str(student_grade))
-    print()
-    return_str = return_str + 'Course Average: ' + str(course_avg) + "\n" \
-                            + 'Student Grade: ' + str(student_grade) + "\n"
-    return return_str
+    if session_store is not None:
+        from canvas_api import CANVAS_URL
+        try:
+            session_store.save(dvr.get_cookies(), CANVAS_URL)  # next launch skips the login while the session is valid
+        except Exception as e:  # not saving it only costs a login next time
+            print(f"Could not save the session: {e}")
+    root.destroy()  # Closing the login window when user is successfully logged in
+    course_selection_gui(dvr, watch_interval=watch_interval)  # prompts user for course url to compute course avg
+    return True
 
 
-def login_gui(dvr):
+def login_gui(driver_future, session_store=None, watch_interval=DEFAULT_INTERVAL):
     """
     GUI. Allows the user to log into their canvas account.
 
-    :param dvr: selenium webdriver
+    :param driver_future: Future of the selenium webdriver (see start_driver)
+    :param session_store: SessionStore the session cookies are saved to after the login (None to not save them)
+    :param watch_interval: seconds between two checks of the courses when watching them for changes
     :return: None
     """
     # root window
@@ -324,19 +187,39 @@ def login_gui(dvr):
 
     # Button
     b1 = Button(button_frame, text='login',
-                command=lambda: login_canvas(dvr, root, error_msg, entry_net_id.get(), entry_password.get()))
+                command=lambda: login_canvas(driver_future, root, error_msg, entry_net_id.get(), entry_password.get(),
+                                             session_store, watch_interval))
     b1.grid(column=1)
 
     root.mainloop()
 
 
-def course_selection_gui(dvr):
+def course_selection_gui(dvr, cookies=None, watch_interval=DEFAULT_INTERVAL):
     """
     Allows the user to pick courses for which they want to compute the course average and their own grade
 
-    :param dvr: selenium webdriver
+    :param dvr: selenium webdriver (logged in), None when resuming a saved session
+    :param cookies: cookies of a resumed session (used when dvr is None)
+    :param watch_interval: seconds between two checks of the courses when watching them for changes
     :return: None
     """
+    # Everything after the login goes over the Canvas API, reusing the browser's session cookies
+    # (unchanged courses are served from the on-disk cache). Every computed course is added to the grade history.
+    from canvas_api import CanvasAPI
+    cache = GradeCache()
+    history = GradeHistory()
+    api = CanvasAPI(cookies=cookies, cache=cache) if dvr is None else CanvasAPI.from_driver(dvr, cache=cache)
+    pool = None
+    if dvr is not None and api.is_authenticated() is False:
+        # API not open to the session: grades pages are loaded by a pool of browsers instead, started once for
+        # every "All Active Courses" run
+        from driver_pool import DriverPool
+        api = None
+        try:
+            pool = DriverPool(cookies=dvr.get_cookies())
+        except (WebDriverException, OSError) as e:
+            print(f"Could not start the browsers: {e}")  # every run tries again
+
     # root window
     root = Tk()
     root.resizable(False, False)
@@ -361,174 +244,268 @@ def course_selection_gui(dvr):
 
     # Button 1 (show for all active course)
     b1 = Button(button_frame, text='All Active Courses',
-                command=lambda: Thread(target=get_all_active_courses, args=(dvr, root)).start())
+                command=lambda: Thread(target=get_all_active_courses,
+                                       args=(dvr, ResultsView(root), api, history, None, pool)).start())
     b1.grid(row=0, column=0, padx=(10, 10), pady=(10, 10))
 
     # Button 2 (show for the URL page)
     b2 = Button(button_frame, text='Compute from URL',
                 command=lambda: Thread(target=get_from_url,
-                                       args=(dvr, entry_class_url.get() + "/grades", root)).start())
+                                       args=(dvr, entry_class_url.get() + "/grades", ResultsView(root), api,
+                                             history)).start())
     b2.grid(row=0, column=1, padx=(10, 10), pady=(10, 10))
 
+    # Button 3 (checks all active courses on an interval, showing what changed; needs the API)
+    b3 = Button(button_frame, text='Watch for Changes', state=NORMAL if api is not None else DISABLED,
+                command=lambda: Thread(target=watch_courses,
+                                       args=(api, ResultsView(root, 'Course Changes'), history, watch_interval),
+                                       daemon=True).start())
+    b3.grid(row=0, column=2, padx=(10, 10), pady=(10, 10))
+
     root.mainloop()
+    if api is not None:
+        api.close()
+    if pool is not None:
+        pool.close()
+    cache.close()
+    history.close()
 
 
-def get_all_active_courses(dvr, crs_select_root):
+def compute_page(html):
+    """
+    Helper Method.
+    Parses a grades page and computes its course (compute stage of get_all_active_courses)
+
+    :param html: The html code of the grades page
+    :return: A tuple (CourseGrades, CourseResult)
+    """
+    from grade_calc import calculate_course, scrape_course
+    grades = scrape_course(html)
+    return grades, calculate_course(grades)
+
+
+def get_all_active_courses(dvr, view, api=None, history=None, max_workers=None, pool=None):
     """
     Scrapes the list of all active courses in the student's canvas account, and shows the course average as well as the
-    student grade for each of those courses.
+    student grade for each of those courses. Runs on a worker thread: every course is handed to the results window
+    as soon as it is computed.
+
+    Fetching, parsing/computing and rendering overlap (see pipeline.Pipeline): page N + 1 is loaded while page N is
+    parsed and computed and the results window renders page N - 1. Bounded queues between the stages keep only a
+    few pages in memory, and every page is released once parsed.
 
-    :param crs_select_root: Window for the course selection (for providing progress feedback to user)
     :param dvr: Selenium Webdriver object
+    :param view: ResultsView the results are shown in (created on the main loop)
+    :param api: CanvasAPI object. Courses are fetched as JSON when given, otherwise pages are rendered by a pool of
+                webdrivers logged in with the cookies of dvr
+    :param history: GradeHistory every computed course is recorded in (not recorded if None)
+    :param max_workers: maximum number of courses fetched at the same time (defaults to MAX_CONCURRENT_FETCHES
+                        requests with the API, DEFAULT_POOL_SIZE browsers otherwise)
+    :param pool: DriverPool the pages are loaded on without the API (started for this run, and quit after it, if
+                 None)
     :return: None
     """
-    # Providing feedback to user
-    feedback_frame = Frame(crs_select_root)
-    feedback_frame.pack(padx=(20, 20), pady=(20, 20))
-    progress_lvl = 0
-    label = Label(feedback_frame, text=f"Computing {progress_lvl}%", fg="blue")
-    label.pack(side=LEFT)
-    progress = Progressbar(feedback_frame, orient=HORIZONTAL, length=100, mode='determinate')
-    progress.pack(side=RIGHT)
+    from canvas_api import grade_stages
+    from driver_pool import DriverPool, DEFAULT_POOL_SIZE
+    from pipeline import Pipeline, Stage
 
     # Fetching all course links
-    dvr.get("https://canvas.wisc.edu/")
-    dvr.find_element(by="id", value="global_nav_courses_link").click()
-
-    anchor_tags = []
-    while len(anchor_tags) == 0:
+    with tracing.span("navigation"):
         try:
-            # Checking if the slider with the links for all active courses has loaded yet (polling)
-            xpath = dvr.find_element(by=By.XPATH, value="/html/body/div[3]/span/span/div/div/div/div/div/ul[1]")
-            anchor_tags = xpath.find_elements(by="tag name", value="a")
-        except WebDriverException:
-            time.sleep(0.2)
-
-    course_links = {tag.get_attribute("textContent"): tag.get_attribute("href") for tag in anchor_tags}
-
-    # Scrape and calculate (saving results)
-    results_lst = []
-    course_df_lst = []
-    for course in course_links:
-        # Loading Course
-        dvr.get(course_links[course] + "/grades")
-
-        # Scraping course, computing and saving result
-        result = scrape_and_calculate(dvr.page_source)
-        results_lst.append(result)
-        course_df_lst.append(COURSE_DF)
-        clear_COURSE_DF()  # Clearing result DF
-
-        # Updating progress bar and Label
-        progress_lvl += 100 / len(course_links)
-        label["text"] = f"Computing {progress_lvl}%"
-        progress["value"] = progress_lvl
-
-    # Creating tkinter window (GUI)
-    root = Toplevel()
-    root.title('Course Results')
-    root.resizable(True, True)
-
-    # Create A Main Frame
-    main_frame = Frame(root)
-    main_frame.pack(fill=BOTH, expand=1)
-
-    # Create A Canvas
-    my_canvas = Canvas(main_frame)
-    my_canvas.pack(side=LEFT, fill=BOTH, expand=1)
+            if api is not None:
+                course_links = api.get_active_courses()
+            else:
+                dvr.get("https://canvas.wisc.edu/")
+                dvr.find_element(by="id", value="global_nav_courses_link").click()
+
+                # Waiting for the slider with the links for all active courses
+                anchor_tags = BackoffWait(dvr, COURSE_LIST_TIMEOUT).until(course_list_links)
+                course_links = {tag.get_attribute("textContent"): tag.get_attribute("href") for tag in anchor_tags}
+        except TimeoutException:
+            view.fail("Could not load the list of courses. Try again!")
+            return
+        except Exception as e:  # network error, session rejected by Canvas, page without the courses menu...
+            view.fail(f"Could not load the list of courses: {e}")
+            return
+    view.set_total(len(course_links))
+
+    # Scrape and calculate (showing every course as soon as it is computed, in whatever order they complete)
+    if api is not None:
+        # Fetching the courses concurrently as JSON, computing each one as soon as it arrives
+        names = {course_id: course for course, course_id in course_links.items()}
+        show_courses(Pipeline(grade_stages(api, max_workers)).run(course_links.values()), names, view, history)
+    else:
+        # Loading the grades pages on a pool of browsers logged in with the same cookies, parsing and computing
+        # each one as soon as it is loaded
+        names = {course_links[course] + "/grades": course for course in course_links}
+        own_pool = pool is None
+        if own_pool:
+            try:
+                pool = DriverPool(max_workers or DEFAULT_POOL_SIZE, dvr.get_cookies())
+            except (WebDriverException, OSError) as e:
+                view.fail(f"Could not start the browsers: {e}")
+                return
+        try:
+            stages = [Stage("fetch", pool.fetch_page, len(pool.drivers)),
+                      Stage("compute", compute_page, COMPUTE_WORKERS)]
+            show_courses(Pipeline(stages).run(names), names, view, history)
+        finally:
+            if own_pool:
+                pool.close()
 
-    # Add A Scrollbar To The Canvas
-    my_scrollbar = ttk.Scrollbar(main_frame, orient=VERTICAL, command=my_canvas.yview)
-    my_scrollbar.pack(side=RIGHT, fill=Y)
+    view.finish()
 
-    # Configure The Canvas
-    my_canvas.configure(yscrollcommand=my_scrollbar.set)
-    my_canvas.bind('<Configure>', lambda e: my_canvas.configure(scrollregion=my_canvas.bbox("all")))
 
-    # Create ANOTHER Frame INSIDE the Canvas
-    second_frame = Frame(my_canvas)
+def show_courses(results, names, view, history=None):
+    """
+    Helper Method.
+    Records and shows the computed courses (render stage of get_all_active_courses: the results window renders
+    them on the main loop)
 
-    # Add that New frame To a Window In The Canvas
-    my_canvas.create_window((0, 0), window=second_frame, anchor="nw")
+    :param results: iterable of tuples (key of the course, (CourseGrades, CourseResult) or None, exception or None)
+    :param names: dictionary {key of the course: name of the course}
+    :param view: ResultsView the results are shown in
+    :param history: GradeHistory every computed course is recorded in (not recorded if None)
+    :return: None
+    """
+    for key, computed, error in results:
+        if error is None:
+            grades, result = computed
+            record_history(history, grades, result)
+            view.add_course(names[key], result.summary, result.table, grades)
+        else:
+            view.add_course(names[key], f"Could not fetch the course: {error}\n", None)
 
-    # Adding results for each course in GUI window
-    for i in range(len(results_lst)):
-        # Labels
-        Label(second_frame, text="", justify=LEFT).pack()
-        Label(second_frame, text=list(course_links.keys())[i], justify=LEFT, font='Helvetica 10 bold').pack()
-        Label(second_frame, text=results_lst[i], justify=LEFT).pack()
 
-        # Pandas Table
-        third_frame = Frame(second_frame)
-        third_frame.pack(fill="x", expand=True)
-        pt = Table(third_frame, dataframe=course_df_lst[i], height=(len(course_df_lst[i]) + 1) * 20)
-        pt.show()
-        pt.redrawVisible()
+def watch_courses(api, view, history=None, interval=DEFAULT_INTERVAL):
+    """
+    Checks all active courses every interval (with jitter) until the window of view is closed. Only the courses
+    that changed since the previous check are recomputed and shown again, along with what changed.
+    Runs on a worker thread.
+
+    :param api: CanvasAPI object (with a GradeCache, unchanged courses only cost conditional requests)
+    :param view: ResultsView the changes are shown in (created on the main loop)
+    :param history: GradeHistory every changed course is recorded in (not recorded if None)
+    :param interval: seconds between two checks
+    :return: None
+    """
+    def on_changes(changed):
+        for grades, result, changes in changed:
+            record_history(history, grades, result)
+            messages = "".join(change.message + "\n" for change in changes if change.kind != COURSE_ADDED)
+            view.add_course(f"{grades.course_name} ({time.strftime('%H:%M')})", messages + result.summary,
+                            result.table, grades)
+        errors = f", {len(scheduler.errors)} could not be fetched" if scheduler.errors else ""
+        view.set_status(f"Checked the courses at {time.strftime('%H:%M')}: {len(changed)} changed{errors}. "
+                        f"Next check in about {round(interval / 60)} minutes")
 
-    feedback_frame.destroy()
-    root.state("zoomed")  # adjusting window size to display course dataframes
+    scheduler = RefreshScheduler(api_courses(api), on_changes, interval, wait=view.closed.wait)
+    scheduler.run()
 
 
-def get_from_url(dvr, url, crs_select_root):
+def record_history(history, grades, result):
     """
-    Computes and displays the course average and student grade for the course corresponding to the url
+    Helper Method.
+    Adds a computed course to the grade history (a failing history never stops the results from being shown)
 
-    :param crs_select_root: Root tkinter window from the course_selection_gui
-    :param dvr: selenium webdriver object
-    :param url: url of the course
+    :param history: GradeHistory, None to record nothing
+    :param grades: CourseGrades of the course
+    :param result: CourseResult of the course
     :return: None
     """
-    # Providing feedback to user
-    feedback_frame = Frame(crs_select_root)
-    feedback_frame.pack(padx=(20, 20), pady=(20, 20))
-    label = Label(feedback_frame, text=f"Computing", fg="blue")
-    label.pack(side=LEFT)
-    progress = Progressbar(feedback_frame, orient=HORIZONTAL, length=100, mode='indeterminate')
-    progress.pack(side=RIGHT)
-    progress.start(2)
-
-    # Loading url
-    dvr.get(url)
-
-    # Scraping course and computing result
-    result = scrape_and_calculate(dvr.page_source)
-
-    # Creating tkinter window
-    root = Toplevel()
-    root.resizable(True, True)
-    root.title('Course Results')
+    if history is not None:
+        try:
+            with tracing.span("history", course=grades.course_name):
+                history.ingest(grades, result)
+        except sqlite3.Error as e:
+            print(f"Could not record {grades.course_name} in the grade history: {e}")
 
-    # Labels
-    Label(root, text=result, justify=LEFT).pack()
 
-    # Pandas Table
-    frame = Frame(root)
-    frame.pack(fill="x", expand=True)
-    pt = Table(frame, dataframe=COURSE_DF, height=(len(COURSE_DF) + 1) * 20)
-    pt.show()
-    clear_COURSE_DF()  # Empties Dataframe
+def get_from_url(dvr, url, view, api=None, history=None):
+    """
+    Computes and displays the course average and student grade for the course corresponding to the url.
+    Runs on a worker thread.
 
-    progress.stop()
-    feedback_frame.destroy()
-    pt.redrawVisible()
+    :param dvr: selenium webdriver object (None when resuming a saved session)
+    :param url: url of the course
+    :param view: ResultsView the result is shown in (created on the main loop)
+    :param api: CanvasAPI object. Course is fetched as JSON when given, otherwise the page is rendered by the webdriver
+    :param history: GradeHistory the computed course is recorded in (not recorded if None)
+    :return: None
+    """
+    from canvas_api import course_id_from_url
+    from grade_calc import calculate_course, scrape_course
+    course_id = course_id_from_url(url)
+    if dvr is None and (api is None or course_id is None):
+        view.fail("Not a Canvas course URL")
+        return
+    try:
+        if api is not None and course_id is not None:
+            # Fetching the course as JSON
+            grades = api.get_course_grades(course_id)
+        else:
+            # Loading url
+            with tracing.span("fetch", "browser", url=url) as fetch_span:
+                dvr.get(url)
+                html = dvr.page_source
+                fetch_span.set(bytes=len(html))
+
+            # Scraping course
+            grades = scrape_course(html)
+
+        result = calculate_course(grades)
+    except KeyError:  # the page has no grades table
+        view.fail("Not the grades page of a course")
+        return
+    except Exception as e:  # network error, session rejected by Canvas, unknown course...
+        view.fail(f"Could not fetch the course: {e}")
+        return
+    record_history(history, grades, result)
+    view.set_total(1)
+    view.add_course(result.course_name, result.summary, result.table, grades)
+    view.finish()
 
 
 if __name__ == "__main__":
     """
-    Starts the webdriver in headless mode, starts the program if the user can successfully login,
-    and closes the webdriver once the program is closed.
+    Starts the webdriver in headless mode in the background and resumes the saved session if Canvas still accepts
+    it (the webdriver is then closed unused). Otherwise starts the program if the user can successfully login, and
+    closes the webdriver once the program is closed.
+
+    --trace FILE records the time spent in every phase (login, navigation, fetch, parse, compute, render)
+    and writes it as a Chrome trace (chrome://tracing or https://ui.perfetto.dev) on exit.
     """
-    # Starting driver
-    options = Options()
-    options.headless = True
-    # options.add_experimental_option('excludeSwitches', ['enable-logging'])  # Gets rid of Dev Tool Message
-    chrome_service = ChromeService('chromedriver')  # To get rid of terminal window
-    chrome_service.creationflags = CREATE_NO_WINDOW
-    driver = webdriver.Chrome(options=options, service=chrome_service)
-    driver.get("https://canvas.wisc.edu/")
-
-    # Program starts if user successfully logs in
-    login_gui(driver)
-
-    # Closing driver
-    driver.quit()
+    arg_parser = argparse.ArgumentParser(description="Course average and student grade of Canvas courses")
+    arg_parser.add_argument("--trace", metavar="FILE", help="write a Chrome trace of the phases to FILE on exit")
+    arg_parser.add_argument("--logout", action="store_true", help="forget the saved session and log in again")
+    arg_parser.add_argument("--watch-interval", type=float, default=DEFAULT_INTERVAL / 60, metavar="MINUTES",
+                            help="minutes between two checks of the courses with 'Watch for Changes'")
+    cli_args = arg_parser.parse_args()
+    if cli_args.trace:
+        tracing.enable()
+
+    # Returning users skip the browser and the login while Canvas still accepts their saved session
+    session_store = SessionStore()
+    if cli_args.logout:
+        session_store.clear()
+
+    # Starting driver in the background while the saved session is checked (one request, up to
+    # canvas_api.REQUEST_TIMEOUT) and then while the login window is up, so a rejected session costs no extra wait
+    executor = ThreadPoolExecutor(max_workers=1)
+    driver_future = executor.submit(start_driver)
+    saved_cookies = resume_session(session_store)
+    if saved_cookies is not None:
+        # Session resumed: the driver is not needed, it is closed as soon as it has started
+        driver_future.add_done_callback(quit_driver)
+        course_selection_gui(None, saved_cookies, cli_args.watch_interval * 60)
+    else:
+        # Program starts if user successfully logs in
+        login_gui(driver_future, session_store, cli_args.watch_interval * 60)
+
+        # Closing driver (once it has started, if the window was closed before)
+        quit_driver(driver_future)
+    executor.shutdown()
+
+    if cli_args.trace:
+        tracing.export_chrome_trace(cli_args.trace)
+        print(tracing.summary_table())
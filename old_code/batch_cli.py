@@ -0,0 +1,169 @@
+#!/usr/bin/env python
+
+"""batch_cli.py: Computes the course average and student grade of saved Canvas grades pages, in parallel, without GUI
+
+Usage:
+    python batch_cli.py saved_pages/ "archive/*.html" fall_term.tar.gz --format csv > results.csv
+"""
+
+__author__ = "Leo Shen, Dhruba Paul"
+__copyright__ = "Copyright 2022, Canvas Course Mean Project"
+
+import argparse
+import csv
+import glob
+import json
+import math
+import os
+import sys
+import tarfile
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from grade_calc import scrape_and_calculate
+
+CSV_COLUMNS = ["source", "course_name", "canvas_grade", "course_avg", "student_grade", "error"]
+PAGE_EXTENSIONS = (".html", ".htm")
+TAR_EXTENSIONS = (".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tar.xz")
+
+
+def iter_sources(inputs):
+    """
+    Lists the pages to process. Files and directories are given by path (read by the workers),
+    pages inside tarballs are read here and handed over as text.
+
+    :param inputs: list of directories, files, glob patterns or tarballs
+    :return: generator of tuples (source name, path of the page or None, html or None, exception or None), the
+             exception of a pattern matching nothing or of an archive that cannot be read being reported as an error
+    """
+    for item in inputs:
+        paths = [item] if os.path.exists(item) else sorted(glob.glob(item, recursive=True))
+        if not paths:
+            yield item, None, None, FileNotFoundError(f"no such file or pattern: {item}")
+        for path in paths:
+            if os.path.isdir(path):
+                for root, _, files in os.walk(path):
+                    for name in sorted(files):
+                        if name.lower().endswith(PAGE_EXTENSIONS):
+                            yield os.path.join(root, name), os.path.join(root, name), None, None
+            elif path.lower().endswith(TAR_EXTENSIONS):
+                # A corrupt or unreadable archive is reported (after the pages read before the error), and the
+                # batch goes on with the next one
+                try:
+                    with tarfile.open(path) as tar:
+                        for member in tar:
+                            if member.isfile() and member.name.lower().endswith(PAGE_EXTENSIONS):
+                                html = tar.extractfile(member).read().decode("utf-8", errors="replace")
+                                yield f"{path}:{member.name}", None, html, None
+                except (tarfile.TarError, OSError, EOFError) as e:
+                    yield path, None, None, e
+            else:
+                yield path, path, None, None
+
+
+def _number(x):
+    """
+    Helper Method.
+    :return: x as a float, None if it is not finite (not representable in JSON)
+    """
+    return float(x) if x is not None and math.isfinite(x) else None
+
+
+def course_record(result):
+    """
+    Helper Method.
+    Results of a course as a dictionary that can be written as JSON
+
+    :param result: CourseResult
+    :return: dictionary with course_name, canvas_grade, course_avg, student_grade, error and, for classes with
+             weights, the per-group table (groups)
+    """
+    record = {"course_name": result.course_name, "canvas_grade": result.canvas_grade,
+              "course_avg": _number(result.course_avg), "student_grade": _number(result.student_grade),
+              "error": None if result.table is not None else "Class has no weights"}
+    if result.table is not None:
+        record["groups"] = [{"group": group, "weight": _number(weight), "mean_sum": _number(mean_sum),
+                             "student_score_sum": _number(score_sum), "total_sum": _number(total_sum),
+                             "dropped": int(dropped)}
+                            for group, mean_sum, score_sum, total_sum, dropped, weight in zip(*result.table[:6])]
+    return record
+
+
+def process_page(source, path=None, html=None, error=None):
+    """
+    Parses and computes one page (runs in a worker process). Errors are returned, not raised,
+    so that a malformed page does not stop the batch.
+
+    :param source: name of the page in the output
+    :param path: path of the page to read, if html is not given
+    :param html: html code of the page
+    :param error: exception met while listing the source (returned as its error)
+    :return: dictionary with the results of the page (or its error)
+    """
+    try:
+        if error is not None:
+            raise error
+        if html is None:
+            with open(path, encoding="utf-8", errors="replace") as f:
+                html = f.read()
+        return {"source": source, **course_record(scrape_and_calculate(html))}
+    except Exception as e:
+        return {"source": source, "course_name": None, "canvas_grade": None, "course_avg": None,
+                "student_grade": None, "error": f"{type(e).__name__}: {e}"}
+
+
+def run_batch(inputs, workers=None, max_pending=None):
+    """
+    Processes pages on a pool of processes, yielding results as they complete.
+    At most max_pending pages are in flight, so archives of any size run in bounded memory.
+
+    :param inputs: list of directories, files, glob patterns or tarballs
+    :param workers: number of processes (defaults to the number of cores)
+    :param max_pending: maximum number of pages submitted but not yet done
+    :return: generator of result dictionaries (see process_page)
+    """
+    workers = workers or os.cpu_count()
+    max_pending = max_pending or workers * 4
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = set()
+        for source in iter_sources(inputs):
+            if len(pending) >= max_pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+            pending.add(executor.submit(process_page, *source))
+        for future in pending:
+            yield future.result()
+
+
+def main(argv=None):
+    """
+    Command line entry point
+
+    :param argv: command line arguments (defaults to sys.argv)
+    :return: exit status (1 if any page failed)
+    """
+    parser = argparse.ArgumentParser(description="Computes the course average and student grade of saved Canvas "
+                                                 "grades pages (directories, files, glob patterns or tarballs)")
+    parser.add_argument("inputs", nargs="+", help="directories, files, glob patterns or tarballs of grades pages")
+    parser.add_argument("--format", choices=["jsonl", "csv"], default="jsonl", help="output format (stdout)")
+    parser.add_argument("--workers", type=int, default=None, help="number of processes (default: all cores)")
+    args = parser.parse_args(argv)
+
+    writer = csv.DictWriter(sys.stdout, CSV_COLUMNS, extrasaction="ignore") if args.format == "csv" else None
+    if writer is not None:
+        writer.writeheader()
+
+    failures = 0
+    for record in run_batch(args.inputs, args.workers):
+        if record["course_name"] is None:
+            failures += 1
+            print(f"{record['source']}: {record['error']}", file=sys.stderr)
+        if writer is not None:
+            writer.writerow(record)
+        else:
+            sys.stdout.write(json.dumps(record) + "\n")
+        sys.stdout.flush()
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
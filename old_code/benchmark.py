@@ -0,0 +1,1274 @@
+#!/usr/bin/env python
+
+"""benchmark.py: Benchmarks of the course fetching and grade computation, run against a local stub Canvas"""
+
+__author__ = "Leo Shen, Dhruba Paul"
+__copyright__ = "Copyright 2022, Canvas Course Mean Project"
+
+import argparse
+import asyncio
+import gc
+import json
+import os
+import platform
+import queue
+import random
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import timeit
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock, Thread
+import numpy as np
+import requests
+from selenium.common.exceptions import NoSuchElementException, WebDriverException
+from selenium.webdriver import Keys
+from selenium.webdriver.common.by import By
+from batch_cli import run_batch
+from browser_wait import (BackoffWait, LoginOutcome, login_form, LOGIN_FORM_TIMEOUT, LOGIN_OUTCOME_TIMEOUT,
+                          BAD_PASSWORD, DUO_DENIED, DUO_MESSAGES, DUO_TIMED_OUT, LOGGED_IN)
+from canvas_api import CanvasAPI, MAX_CONCURRENT_FETCHES
+from driver_pool import DriverPool, create_driver
+from fake_driver import FakeBrowser, FakeClock, FakeLoginDriver
+from grade_cache import GradeCache
+from grade_calc import calculate_course, calculate_grade_pandas, scrape_and_calculate
+from grade_history import GradeHistory
+from grade_columns import UNGRADED
+from grade_kernel import batch_table, calculate_grades_batch, group_table, pack_courses
+from grade_parser import is_number, parse_grades_page, scrape_grades_soup, start_with_illegal_val
+from grade_projection import Projection
+from grade_server import GradeServer, ServerThread
+from gradebook_stats import DEFAULT_CHUNK_SIZE, gradebook_stats
+from pipeline import Pipeline, Stage
+from refresh_scheduler import RefreshScheduler, api_courses
+from results_view import drain, sections_in_view, MAX_MESSAGES_PER_POLL, POLL_INTERVAL, ROW_HEIGHT
+from session_store import SessionStore, resume_session
+from stub_canvas import (SESSION_COOKIE, SESSION_VALUE, StubCanvas, fmt_number, make_course, make_courses,
+                         render_grades_page, write_gradebook_csv)
+import tracing
+
+# Heavy modules the GUI only imports once they are needed (see CanvasCourseMean.py)
+STARTUP_DEFERRED = ["pandas", "pandastable", "numpy", "lxml.etree", "bs4", "requests",
+                    "selenium.webdriver.chrome.webdriver"]
+
+
+def bench_api(args):
+    """
+    Compares fetching every course's grades over the pooled API session against rendering every grades page
+    in headless Chrome (the Selenium path is skipped when chromedriver is unavailable)
+
+    :param args: parsed command line arguments
+    :return: None
+    """
+    with StubCanvas(make_courses(args.courses, args.groups, args.assignments)) as canvas:
+        api = CanvasAPI(canvas.url, canvas.cookies)
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            for course_id in api.get_active_courses().values():
+                api.get_course_grades(course_id)
+        api_time = (time.perf_counter() - start) / args.repeat
+        api.close()
+        print(f"API path:      {api_time * 1000:9.1f} ms for {args.courses} courses "
+              f"({api_time * 1000 / args.courses:.1f} ms/course)")
+
+        try:
+            from selenium import webdriver
+            from selenium.webdriver.chrome.options import Options
+            options = Options()
+            options.add_argument("--headless=new")
+            driver = webdriver.Chrome(options=options)
+        except Exception as e:  # selenium or chromedriver missing
+            print(f"Selenium path: skipped ({type(e).__name__})")
+            return
+
+        try:
+            driver.get(canvas.url + "/404")
+            for cookie in canvas.cookies:
+                driver.add_cookie({"name": cookie["name"], "value": cookie["value"], "path": cookie["path"]})
+            start = time.perf_counter()
+            for _ in range(args.repeat):
+                for course_id in canvas.courses:
+                    driver.get(f"{canvas.url}/courses/{course_id}/grades")
+                    driver.page_source
+            selenium_time = (time.perf_counter() - start) / args.repeat
+        finally:
+            driver.quit()
+        print(f"Selenium path: {selenium_time * 1000:9.1f} ms for {args.courses} courses "
+              f"({selenium_time * 1000 / args.courses:.1f} ms/course)")
+        print(f"Speedup:       {selenium_time / api_time:9.1f}x")
+
+
+def bench_concurrency(args):
+    """
+    Compares fetching the courses one after the other against fetching them concurrently,
+    with every request to the stub delayed by args.latency seconds
+
+    :param args: parsed command line arguments
+    :return: None
+    """
+    with StubCanvas(make_courses(args.courses), latency=args.latency) as canvas:
+        api = CanvasAPI(canvas.url, canvas.cookies, pool_size=args.workers)
+        course_ids = list(api.get_active_courses().values())
+
+        start = time.perf_counter()
+        slowest = 0.0
+        for course_id in course_ids:
+            course_start = time.perf_counter()
+            api.get_course_grades(course_id)
+            slowest = max(slowest, time.perf_counter() - course_start)
+        sequential_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        list(api.iter_course_grades(course_ids, args.workers))
+        concurrent_time = time.perf_counter() - start
+        api.close()
+
+    print(f"Slowest single course: {slowest * 1000:8.1f} ms")
+    print(f"Sequential:            {sequential_time * 1000:8.1f} ms")
+    print(f"Concurrent ({args.workers} max):    {concurrent_time * 1000:8.1f} ms "
+          f"({sequential_time / concurrent_time:.1f}x faster)")
+
+
+def bench_stress(args):
+    """
+    Runs hundreds of course computations concurrently, against the same computations one after the other
+    (tests/test_grade_calc.py checks that they give the same results)
+
+    :param args: parsed command line arguments
+    :return: None
+    """
+    pages = [render_grades_page(make_course(i, 2 + i % 5, 5 + i % 20)) for i in range(1, args.courses + 1)]
+    jobs = [pages[i % len(pages)] for i in range(args.computations)]
+
+    start = time.perf_counter()
+    for page in jobs:
+        scrape_and_calculate(page)
+    sequential = time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.workers) as executor:
+        list(executor.map(scrape_and_calculate, jobs))
+    elapsed = time.perf_counter() - start
+
+    print(f"{args.computations} computations: sequential {sequential * 1000:.1f} ms, "
+          f"on {args.workers} threads {elapsed * 1000:.1f} ms")
+
+
+def bench_parser(args):
+    """
+    Times parse_grades_page and the BeautifulSoup scraper on a large page (tests/test_grade_parser.py checks that
+    they give the same output)
+
+    :param args: parsed command line arguments
+    :return: None
+    """
+    page = render_grades_page(make_course(1, args.groups, args.assignments // args.groups))
+    for parser_name, parse in [("BeautifulSoup", scrape_grades_soup), ("lxml targeted", parse_grades_page)]:
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            parse(page)
+        elapsed = (time.perf_counter() - start) / args.repeat
+        print(f"{parser_name:14} {elapsed * 1000:8.2f} ms per page "
+              f"({args.assignments} assignments, {len(page) // 1024} KiB)")
+
+
+def bench_kernel(args):
+    """
+    Per-course cost of the numpy kernel (one course at a time and batched) against the pandas implementation,
+    for 1, 100 and 10,000 courses
+
+    :param args: parsed command line arguments
+    :return: None
+    """
+    pages = [render_grades_page(make_course(i, 2 + i % 5, 5 + i % 15)) for i in range(1, 51)]
+    parsed = [parse_grades_page(page) for page in pages]
+
+    for n_courses in args.sizes:
+        courses = [parsed[i % len(parsed)] for i in range(n_courses)]
+        timings = {}
+
+        n_pandas = min(n_courses, args.pandas_limit)  # pandas is timed on a sample, it is too slow for 10,000
+        start = time.perf_counter()
+        for c in courses[:n_pandas]:
+            a = c.assignments
+            calculate_grade_pandas(a.group_list, a.mean_list, a.total_list, a.dropped_list, a.student_score_list,
+                                   c.group_weights)
+        timings["pandas"] = (time.perf_counter() - start) / n_pandas
+
+        start = time.perf_counter()
+        for c in courses:
+            calculate_course(c)
+        timings["numpy"] = (time.perf_counter() - start) / n_courses
+
+        start = time.perf_counter()
+        calculate_grades_batch(**pack_courses(courses))
+        timings["numpy batch"] = (time.perf_counter() - start) / n_courses
+
+        print(f"{n_courses:6} courses: " + ", ".join(f"{name} {t * 1e6:8.1f} us/course" for name, t in timings.items()))
+
+
+def bench_cache(args):
+    """
+    Fetches every course cold, warm (within the TTL), after the TTL (revalidated with 304s) and after one course
+    changed, reporting the requests sent and the cache counters of each run
+
+    :param args: parsed command line arguments
+    :return: None
+    """
+    with StubCanvas(make_courses(args.courses), latency=args.latency) as canvas:
+        cache = GradeCache(":memory:", ttl=60)
+        api = CanvasAPI(canvas.url, canvas.cookies, cache=cache)
+        course_ids = list(canvas.courses)
+
+        def run(label):
+            requests_before, not_modified_before = canvas.request_count, canvas.not_modified_count
+            stats_before = cache.stats()
+            start = time.perf_counter()
+            for course_id in course_ids:
+                api.get_course_grades(course_id)
+            elapsed = time.perf_counter() - start
+            stats = cache.stats()
+            print(f"{label:24} {elapsed * 1000:8.1f} ms, {canvas.request_count - requests_before:3} requests "
+                  f"({canvas.not_modified_count - not_modified_before:3} x 304), "
+                  + ", ".join(f"{key} +{stats[key] - stats_before[key]}"
+                              for key in ["hits", "not_modified", "misses", "bytes_saved"]))
+
+        run("cold")
+        run("warm (within TTL)")
+        cache.ttl = 0
+        run("revalidated (TTL over)")
+        canvas.courses[course_ids[0]]["assignments"][0]["score"] = 0.0  # a new grade is posted
+        run("one course changed")
+        print(f"Cache: {cache.stats()}")
+        api.close()
+
+
+def bench_batch(args):
+    """
+    Throughput of the batch command line tool over a directory of generated pages, for growing numbers of processes
+
+    :param args: parsed command line arguments
+    :return: None
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        for i in range(1, args.pages + 1):
+            with open(os.path.join(directory, f"course_{i}.html"), "w", encoding="utf-8") as f:
+                f.write(render_grades_page(make_course(i, 2 + i % 6, 5 + i % 40)))
+        with open(os.path.join(directory, "malformed.html"), "w", encoding="utf-8") as f:
+            f.write("<html><body>Not a grades page</body></html>")
+
+        baseline = None
+        for workers in args.workers:
+            start = time.perf_counter()
+            records = list(run_batch([directory], workers))
+            elapsed = time.perf_counter() - start
+            baseline = baseline or elapsed
+            print(f"{workers:3} processes: {elapsed:7.2f} s, {len(records) / elapsed:7.1f} pages/s "
+                  f"({baseline / elapsed:.1f}x)")
+
+
+def legacy_login(dvr, sleep):
+    """
+    Helper Method.
+    The login loops that browser_wait replaced (fixed 0.2 s polling, one lookup per condition), for comparison
+
+    :param dvr: FakeLoginDriver
+    :param sleep: sleep function of the fake clock
+    :return: outcome of the login
+    """
+    while True:
+        try:
+            dvr.find_element(by="tag name", value="input").send_keys("net id")
+            dvr.find_element(by="name", value="j_password").send_keys("password", Keys.RETURN)
+            break
+        except WebDriverException:
+            sleep(0.2)
+    while True:
+        try:
+            try:
+                dvr.find_element(by="tag name", value="strong")
+                return BAD_PASSWORD
+            except NoSuchElementException:
+                pass
+            try:
+                dvr.switch_to.frame(dvr.find_element(by="id", value="duo_iframe"))
+                text = dvr.find_element(by=By.CSS_SELECTOR, value="#messages-view > div > div > div > span").text
+                if text in DUO_MESSAGES:
+                    return DUO_MESSAGES[text]
+            except NoSuchElementException:
+                pass
+            finally:
+                dvr.switch_to.parent_frame()
+            dvr.find_element(by="id", value="dashboard_header_container")
+            return LOGGED_IN
+        except WebDriverException:
+            sleep(0.2)
+
+
+def backoff_login(dvr, clock):
+    """
+    Helper Method.
+    The login waits of login_canvas on a fake clock
+
+    :param dvr: FakeLoginDriver
+    :param clock: FakeClock
+    :return: outcome of the login
+    """
+    input_net_id, input_password = BackoffWait(dvr, LOGIN_FORM_TIMEOUT, clock=clock, sleep=clock.sleep).until(
+        login_form)
+    input_net_id.send_keys("net id")
+    input_password.send_keys("password", Keys.RETURN)
+    return BackoffWait(dvr, LOGIN_OUTCOME_TIMEOUT, clock=clock, sleep=clock.sleep).until(LoginOutcome(clock=clock))
+
+
+def import_times(statement, repeat):
+    """
+    Helper Method.
+    Runs a statement in fresh interpreters with -X importtime
+
+    :param statement: python statement (e.g. "import CanvasCourseMean")
+    :param repeat: number of interpreters run
+    :return: list (one per run) of dictionaries {module: (self us, cumulative us, depth)}
+    """
+    runs = []
+    for _ in range(repeat):
+        stderr = subprocess.run([sys.executable, "-X", "importtime", "-c", statement], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stderr
+        modules = {}
+        for line in stderr.splitlines():
+            match = re.match(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)", line)
+            if match:
+                modules[match.group(4)] = (int(match.group(1)), int(match.group(2)), len(match.group(3)) // 2)
+        runs.append(modules)
+    return runs
+
+
+def bench_startup(args):
+    """
+    Import time of the GUI module (what runs before the login window shows up), checked against a budget,
+    and the modules it must not import at startup
+
+    :param args: parsed command line arguments
+    :return: None
+    """
+    runs = import_times("import CanvasCourseMean", args.repeat)
+    total = statistics.median(run["CanvasCourseMean"][1] for run in runs) / 1000
+    print(f"import CanvasCourseMean: {total:.1f} ms (median of {args.repeat} fresh interpreters)")
+    modules = list(runs[-1].items())
+    app_modules = modules[[module for module, _ in modules].index("site") + 1:]  # after the interpreter startup
+    children = sorted(((cumulative, module) for module, (_, cumulative, depth) in app_modules if depth == 1),
+                      reverse=True)
+    for cumulative, module in children[:args.top]:
+        print(f"  {module:45} {cumulative / 1000:7.1f} ms")
+
+    deferred = [module for module in STARTUP_DEFERRED if any(module in run for run in runs)]
+    for module in STARTUP_DEFERRED:
+        cost = statistics.median(run[module][1] for run in import_times(f"import {module}", 3)) / 1000
+        print(f"  deferred {module:36} {cost:7.1f} ms{'   <- imported at startup!' if module in deferred else ''}")
+    if deferred or total > args.budget:
+        print(f"Startup regression: {total:.1f} ms (budget {args.budget:.0f} ms), imported at startup: {deferred}")
+        raise SystemExit(1)
+
+
+def bench_waits(args):
+    """
+    Detection latency and number of driver calls of the login, fixed polling vs. browser_wait,
+    on a fake driver (virtual clock, every driver call costing --round-trip seconds)
+
+    :param args: parsed command line arguments
+    :return: None
+    """
+    print(f"{'outcome':14} {'after (s)':>9} | {'fixed polling':>22} | {'backoff waits':>22}")
+    print(f"{'':14} {'':9} | {'latency (ms)':>12} {'calls':>9} | {'latency (ms)':>12} {'calls':>9}")
+    totals = {"fixed": [0.0, 0], "backoff": [0.0, 0]}
+    for outcome in [LOGGED_IN, BAD_PASSWORD, DUO_DENIED, DUO_TIMED_OUT]:
+        for delay in args.delays:
+            row = []
+            for name, login in [("fixed", legacy_login), ("backoff", backoff_login)]:
+                clock = FakeClock()
+                dvr = FakeLoginDriver(clock, outcome, form_delay=args.form_delay, outcome_delay=delay,
+                                      round_trip_cost=args.round_trip)
+                login(dvr, clock.sleep if login is legacy_login else clock)
+                # time lost noticing the form, plus time lost noticing the outcome
+                latency = (dvr.submitted_at - args.form_delay) + (clock() - dvr.outcome_at)
+                row += [latency * 1000, dvr.calls]
+                totals[name][0] += latency
+                totals[name][1] += dvr.calls
+            print(f"{outcome:14} {delay:9.2f} | {row[0]:12.1f} {row[1]:9} | {row[2]:12.1f} {row[3]:9}")
+    print(f"{'total':24} | {totals['fixed'][0] * 1000:12.1f} {totals['fixed'][1]:9} | "
+          f"{totals['backoff'][0] * 1000:12.1f} {totals['backoff'][1]:9}")
+
+
+def bench_session(args):
+    """
+    Time to the first result of a returning user with a valid saved session, time to fall back to the login
+    with an expired one, against the login on the fake driver (tests/test_session_store.py checks the paths)
+
+    :param args: parsed command line arguments
+    :return: None
+    """
+    with tempfile.TemporaryDirectory() as directory, \
+            StubCanvas(make_courses(args.courses, 4, 10), latency=args.latency) as stub:
+        store = SessionStore(os.path.join(directory, "session.bin"), use_keyring=False)
+        store.save(stub.cookies, stub.url)
+
+        # Returning user: load + validate + list courses + first course computed
+        timings = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            cookies = resume_session(store, stub.url)
+            api = CanvasAPI(stub.url, cookies)
+            course_id = next(iter(api.get_active_courses().values()))
+            calculate_course(api.get_course_grades(course_id))
+            timings.append(time.perf_counter() - start)
+            api.close()
+        print(f"Valid session:    resumed, first result after {statistics.median(timings) * 1000:.0f} ms "
+              f"(median of {args.repeat}, {args.latency * 1000:.0f} ms per request)")
+
+        stub.expire_sessions()
+        start = time.perf_counter()
+        resume_session(store, stub.url)
+        print(f"Expired session:  rejected after {(time.perf_counter() - start) * 1000:.0f} ms, "
+              f"falls back to the login window")
+
+    clock = FakeClock()
+    dvr = FakeLoginDriver(clock, form_delay=args.browser_start, outcome_delay=args.duo)
+    backoff_login(dvr, clock)
+    print(f"Login on the fake driver ({args.browser_start:.0f} s browser start, {args.duo:.0f} s Duo approval): "
+          f"{clock():.1f} s before the first request")
+
+
+def bench_pool(args):
+    """
+    Time to load and compute every grades page through browsers, against a stub Canvas serving heavy pages:
+    one browser loading everything (as before) vs. pools of browsers with eager loads and blocked resources.
+    Uses fake_driver.FakeBrowser (HTTP only), or real headless Chrome with --chrome.
+
+    :param args: parsed command line arguments
+    :return: None
+    """
+    courses = make_courses(args.courses, 4, 10)
+    if args.chrome:
+        configurations = [("1 browser, full page loads", 1, lambda block: create_driver(False)),
+                          ("1 browser, eager + blocking", 1, create_driver)] + \
+                         [(f"{size} browsers, eager + blocking", size, create_driver) for size in args.sizes]
+    else:
+        configurations = [("1 browser, full page loads", 1, lambda block: FakeBrowser("normal")),
+                          ("1 browser, eager + blocking", 1, FakeBrowser.create)] + \
+                         [(f"{size} browsers, eager + blocking", size, FakeBrowser.create) for size in args.sizes]
+
+    with StubCanvas(courses, latency=args.latency, heavy_pages=True, asset_latency=args.asset_latency) as stub:
+        baseline = None
+        for name, size, factory in configurations:
+            with DriverPool(size, stub.cookies, stub.url, driver_factory=factory) as pool:
+                requests_before = stub.request_count
+                start = time.perf_counter()
+                urls = {f"{stub.url}/courses/{course_id}/grades": course_id for course_id in courses}
+                for url, html, error in pool.fetch_pages(urls):
+                    if error is not None:
+                        raise error
+                    scrape_and_calculate(html)
+                elapsed = time.perf_counter() - start
+                resources = stub.request_count - requests_before
+            baseline = baseline or elapsed
+            print(f"{name:30} {elapsed:6.2f} s, {len(courses) / elapsed:6.1f} pages/s, "
+                  f"{resources / len(courses):5.1f} requests/page ({baseline / elapsed:.1f}x)")
+
+
+class RecordingView:
+    """
+    Stand-in for results_view.ResultsView without Tk: queues the messages of the worker with the time they were sent
+    """
+
+    def __init__(self):
+        self.queue = queue.Queue()
+
+    def set_total(self, total):
+        self.queue.put(("total", time.perf_counter(), total))
+
+    def add_course(self, course_name, summary, table, grades=None):
+        self.queue.put(("course", time.perf_counter(), course_name))
+
+    def fail(self, message):
+        self.queue.put(("fail", time.perf_counter(), message))
+
+    def finish(self):
+        self.queue.put(("finish", time.perf_counter()))
+
+
+def bench_streaming(args):
+    """
+    Runs the "All Active Courses" worker against a stub Canvas and polls its messages like the results window
+    does: when every course shows up, against the single window built after the last course (as before).
+    Also times the lookup of the sections in view, which decides which tables get created.
+
+    :param args: parsed command line arguments
+    :return: None
+    """
+    from CanvasCourseMean import get_all_active_courses
+    courses = make_courses(args.courses, 4, 10)
+    with StubCanvas(courses, latency=args.latency) as stub:
+        api = CanvasAPI(stub.url, stub.cookies)
+        start = time.perf_counter()
+        api.get_course_grades(1)
+        single_fetch = time.perf_counter() - start
+
+        view = RecordingView()
+        start = time.perf_counter()
+        Thread(target=get_all_active_courses, args=(None, view, api, None, args.workers)).start()
+        shown, batches, finished = [], [], False
+        while not finished:
+            time.sleep(POLL_INTERVAL / 1000)
+            messages = drain(view.queue, MAX_MESSAGES_PER_POLL)
+            now = time.perf_counter() - start
+            shown += [now for message in messages if message[0] == "course"]
+            batches.append(len(messages))
+            finished = any(message[0] in ("finish", "fail") for message in messages)
+        api.close()
+
+    print(f"Single course fetch:           {single_fetch * 1000:8.1f} ms")
+    print(f"First course shown:            {shown[0] * 1000:8.1f} ms (includes the course list)")
+    print(f"Half of the courses shown:     {shown[len(shown) // 2] * 1000:8.1f} ms")
+    print(f"Last course shown (= before):  {shown[-1] * 1000:8.1f} ms")
+    print(f"Polls: {len(batches)}, at most {max(batches)} messages per poll")
+
+    # Sections laid out with the heights the view reserves (labels + table rows), in a 900 pixel viewport
+    for n_sections in (args.courses, 1000):
+        extents, y = [], 0
+        for i in range(n_sections):
+            height = 80 + (4 + 2) * ROW_HEIGHT
+            extents.append((y, height))
+            y += height
+        timing = measure(lambda: sections_in_view(extents, y / 2, y / 2 + 900))
+        print(f"Sections in view ({n_sections:4} sections): {timing['min'] * 1e6:7.1f} us, "
+              f"{len(sections_in_view(extents, 0, 900))} tables created at first instead of {n_sections}")
+
+
+def bench_projection(args):
+    """
+    What-if projections: one hypothetical score with the incremental Projection vs. the full recomputation, and
+    the minimum score solver (tests/test_grade_projection.py checks them against calculate_course)
+
+    :param args: parsed command line arguments
+    :return: None
+    """
+    grades = parse_grades_page(render_grades_page(make_course(1, args.groups, args.assignments // args.groups)))
+    projection = Projection(grades)
+    scores = grades.assignments.scores.tolist()
+
+    index = len(scores) // 2
+    full = measure(lambda: calculate_course(grades._replace(assignments=grades.assignments.with_scores(scores))))
+    incremental = measure(lambda: projection.set_score(index, 1.0), number=10000)
+    solve = measure(lambda: projection.needed_score(index, args.target), number=10000)
+    print(f"{len(scores)} assignments")
+    print(f"Full recomputation:      {full['min'] * 1e6:9.1f} us")
+    print(f"Incremental score edit:  {incremental['min'] * 1e6:9.2f} us ({full['min'] / incremental['min']:.0f}x)")
+    print(f"Minimum score solver:    {solve['min'] * 1e6:9.2f} us")
+
+
+def bench_history(args):
+    """
+    Ingest rate, size and query latency of the grade history: args.snapshots runs over args.courses courses,
+    a few assignments being graded (or regraded) between runs
+
+    :param args: parsed command line arguments
+    :return: None
+    """
+    rng = np.random.default_rng(0)
+    courses = [parse_grades_page(render_grades_page(course)) for course in make_courses(args.courses, 4, 10).values()]
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "history.sqlite3")
+        history = GradeHistory(path)
+        written = 0
+        start = time.perf_counter()
+        for snapshot in range(args.snapshots):
+            for c, grades in enumerate(courses):
+                if rng.random() < args.change_rate:
+                    scores = grades.assignments.scores.tolist()
+                    for index in rng.integers(len(scores), size=2):
+                        scores[index] = float(rng.uniform(0, grades.assignments.totals[index]))
+                    courses[c] = grades = grades._replace(assignments=grades.assignments.with_scores(scores))
+                written += history.ingest(grades, calculate_course(grades), taken_at=float(snapshot))
+        ingest_time = time.perf_counter() - start
+        history.connection.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        size = os.path.getsize(path)
+
+        course = courses[0].course_name
+        group = courses[0].assignments.group_names[0]
+        assignment = courses[0].assignments.ids[0]
+        course_query = measure(lambda: history.course_series(course), repeat=5)
+        group_query = measure(lambda: history.group_series(course, group), repeat=5)
+        assignment_query = measure(lambda: history.assignment_series(course, assignment), repeat=5)
+        stats = history.stats()
+        history.close()
+
+    ingested = args.snapshots * len(courses)
+    full_rows = ingested * len(courses[0].assignments)
+    print(f"Ingest:            {ingested / ingest_time:9.0f} course snapshots/s "
+          f"({ingest_time * 1e6 / ingested:.0f} us each, computation included)")
+    print(f"Assignment rows:   {written:9} written of {full_rows} ({written / full_rows * 100:.1f}%)")
+    print(f"Rows per table:    {stats}")
+    print(f"File size:         {size / 1024:9.0f} KB ({size / ingested:.0f} bytes per course snapshot)")
+    print(f"Course series:     {course_query['min'] * 1000:9.2f} ms ({args.snapshots} points)")
+    print(f"Group series:      {group_query['min'] * 1000:9.2f} ms")
+    print(f"Assignment series: {assignment_query['min'] * 1000:9.2f} ms")
+
+
+def idle_check_cost(n_courses, n_checks):
+    """
+    Helper Method.
+    Client side cost of the scheduler's checks when nothing changes vs. fetching and computing every course
+    again. The stub runs in its own process so that only the client's CPU time is counted.
+
+    :param n_courses: number of courses (8 groups of 50 assignments)
+    :param n_checks: number of idle checks
+    :return: A tuple of dictionaries (idle check, full refresh) with requests, bytes, cpu (seconds) and the number
+             of courses recomputed
+    """
+    server = subprocess.Popen([sys.executable, "-u", "stub_canvas.py", "--courses", str(n_courses), "--groups", "8",
+                               "--assignments", "50", "--port", "0"], stdout=subprocess.PIPE, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)))
+    try:
+        url = re.search(r"http://\S+", server.stdout.readline()).group(0)
+        cookies = [{"name": SESSION_COOKIE, "value": SESSION_VALUE, "path": "/"}]
+        costs = []
+        for api, checks in ((CanvasAPI(url, cookies, cache=GradeCache(":memory:", ttl=0)), n_checks),
+                            (CanvasAPI(url, cookies), 1)):
+            received = {"requests": 0, "bytes": 0}
+
+            def count(response, *args, **kwargs):
+                received["requests"] += 1
+                received["bytes"] += len(response.content)
+            api.session.hooks["response"].append(count)
+            if api.cache is not None:
+                scheduler = RefreshScheduler(api_courses(api), lambda changed: None)
+                scheduler.check()  # first check: everything is new
+                received.update(requests=0, bytes=0)
+                cpu = time.process_time()
+                for _ in range(checks):
+                    scheduler.check()
+                recomputed = scheduler.recomputed - n_courses
+            else:
+                cpu = time.process_time()
+                api_courses(api)()  # fetched and computed on the same stages
+                recomputed = n_courses
+            costs.append({"requests": received["requests"] / checks, "bytes": received["bytes"] / checks,
+                          "cpu": (time.process_time() - cpu) / checks, "recomputed": recomputed})
+            api.close()
+        return costs
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def bench_watch(args):
+    """
+    Refresh scheduler: cost of a check when nothing changed (requests, bytes, client CPU time) vs. fetching and
+    computing everything again (tests/test_refresh_scheduler.py checks the changes reported)
+
+    :param args: parsed command line arguments
+    :return: None
+    """
+    idle, full = idle_check_cost(args.courses, args.checks)
+    print(f"Idle check:   {idle['requests']:4.0f} requests (all 304), {idle['bytes'] / 1024:7.1f} KB, "
+          f"{idle['cpu'] * 1000:6.1f} ms CPU, {idle['recomputed']} of {args.courses} courses recomputed")
+    print(f"Full refresh: {full['requests']:4.0f} requests (all 200), {full['bytes'] / 1024:7.1f} KB, "
+          f"{full['cpu'] * 1000:6.1f} ms CPU")
+
+
+async def http_get(reader, writer, path, etag=None):
+    """
+    Helper Method.
+    GETs a path on a kept-alive connection
+
+    :return: A tuple (status, body, ETag or None)
+    """
+    writer.write((f"GET {path} HTTP/1.1\r\nHost: localhost\r\n" +
+                  (f"If-None-Match: {etag}\r\n" if etag else "") + "\r\n").encode())
+    head = await reader.readuntil(b"\r\n\r\n")
+    length = int(re.search(rb"Content-Length: (\d+)", head).group(1))
+    etag_match = re.search(rb"ETag: (\S+)", head)
+    return int(head.split(b" ", 2)[1]), await reader.readexactly(length), \
+        etag_match.group(1).decode() if etag_match else None
+
+
+async def load_test(url, paths, clients, requests_per_client, revalidate):
+    """
+    Helper Method.
+    Runs clients concurrent keep-alive connections, each GETting random paths
+
+    :param url: root url of the server
+    :param paths: paths requested
+    :param clients: number of concurrent connections
+    :param requests_per_client: requests sent on every connection
+    :param revalidate: fraction of the requests sent with the ETag of the previous response of the path
+    :return: A tuple (list of latencies in seconds, dictionary {status: count})
+    """
+    host, port = re.match(r"http://([^:/]+):(\d+)", url).groups()
+    latencies, statuses = [], {}
+
+    async def client(seed):
+        rng = random.Random(seed)
+        etags = {}
+        reader, writer = await asyncio.open_connection(host, int(port))
+        for _ in range(requests_per_client):
+            path = rng.choice(paths)
+            start = time.perf_counter()
+            status, body, etag = await http_get(reader, writer, path,
+                                                etags.get(path) if rng.random() < revalidate else None)
+            latencies.append(time.perf_counter() - start)
+            statuses[status] = statuses.get(status, 0) + 1
+            etags[path] = etag or etags.get(path)
+        writer.close()
+
+    await asyncio.gather(*(client(i) for i in range(clients)))
+    return latencies, statuses
+
+
+def bench_loadtest(args):
+    """
+    Load test of the JSON/HTTP service. Against a stub Canvas (default): a burst of concurrent requests for one
+    course (with the upstream fetches it cost), then a sustained load over every endpoint. With --url, only the
+    sustained load, against an already running server.
+
+    :param args: parsed command line arguments
+    :return: None
+    """
+    def report(name, elapsed, latencies, statuses):
+        latencies = sorted(latencies)
+        print(f"{name}: {len(latencies)} requests in {elapsed:.2f} s ({len(latencies) / elapsed:.0f} req/s), "
+              f"p50 {latencies[len(latencies) // 2] * 1000:.1f} ms, "
+              f"p99 {latencies[int(len(latencies) * 0.99)] * 1000:.1f} ms, statuses {statuses}")
+
+    if args.url:
+        courses = requests.get(args.url + "/courses").json()
+        paths = ["/courses"] + [f"/courses/{course['id']}{view}" for course in courses for view in ("", "/groups")]
+        start = time.perf_counter()
+        latencies, statuses = asyncio.run(load_test(args.url, paths, args.clients, args.requests, args.revalidate))
+        report("Sustained", time.perf_counter() - start, latencies, statuses)
+        return
+
+    with StubCanvas(make_courses(args.courses, 8, 50), latency=args.latency) as stub:
+        api = CanvasAPI(stub.url, stub.cookies)
+        grade_server = GradeServer(api, ttl=args.ttl)
+        with ServerThread(grade_server) as server:
+            # Burst: every client asks for the same (not yet fetched) course at once
+            start = time.perf_counter()
+            latencies, statuses = asyncio.run(load_test(server.url, ["/courses/1"], args.clients, 1, 0.0))
+            report(f"Cold burst ({args.clients} clients, 1 course)", time.perf_counter() - start, latencies, statuses)
+            print(f"  upstream: {grade_server.upstream_fetches} fetches (course list + course), "
+                  f"{stub.request_count} requests to Canvas")
+
+            # Sustained load over every endpoint
+            paths = ["/courses"] + [f"/courses/{course_id}{view}" for course_id in stub.courses
+                                    for view in ("", "/groups")]
+            fetches_before = grade_server.upstream_fetches
+            start = time.perf_counter()
+            latencies, statuses = asyncio.run(load_test(server.url, paths, args.clients, args.requests,
+                                                        args.revalidate))
+            report(f"Sustained ({args.clients} clients)", time.perf_counter() - start, latencies, statuses)
+            print(f"  upstream: {grade_server.upstream_fetches - fetches_before} fetches for "
+                  f"{len(stub.courses) - 1} courses not fetched yet (ttl {args.ttl:g} s)")
+        api.close()
+
+
+def bench_gradebook(args):
+    """
+    Streaming statistics of a synthetic gradebook export of args.students students: time and peak memory in
+    chunks of args.chunk_size students vs. the whole export at once
+
+    :param args: parsed command line arguments
+    :return: None
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "gradebook.csv")
+        start = time.perf_counter()
+        with open(path, "w", encoding="utf-8", newline="") as f:
+            spec = write_gradebook_csv(f, args.students, args.groups, args.assignments)
+        print(f"Export: {args.students} students x {args.groups * args.assignments} assignments, "
+              f"{os.path.getsize(path) / 2 ** 20:.0f} MB (written in {time.perf_counter() - start:.1f} s)")
+
+        results = {}
+        for name, chunk_size in (("Streamed", args.chunk_size), ("Whole file", args.students + 1)):
+            start = time.perf_counter()
+            stats = gradebook_stats(path, spec, chunk_size)
+            elapsed = time.perf_counter() - start
+            tracemalloc.start()  # second run: tracing slows the conversion of the cells down
+            gradebook_stats(path, spec, chunk_size)
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            results[name] = stats
+            print(f"{name:10} (chunks of {chunk_size:6}): {elapsed:6.2f} s ({len(stats.students) / elapsed:7.0f} "
+                  f"students/s), peak {peak / 2 ** 20:6.1f} MB")
+
+    streamed = results["Streamed"]
+    dense = args.students * args.groups * args.assignments * 8
+    print(f"Scores as one float64 matrix would take {dense / 2 ** 20:.0f} MB; kept per student: "
+          f"{(streamed.grades.nbytes + streamed.group_percentages.nbytes) / 2 ** 20:.1f} MB")
+    print(streamed.summary, end="")
+
+
+def legacy_lists(grades):
+    """
+    Helper Method.
+    Row lists of a course as the parsers used to return them: numbers as fresh strings of the page text,
+    0.0 for scores that are not numbers, the group name text of every row
+
+    :param grades: CourseGrades
+    :return: A tuple of lists (group_list, mean_list, total_list, dropped_list, student_score_list)
+    """
+    assignments = grades.assignments
+    return ([name.encode().decode() for name in assignments.group_list],
+            [fmt_number(mean) if mean else 0 for mean in assignments.means],
+            [fmt_number(total) for total in assignments.totals], assignments.dropped_list,
+            [0.0 if flags & UNGRADED else fmt_number(score) for score, flags in zip(assignments.scores,
+                                                                                      assignments.flags)])
+
+
+def retained_bytes(build):
+    """
+    Helper Method.
+    :param build: function returning the objects to measure
+    :return: A tuple (objects built, bytes allocated by build and still held by the objects)
+    """
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    objects = build()
+    gc.collect()
+    retained = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return objects, retained
+
+
+def bench_columns(args):
+    """
+    Memory per assignment row of the parsed courses: row lists of strings (the earlier parser output), the typed
+    AssignmentBatch columns and a pandas dataframe (as calculate_grade_pandas builds it), and the time to compute
+    a course from the lists and from the columns.
+
+    :param args: parsed command line arguments
+    :return: None
+    """
+    import pandas as pd
+    pages = [render_grades_page(make_course(i, args.groups, args.assignments)) for i in range(1, args.courses + 1)]
+    batches, batch_bytes = retained_bytes(lambda: [parse_grades_page(page) for page in pages])
+    n_rows = sum(len(grades.assignments) for grades in batches)
+    lists, list_bytes = retained_bytes(lambda: [legacy_lists(grades) for grades in batches])
+
+    def frames():
+        frames = []
+        for group_list, mean_list, total_list, dropped_list, score_list in lists:
+            frame = pd.DataFrame({"groups": group_list, "mean_sum": mean_list, "student_score_sum": score_list,
+                                  "total_sum": total_list, "dropped": dropped_list})
+            frames.append(frame.astype({"mean_sum": "float", "total_sum": "float", "student_score_sum": "float"}))
+        return frames
+    dataframes, frame_bytes = retained_bytes(frames)
+    column_bytes = sum(grades.assignments.nbytes for grades in batches)
+
+    print(f"{args.courses} courses, {n_rows} assignment rows ({args.groups} groups x {args.assignments})")
+    print(f"Row lists of strings: {list_bytes / n_rows:7.1f} bytes/row")
+    print(f"Pandas dataframe:     {frame_bytes / n_rows:7.1f} bytes/row "
+          f"(memory_usage(deep=True): {sum(f.memory_usage(deep=True).sum() for f in dataframes) / n_rows:.1f})")
+    print(f"AssignmentBatch:      {batch_bytes / n_rows:7.1f} bytes/row with the rest of CourseGrades "
+          f"({column_bytes / n_rows:.1f} bytes/row of columns)")
+
+    grades = batches[0]
+    weights = grades.group_weights
+    from_lists = measure(lambda: group_table(*lists[0], weights), repeat=7)
+    from_columns = measure(lambda: batch_table(grades.assignments, weights), repeat=7)
+    print(f"Group table of one course ({len(grades.assignments)} rows): from the lists "
+          f"{from_lists['min'] * 1e6:.1f} us, from the columns {from_columns['min'] * 1e6:.1f} us")
+
+
+def bench_pipeline(args):
+    """
+    Loads, parses, computes and renders args.courses heavy grades pages with a single (fake) browser: one step
+    after the other, with the pool fetching every page ahead while the consumer parses (as before), and with the
+    staged pipeline of get_all_active_courses (best of args.repeat runs). Rendering (building the table the
+    results window shows) runs on its own thread like the Tk main loop, except in the serial run. Reports the pages
+    loaded but not parsed yet at worst.
+
+    :param args: parsed command line arguments
+    :return: None
+    """
+    from CanvasCourseMean import COMPUTE_WORKERS, compute_page
+    courses = make_courses(args.courses, args.groups, args.assignments)
+
+    def render(result):
+        return result.summary + result.table.to_string()
+
+    def run(name, consume):
+        waiting = [0, 0]  # pages loaded and not parsed yet, worst seen
+        lock = Lock()
+
+        def fetch(url):
+            html = fetch_page(url)
+            with lock:
+                waiting[0] += 1
+                waiting[1] = max(waiting[1], waiting[0])
+            return html
+
+        def compute(html):
+            with lock:
+                waiting[0] -= 1
+            return compute_page(html)
+
+        rendered = queue.Queue()
+        main_loop = Thread(target=lambda: [render(result) for result in iter(rendered.get, None)])
+        with DriverPool(1, stub.cookies, stub.url, driver_factory=FakeBrowser.create) as pool:
+            fetch_page = pool.fetch_page
+            pool.fetch_page = fetch  # fetch_pages loads through it too
+            main_loop.start()
+            start = time.perf_counter()
+            consume(pool, urls, fetch, compute, rendered.put)
+            rendered.put(None)
+            main_loop.join()
+            elapsed = time.perf_counter() - start
+        return elapsed, waiting[1]
+
+    def serial(pool, urls, fetch, compute, show):
+        results = {}
+        for url in urls:
+            grades, results[url] = compute(fetch(url))
+            render(results[url])
+        return results
+
+    def prefetching(pool, urls, fetch, compute, show):
+        results = {}
+        for url, html, error in pool.fetch_pages(urls):
+            if error is not None:
+                raise error
+            grades, results[url] = compute(html)
+            show(results[url])
+        return results
+
+    def pipelined(pool, urls, fetch, compute, show):
+        results = {}
+        pipeline = Pipeline([Stage("fetch", fetch, 1), Stage("compute", compute, COMPUTE_WORKERS)])
+        for url, computed, error in pipeline.run(urls):
+            if error is not None:
+                raise error
+            grades, results[url] = computed
+            show(results[url])
+        return results
+
+    with StubCanvas(courses, latency=args.latency) as stub:
+        urls = {f"{stub.url}/courses/{course_id}/grades": course_id for course_id in courses}
+        page = render_grades_page(courses[1])
+        parse_time = measure(lambda: compute_page(page), repeat=3)["min"]
+        print(f"{args.courses} courses, {len(page) // 1024} KiB pages: {args.latency * 1000:.0f} ms to load, "
+              f"{parse_time * 1000:.0f} ms to parse and compute")
+        baseline = None
+        for name, consume in [("Serial", serial), ("Prefetching pool (before)", prefetching),
+                              (f"Pipeline ({COMPUTE_WORKERS} compute thread)", pipelined)]:
+            elapsed, waiting = min(run(name, consume) for _ in range(args.repeat))
+            baseline = baseline or elapsed
+            print(f"{name:32} {elapsed:6.2f} s ({baseline / elapsed:.1f}x), at most {waiting:3} pages waiting "
+                  f"to be parsed")
+
+
+def bench_tracing(args):
+    """
+    Overhead of the phase instrumentation (disabled and enabled) on parse + compute, and a traced
+    end-to-end run against the stub Canvas, exported as a Chrome trace
+
+    :param args: parsed command line arguments
+    :return: None
+    """
+    page = render_grades_page(make_course(1, args.groups, args.assignments // args.groups))
+    tracing.disable()
+    scrape_and_calculate(page)  # warm up
+    null_span = measure(lambda: tracing.span("parse", bytes=0).__enter__().__exit__(None, None, None))
+    disabled = measure(lambda: scrape_and_calculate(page))
+    tracing.enable()
+    enabled = measure(lambda: scrape_and_calculate(page))
+    tracing.reset()
+    print(f"no-op span            {null_span['min'] * 1e9:8.0f} ns")
+    print(f"parse+compute (off)   {disabled['min'] * 1000:8.3f} ms")
+    print(f"parse+compute (on)    {enabled['min'] * 1000:8.3f} ms "
+          f"({(enabled['min'] / disabled['min'] - 1) * 100:+.1f}%)")
+
+    with StubCanvas(make_courses(args.courses, 4, 10), latency=args.latency) as stub:
+        api = CanvasAPI(stub.url, stub.cookies)
+        with tracing.span("navigation"):
+            course_ids = list(api.get_active_courses().values())
+        for _, grades, error in api.iter_course_grades(course_ids):
+            calculate_course(grades)
+        api.close()
+    tracing.disable()
+    print()
+    print(tracing.summary_table())
+    if args.output:
+        tracing.export_chrome_trace(args.output)
+        print(f"Trace written to {args.output}")
+
+
+def measure(func, repeat=7, number=None):
+    """
+    Helper Method.
+    Times a function like timeit
+
+    :param func: function without arguments
+    :param repeat: number of timings
+    :param number: calls per timing (by default, enough calls for a timing to take 20 ms)
+    :return: dictionary with the median and min time of one call (seconds)
+    """
+    if number is None:
+        number = timeit.Timer(func).autorange()[0] // 10 or 1
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        timings.append((time.perf_counter() - start) / number)
+    return {"median": statistics.median(timings), "min": min(timings)}
+
+
+def run_suite(sizes, courses, repeat):
+    """
+    Measures parse time, compute time, helper time, peak memory and end-to-end per-course latency
+    on generated grades pages of every size
+
+    :param sizes: list of tuples (groups, assignments per group)
+    :param courses: number of courses fetched for the end-to-end latency
+    :param repeat: number of timings per measure
+    :return: dictionary {benchmark name: {"median": ..., "min": ...}} (seconds, or bytes for memory)
+    """
+    results = {}
+    for n_groups, n_assignments in sizes:
+        size = f"{n_groups}x{n_assignments}"
+        page = render_grades_page(make_course(1, n_groups, n_assignments))
+        grades = parse_grades_page(page)
+        tr_ids = re.findall(r'<tr[^>]* id="([^"]+)"', page)
+        score_tokens = [str(score) for score in grades.assignments.student_score_list] + ["-", "N/A"]
+
+        results[f"parse[{size}]"] = measure(lambda: parse_grades_page(page), repeat)
+        results[f"compute[{size}]"] = measure(lambda: calculate_course(grades), repeat)
+        results[f"start_with_illegal_val[{size}]"] = measure(lambda: [start_with_illegal_val(i) for i in tr_ids],
+                                                             repeat)
+        results[f"is_number[{size}]"] = measure(lambda: [is_number(t) for t in score_tokens], repeat)
+
+        tracemalloc.start()
+        scrape_and_calculate(page)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        results[f"peak_python_memory[{size}]"] = {"median": peak, "min": peak}
+
+        with StubCanvas(make_courses(courses, n_groups, n_assignments)) as canvas:
+            session = requests.Session()
+            for cookie in canvas.cookies:
+                session.cookies.set(cookie["name"], cookie["value"])
+
+            def end_to_end():
+                for course_id in canvas.courses:
+                    scrape_and_calculate(session.get(f"{canvas.url}/courses/{course_id}/grades").text)
+
+            latency = measure(end_to_end, repeat)
+            results[f"end_to_end_per_course[{size}]"] = {key: value / courses for key, value in latency.items()}
+            session.close()
+    return results
+
+
+def bench_suite(args):
+    """
+    Runs the benchmark suite, optionally saving the results (per commit) and comparing them with saved ones
+
+    :param args: parsed command line arguments
+    :return: None
+    """
+    sizes = [tuple(int(n) for n in size.split("x")) for size in args.sizes]
+    results = run_suite(sizes, args.courses, args.repeat)
+
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or "unknown"
+    except OSError:
+        commit = "unknown"
+    report = {"commit": commit, "date": time.strftime("%Y-%m-%dT%H:%M:%S"), "python": platform.python_version(),
+              "machine": platform.machine(), "results": results}
+
+    saved = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            saved = json.load(f)
+
+    regressions = 0
+    print(f"{'benchmark':40} {'median':>12} " + (f"{'saved':>12} {'ratio':>7}" if saved else ""))
+    for name, value in results.items():
+        unit = 1 if name.startswith("peak") else 1e6  # bytes, or microseconds
+        line = f"{name:40} {value['median'] * unit:12.1f} "
+        if saved and name in saved["results"]:
+            before = saved["results"][name]["median"]
+            # the best timing is the least noisy one to compare
+            ratio = value["min"] / saved["results"][name]["min"] if saved["results"][name]["min"] else float("inf")
+            line += f"{before * unit:12.1f} {ratio:7.2f}"
+            if ratio > args.threshold:
+                line += "  REGRESSION"
+                regressions += 1
+        print(line)
+
+    if args.save is not None:
+        path = args.save or os.path.join(os.path.dirname(os.path.abspath(__file__)), ".benchmarks",
+                                         f"{commit}.json")
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Saved to {path}")
+    if regressions:
+        print(f"{regressions} regression(s) against {saved['commit']}")
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    subparsers = parser.add_subparsers(dest="benchmark", required=True)
+
+    api_parser = subparsers.add_parser("api", help="Canvas API session vs. Selenium page rendering")
+    api_parser.add_argument("--courses", type=int, default=8)
+    api_parser.add_argument("--groups", type=int, default=4)
+    api_parser.add_argument("--assignments", type=int, default=10)
+    api_parser.add_argument("--repeat", type=int, default=5)
+    api_parser.set_defaults(func=bench_api)
+
+    concurrency_parser = subparsers.add_parser("concurrency", help="Sequential vs. concurrent course fetching")
+    concurrency_parser.add_argument("--courses", type=int, default=8)
+    concurrency_parser.add_argument("--workers", type=int, default=MAX_CONCURRENT_FETCHES)
+    concurrency_parser.add_argument("--latency", type=float, default=0.1, help="seconds added to every request")
+    concurrency_parser.set_defaults(func=bench_concurrency)
+
+    stress_parser = subparsers.add_parser("stress", help="Concurrent course computations (checks every result)")
+    stress_parser.add_argument("--courses", type=int, default=40)
+    stress_parser.add_argument("--computations", type=int, default=200)
+    stress_parser.add_argument("--workers", type=int, default=32)
+    stress_parser.set_defaults(func=bench_stress)
+
+    parser_parser = subparsers.add_parser("parser", help="lxml grades page parser vs. BeautifulSoup")
+    parser_parser.add_argument("--groups", type=int, default=8)
+    parser_parser.add_argument("--assignments", type=int, default=600)
+    parser_parser.add_argument("--repeat", type=int, default=10)
+    parser_parser.set_defaults(func=bench_parser)
+
+    kernel_parser = subparsers.add_parser("kernel", help="numpy grade kernel vs. pandas")
+    kernel_parser.add_argument("--sizes", type=int, nargs="+", default=[1, 100, 10000])
+    kernel_parser.add_argument("--pandas-limit", type=int, default=500)
+    kernel_parser.set_defaults(func=bench_kernel)
+
+    cache_parser = subparsers.add_parser("cache", help="On-disk grade cache with conditional revalidation")
+    cache_parser.add_argument("--courses", type=int, default=8)
+    cache_parser.add_argument("--latency", type=float, default=0.02, help="seconds added to every request")
+    cache_parser.set_defaults(func=bench_cache)
+
+    batch_parser = subparsers.add_parser("batch", help="Batch command line tool scaling with processes")
+    batch_parser.add_argument("--pages", type=int, default=500)
+    batch_parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, os.cpu_count()])
+    batch_parser.set_defaults(func=bench_batch)
+
+    suite_parser = subparsers.add_parser("suite", help="Parse/compute/memory/end-to-end suite, saved per commit")
+    suite_parser.add_argument("--sizes", nargs="+", default=["2x5", "4x10", "8x25", "8x75"],
+                              help="page sizes as <groups>x<assignments per group>")
+    suite_parser.add_argument("--courses", type=int, default=8, help="courses fetched for end-to-end latency")
+    suite_parser.add_argument("--repeat", type=int, default=7)
+    suite_parser.add_argument("--save", nargs="?", const="", default=None,
+                              help="save the results (default: .benchmarks/<commit>.json)")
+    suite_parser.add_argument("--compare", help="saved results to compare with")
+    suite_parser.add_argument("--threshold", type=float, default=1.5, help="slowdown ratio reported as regression")
+    suite_parser.set_defaults(func=bench_suite)
+
+    startup_parser = subparsers.add_parser("startup", help="Import time of the GUI before the login window")
+    startup_parser.add_argument("--repeat", type=int, default=5)
+    startup_parser.add_argument("--budget", type=float, default=250, help="import time budget in ms")
+    startup_parser.add_argument("--top", type=int, default=8, help="number of direct imports listed")
+    startup_parser.set_defaults(func=bench_startup)
+
+    waits_parser = subparsers.add_parser("waits", help="Login polling loops vs. backoff waits on a fake driver")
+    waits_parser.add_argument("--delays", type=float, nargs="+", default=[0.05, 0.3, 1.0, 5.0, 20.0],
+                              help="seconds between submitting the password and the outcome")
+    waits_parser.add_argument("--form-delay", type=float, default=0.35, help="seconds before the login form loads")
+    waits_parser.add_argument("--round-trip", type=float, default=0.003, help="seconds taken by a driver call")
+    waits_parser.set_defaults(func=bench_waits)
+
+    session_parser = subparsers.add_parser("session", help="Saved session paths and returning-user start time")
+    session_parser.add_argument("--courses", type=int, default=8)
+    session_parser.add_argument("--latency", type=float, default=0.05, help="seconds added to every stub response")
+    session_parser.add_argument("--repeat", type=int, default=5)
+    session_parser.add_argument("--browser-start", type=float, default=3.0, help="seconds to start Chrome")
+    session_parser.add_argument("--duo", type=float, default=10.0, help="seconds to approve the Duo push")
+    session_parser.set_defaults(func=bench_session)
+
+    pool_parser = subparsers.add_parser("pool", help="Browser pool with blocked resources vs. a single browser")
+    pool_parser.add_argument("--courses", type=int, default=24)
+    pool_parser.add_argument("--sizes", type=int, nargs="+", default=[2, 4])
+    pool_parser.add_argument("--latency", type=float, default=0.05, help="seconds added to every stub response")
+    pool_parser.add_argument("--asset-latency", type=float, default=0.03, help="extra seconds for every resource")
+    pool_parser.add_argument("--chrome", action="store_true", help="use headless Chrome instead of FakeBrowser")
+    pool_parser.set_defaults(func=bench_pool)
+
+    streaming_parser = subparsers.add_parser("streaming", help="Courses shown as they complete vs. after the last")
+    streaming_parser.add_argument("--courses", type=int, default=60)
+    streaming_parser.add_argument("--workers", type=int, default=MAX_CONCURRENT_FETCHES)
+    streaming_parser.add_argument("--latency", type=float, default=0.1, help="seconds added to every stub response")
+    streaming_parser.set_defaults(func=bench_streaming)
+
+    projection_parser = subparsers.add_parser("projection", help="Incremental what-if projection vs. recomputing")
+    projection_parser.add_argument("--groups", type=int, default=8)
+    projection_parser.add_argument("--assignments", type=int, default=600)
+    projection_parser.add_argument("--target", type=float, default=90.0, help="target grade solved for")
+    projection_parser.set_defaults(func=bench_projection)
+
+    history_parser = subparsers.add_parser("history", help="Grade history ingest rate, size and query latency")
+    history_parser.add_argument("--courses", type=int, default=8)
+    history_parser.add_argument("--snapshots", type=int, default=2000, help="runs recorded per course")
+    history_parser.add_argument("--change-rate", type=float, default=0.2, help="chance a course changed between runs")
+    history_parser.set_defaults(func=bench_history)
+
+    watch_parser = subparsers.add_parser("watch", help="Refresh scheduler: idle checks and change detection")
+    watch_parser.add_argument("--courses", type=int, default=8)
+    watch_parser.add_argument("--checks", type=int, default=20, help="checks while nothing changes")
+    watch_parser.set_defaults(func=bench_watch)
+
+    loadtest_parser = subparsers.add_parser("loadtest", help="Load test of the JSON/HTTP service (grade_server.py)")
+    loadtest_parser.add_argument("--url", help="root url of a running server (default: serve a stub Canvas)")
+    loadtest_parser.add_argument("--courses", type=int, default=8)
+    loadtest_parser.add_argument("--clients", type=int, default=100, help="concurrent connections")
+    loadtest_parser.add_argument("--requests", type=int, default=50, help="requests per connection")
+    loadtest_parser.add_argument("--revalidate", type=float, default=0.5, help="fraction sent with If-None-Match")
+    loadtest_parser.add_argument("--latency", type=float, default=0.1, help="seconds added to every stub response")
+    loadtest_parser.add_argument("--ttl", type=float, default=60, help="seconds the server caches a course")
+    loadtest_parser.set_defaults(func=bench_loadtest)
+
+    gradebook_parser = subparsers.add_parser("gradebook", help="Streaming statistics of a gradebook CSV export")
+    gradebook_parser.add_argument("--students", type=int, default=50000)
+    gradebook_parser.add_argument("--groups", type=int, default=5)
+    gradebook_parser.add_argument("--assignments", type=int, default=40, help="assignments per group")
+    gradebook_parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="students per chunk")
+    gradebook_parser.set_defaults(func=bench_gradebook)
+
+    columns_parser = subparsers.add_parser("columns", help="Memory per assignment row: lists, columns, dataframe")
+    columns_parser.add_argument("--courses", type=int, default=200)
+    columns_parser.add_argument("--groups", type=int, default=6)
+    columns_parser.add_argument("--assignments", type=int, default=30, help="assignments per group")
+    columns_parser.set_defaults(func=bench_columns)
+
+    pipeline_parser = subparsers.add_parser("pipeline", help="Overlapped fetch/parse/compute/render with 1 browser")
+    pipeline_parser.add_argument("--courses", type=int, default=30)
+    pipeline_parser.add_argument("--groups", type=int, default=8)
+    pipeline_parser.add_argument("--assignments", type=int, default=40, help="assignments per group")
+    pipeline_parser.add_argument("--latency", type=float, default=0.1, help="seconds to load a page")
+    pipeline_parser.add_argument("--repeat", type=int, default=3, help="runs per configuration (best one kept)")
+    pipeline_parser.set_defaults(func=bench_pipeline)
+
+    tracing_parser = subparsers.add_parser("tracing", help="Overhead of the phase instrumentation, traced run")
+    tracing_parser.add_argument("--groups", type=int, default=8)
+    tracing_parser.add_argument("--assignments", type=int, default=200)
+    tracing_parser.add_argument("--courses", type=int, default=8)
+    tracing_parser.add_argument("--latency", type=float, default=0.02, help="seconds added to every stub response")
+    tracing_parser.add_argument("--output", help="write the Chrome trace of the traced run to this file")
+    tracing_parser.set_defaults(func=bench_tracing)
+
+    arguments = parser.parse_args()
+    arguments.func(arguments)
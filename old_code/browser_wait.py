@@ -0,0 +1,143 @@
+#!/usr/bin/env python
+
+"""browser_wait.py: Waits on the webdriver with adaptive backoff and hard deadlines, and the conditions of the login"""
+
+__author__ = "Leo Shen, Dhruba Paul"
+__copyright__ = "Copyright 2022, Canvas Course Mean Project"
+
+import time
+from selenium.common.exceptions import TimeoutException, WebDriverException
+from selenium.webdriver.common.by import By
+
+# Deadlines (seconds)
+LOGIN_FORM_TIMEOUT = 30
+LOGIN_OUTCOME_TIMEOUT = 120  # Duo itself gives up after 60 seconds
+COURSE_LIST_TIMEOUT = 20
+
+# Outcomes of a login attempt (see LoginOutcome)
+BAD_PASSWORD = "bad_password"
+DUO_TIMED_OUT = "duo_timed_out"
+DUO_DENIED = "duo_denied"
+LOGGED_IN = "logged_in"
+
+DUO_MESSAGES = {"Login timed out.": DUO_TIMED_OUT, "Login request denied.": DUO_DENIED}
+LOGIN_FORM_SCRIPT = ("return [document.getElementsByTagName('input')[0] || null, "
+                     "document.getElementsByName('j_password')[0] || null];")
+LOGIN_STATE_SCRIPT = ("return [document.getElementById('dashboard_header_container') !== null, "
+                      "document.getElementsByTagName('strong').length > 0, document.getElementById('duo_iframe')];")
+DUO_MESSAGES_SCRIPT = ("return Array.from(document.querySelectorAll('#messages-view > div > div > div > span'), "
+                       "span => span.textContent);")
+COURSE_LIST_XPATH = "/html/body/div[3]/span/span/div/div/div/div/div/ul[1]//a"
+
+
+class BackoffWait:
+    """
+    Same use as selenium's WebDriverWait (wait.until(condition)), but polls quickly at first and backs off
+    while nothing happens, so that fast transitions are seen right away and slow ones (a user accepting
+    a Duo push) do not cost a driver round-trip every few milliseconds.
+    """
+
+    def __init__(self, driver, timeout, initial_interval=0.01, max_interval=0.075, factor=1.5,
+                 ignored_exceptions=(WebDriverException,), clock=time.monotonic, sleep=time.sleep):
+        """
+        :param driver: selenium webdriver (or anything the conditions take)
+        :param timeout: seconds before giving up (TimeoutException)
+        :param initial_interval: seconds between the first two checks
+        :param max_interval: cap of the seconds between two checks
+        :param factor: growth of the interval after every unsuccessful check
+        :param ignored_exceptions: exceptions of the condition counted as "not yet"
+        :param clock: monotonic clock (injectable for tests)
+        :param sleep: sleep function (injectable for tests)
+        """
+        self.driver = driver
+        self.timeout = timeout
+        self.initial_interval = initial_interval
+        self.max_interval = max_interval
+        self.factor = factor
+        self.ignored_exceptions = tuple(ignored_exceptions)
+        self.clock = clock
+        self.sleep = sleep
+        self.checks = 0  # number of times a condition was evaluated
+
+    def until(self, condition, message=""):
+        """
+        Evaluates condition(driver) until it returns a truthy value
+
+        :param condition: function of the driver
+        :param message: message of the TimeoutException
+        :return: the first truthy value returned by condition
+        """
+        deadline = self.clock() + self.timeout
+        interval = self.initial_interval
+        while True:
+            self.checks += 1
+            try:
+                value = condition(self.driver)
+                if value:
+                    return value
+            except self.ignored_exceptions:
+                pass
+            remaining = deadline - self.clock()
+            if remaining <= 0:
+                raise TimeoutException(message or f"condition not met after {self.timeout} seconds")
+            self.sleep(min(interval, remaining))
+            interval = min(interval * self.factor, self.max_interval)
+
+
+def login_form(dvr):
+    """
+    Condition: the Net ID and password inputs of the login page (looked up in a single round-trip)
+
+    :param dvr: selenium webdriver
+    :return: A tuple (Net ID input, password input), False if they are not on the page yet
+    """
+    input_net_id, input_password = dvr.execute_script(LOGIN_FORM_SCRIPT)
+    return (input_net_id, input_password) if input_net_id is not None and input_password is not None else False
+
+
+class LoginOutcome:
+    """
+    Condition: how the login ended. The error message, the dashboard and the Duo iframe are looked up in a single
+    round-trip. Entering the Duo iframe takes three more, so its messages are only read every duo_check_interval.
+    """
+
+    def __init__(self, duo_check_interval=0.1, clock=time.monotonic):
+        """
+        :param duo_check_interval: seconds between two reads of the Duo messages
+        :param clock: monotonic clock (injectable for tests)
+        """
+        self.duo_check_interval = duo_check_interval
+        self.clock = clock
+        self.next_duo_check = None
+
+    def __call__(self, dvr):
+        """
+        :param dvr: selenium webdriver
+        :return: BAD_PASSWORD, DUO_TIMED_OUT, DUO_DENIED or LOGGED_IN, False while the login is still going on
+        """
+        logged_in, bad_password, iframe = dvr.execute_script(LOGIN_STATE_SCRIPT)
+        if logged_in:
+            return LOGGED_IN
+        if bad_password:
+            return BAD_PASSWORD
+        if iframe is None or (self.next_duo_check is not None and self.clock() < self.next_duo_check):
+            return False
+        self.next_duo_check = self.clock() + self.duo_check_interval
+        dvr.switch_to.frame(iframe)
+        try:
+            for text in dvr.execute_script(DUO_MESSAGES_SCRIPT):
+                if text in DUO_MESSAGES:
+                    return DUO_MESSAGES[text]
+        finally:
+            dvr.switch_to.parent_frame()
+        return False
+
+
+def course_list_links(dvr):
+    """
+    Condition: the links of the active courses in the (opened) courses flyout
+
+    :param dvr: selenium webdriver
+    :return: list of anchor elements, False if the flyout has not loaded yet
+    """
+    return dvr.find_elements(by=By.XPATH, value=COURSE_LIST_XPATH) or False
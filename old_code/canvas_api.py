@@ -0,0 +1,347 @@
+#!/usr/bin/env python
+
+"""canvas_api.py: Fetches course lists and grades through the Canvas REST API over a pooled HTTP session"""
+
+__author__ = "Leo Shen, Dhruba Paul"
+__copyright__ = "Copyright 2022, Canvas Course Mean Project"
+
+import json
+import re
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import requests
+from requests.adapters import HTTPAdapter
+import tracing
+from grade_cache import GRADES_FORMAT, grades_from_json, grades_to_json
+from grade_columns import AssignmentBatch, AssignmentBatchBuilder, DROPPED, EXCUSED, UNGRADED
+from grade_parser import CourseGrades
+
+CANVAS_URL = "https://canvas.wisc.edu"
+MAX_CONCURRENT_FETCHES = 6  # courses in flight at once
+REQUEST_TIMEOUT = 10  # seconds to connect, and seconds without a byte of the response, before a request fails
+
+
+def course_id_from_url(url):
+    """
+    Helper Method.
+    Extracts the course id from any canvas course url (home page, grades page, ...)
+
+    :param url: url of the course
+    :return: the course id (string), None if the url is not a course url
+    """
+    match = re.search(r"/courses/(\d+)", url)
+    return match.group(1) if match else None
+
+
+def kept_assignments(candidates, fixed, keep, highest):
+    """
+    Helper Method.
+    Picks the candidates to keep the way Canvas does: the keep candidates that give the group (with its fixed
+    assignments) its highest grade, or its lowest one. Found by Dinkelbach iteration: with q the grade of the last
+    pick, the next pick is the keep candidates of largest (smallest) score - q * points, until q stops improving.
+
+    :param candidates: list of tuples (id, score, points possible > 0) that may be dropped
+    :param fixed: list of tuples (id, score, points possible) that are never dropped
+    :param keep: number of candidates to keep (at least 1)
+    :param highest: True to keep the highest grade of the group, False to keep the lowest one
+    :return: list of the kept candidates
+    """
+    fixed_score = sum(a[1] for a in fixed)
+    fixed_points = sum(a[2] for a in fixed)
+
+    def grade(kept):
+        return (fixed_score + sum(a[1] for a in kept)) / (fixed_points + sum(a[2] for a in kept))
+
+    kept = sorted(candidates, key=lambda a: a[1] / a[2], reverse=highest)[:keep]
+    q = grade(kept)
+    while True:
+        pick = sorted(candidates, key=lambda a: a[1] - q * a[2], reverse=highest)[:keep]
+        new_q = grade(pick)
+        if new_q <= q if highest else new_q >= q:
+            return kept
+        kept, q = pick, new_q
+
+
+def dropped_assignments(group, assignments):
+    """
+    Helper Method.
+    Applies the drop rules of an assignment group the way Canvas does: the lowest drops are the ones that give the
+    group its highest grade, then the highest drops (among what is left) the ones that give it its lowest grade.
+    With mixed points possible, these are not always the assignments of lowest/highest percentage.
+
+    :param group: assignment group (JSON)
+    :param assignments: list of assignments (JSON) belonging to the group
+    :return: set of ids of the dropped assignments
+    """
+    rules = group.get("rules") or {}
+    never_drop = set(rules.get("never_drop", []))
+    graded = [(a["id"], a["submission"]["score"], a["points_possible"]) for a in assignments
+              if (a.get("submission") or {}).get("score") is not None
+              and not (a.get("submission") or {}).get("excused") and a.get("points_possible")]
+    fixed = [a for a in graded if a[0] in never_drop]
+    candidates = [a for a in graded if a[0] not in never_drop]
+    if not candidates:
+        return set()
+
+    # Same adjustments as Canvas when there are not enough assignments for the rules
+    drop_lowest = min(rules.get("drop_lowest", 0), len(candidates) - 1)
+    drop_highest = rules.get("drop_highest", 0)
+    if drop_lowest + drop_highest >= len(candidates):
+        drop_highest = 0
+
+    kept = kept_assignments(candidates, fixed, len(candidates) - drop_lowest, True) if drop_lowest else candidates
+    if drop_highest:
+        kept = kept_assignments(kept, fixed, len(kept) - drop_highest, False)
+    return {a[0] for a in candidates} - {a[0] for a in kept}
+
+
+def grade_stages(api, max_workers=None, compute=None):
+    """
+    Stages of a pipeline.Pipeline fetching courses by id: the grades of every course are fetched as JSON, and
+    computed as soon as they arrive
+
+    :param api: CanvasAPI object
+    :param max_workers: maximum number of courses fetched at the same time (defaults to MAX_CONCURRENT_FETCHES)
+    :param compute: function of the CourseGrades run by the compute stage (defaults to grade_calc.compute_grades)
+    :return: list of Stage
+    """
+    from grade_calc import compute_grades
+    from pipeline import COMPUTE_WORKERS, Stage
+    return [Stage("fetch", api.get_course_grades, max_workers or MAX_CONCURRENT_FETCHES),
+            Stage("compute", compute or compute_grades, COMPUTE_WORKERS)]
+
+
+class CanvasAPI:
+    """
+    Canvas REST API client.
+
+    Reuses the session cookies of a logged in webdriver, and keeps its connections alive in a pool so that
+    every request after the first skips the TCP/TLS handshake.
+    """
+
+    def __init__(self, base_url=CANVAS_URL, cookies=(), pool_size=10, cache=None):
+        """
+        :param base_url: root url of the canvas instance
+        :param cookies: list of cookies (same shape as selenium's driver.get_cookies())
+        :param pool_size: maximum number of connections kept alive
+        :param cache: GradeCache for the responses and parsed grades, None to always fetch
+        """
+        self.base_url = base_url.rstrip("/")
+        self.cache = cache
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update({"Accept": "application/json"})
+        # Proxy and CA bundle settings of the environment are read once, instead of on every request
+        settings = self.session.merge_environment_settings(self.base_url, {}, None, None, None)
+        self.session.proxies.update(settings["proxies"])
+        self.session.verify = settings["verify"]
+        self.session.trust_env = False
+        self.decoded = {}  # url: JSON of the cached page, reused while the page does not change
+        for cookie in cookies:
+            self.session.cookies.set(cookie["name"], cookie["value"], path=cookie.get("path", "/"))
+
+    @classmethod
+    def from_driver(cls, dvr, base_url=CANVAS_URL, pool_size=10, cache=None):
+        """
+        Creates an API client authenticated with the cookies of a logged in webdriver
+
+        :param dvr: selenium webdriver object (after login_canvas succeeded)
+        :param base_url: root url of the canvas instance
+        :param pool_size: maximum number of connections kept alive
+        :param cache: GradeCache for the responses and parsed grades, None to always fetch
+        :return: CanvasAPI object
+        """
+        return cls(base_url, dvr.get_cookies(), pool_size, cache)
+
+    def get_page(self, url, params=None):
+        """
+        GETs one page, going through the cache when there is one: entries younger than the cache's TTL are used
+        without a request, older ones are revalidated with If-None-Match/If-Modified-Since when possible.
+
+        :param url: url of the page
+        :param params: dictionary of query parameters
+        :return: A tuple (body, url of the next page or None, True if the body changed since it was cached)
+        """
+        if self.cache is None:
+            with tracing.span("request", "network", url=url) as request_span:
+                response = self.session.get(url, params=params, timeout=REQUEST_TIMEOUT)
+                request_span.set(status=response.status_code, bytes=len(response.content))
+            response.raise_for_status()
+            return response.text, response.links.get("next", {}).get("url"), True
+
+        key = requests.Request("GET", url, params=params).prepare().url
+        entry = self.cache.get(key)
+        if entry is not None and self.cache.is_fresh(entry):
+            self.cache.record("hit", len(entry.payload))
+            return entry.payload, entry.next_url, False
+
+        headers = {}
+        if entry is not None and entry.etag:
+            headers["If-None-Match"] = entry.etag
+        if entry is not None and entry.last_modified:
+            headers["If-Modified-Since"] = entry.last_modified
+        with tracing.span("request", "network", url=key) as request_span:
+            response = self.session.get(key, headers=headers, timeout=REQUEST_TIMEOUT)
+            request_span.set(status=response.status_code, bytes=len(response.content))
+        if response.status_code == 304 and entry is not None:
+            self.cache.refresh(key)
+            self.cache.record("not_modified", len(entry.payload))
+            return entry.payload, entry.next_url, False
+
+        response.raise_for_status()
+        next_url = response.links.get("next", {}).get("url")
+        self.cache.put(key, response.text, None, response.headers.get("ETag"),
+                       response.headers.get("Last-Modified"), next_url)
+        self.cache.record("miss")
+        return response.text, next_url, True
+
+    def get_json_changed(self, path, params=None):
+        """
+        GETs an API endpoint and follows the pagination links
+
+        :param path: path of the endpoint (e.g. "/api/v1/courses")
+        :param params: dictionary of query parameters
+        :return: A tuple (the decoded JSON (lists are concatenated over all pages), True if any page changed)
+        """
+        url = self.base_url + path
+        params = dict(params or {}, per_page=100)
+        pages = []
+        changed = False
+        while url is not None:
+            key = (url, repr(params))
+            text, url, page_changed = self.get_page(url, params)
+            changed = changed or page_changed
+            if page_changed or key not in self.decoded:
+                # Canvas prefixes cookie authenticated JSON with "while(1);"
+                if text.startswith("while(1);"):
+                    text = text[len("while(1);"):]
+                self.decoded[key] = json.loads(text)
+            data = self.decoded[key]
+            if not isinstance(data, list):
+                return data, changed
+            pages.extend(data)
+            params = None  # the next link already holds the query
+        return pages, changed
+
+    def get_json(self, path, params=None):
+        """
+        GETs an API endpoint and follows the pagination links
+
+        :param path: path of the endpoint (e.g. "/api/v1/courses")
+        :param params: dictionary of query parameters
+        :return: the decoded JSON (lists are concatenated over all pages)
+        """
+        return self.get_json_changed(path, params)[0]
+
+    def is_authenticated(self):
+        """
+        Checks the session cookies with one cheap request (the profile of the user, never cached)
+
+        :return: True if Canvas accepts the session, False if it rejects it, None if Canvas could not be reached
+        """
+        try:
+            response = self.session.get(self.base_url + "/api/v1/users/self", timeout=REQUEST_TIMEOUT)
+        except requests.RequestException:
+            return None
+        if response.status_code in (401, 403):
+            return False
+        return True if response.ok else None
+
+    def get_active_courses(self):
+        """
+        Lists all active courses of the student
+
+        :return: dictionary {course name: course id}
+        """
+        courses = self.get_json("/api/v1/courses", {"enrollment_state": "active"})
+        return {course["name"]: str(course["id"]) for course in courses if "name" in course}
+
+    def get_course_grades(self, course_id):
+        """
+        Fetches everything scrape_and_calculate would read from the grades page of a course
+
+        :param course_id: id of the course
+        :return: CourseGrades
+        """
+        with tracing.span("fetch", "network", course_id=course_id):
+            return self._fetch_course_grades(course_id)
+
+    def _fetch_course_grades(self, course_id):
+        course, course_changed = self.get_json_changed(f"/api/v1/courses/{course_id}",
+                                                       {"include[]": "total_scores"})
+
+        canvas_grade = None
+        for enrollment in course.get("enrollments", []):
+            if enrollment.get("type") == "student" and enrollment.get("computed_current_score") is not None:
+                canvas_grade = ("%.2f" % enrollment["computed_current_score"]).rstrip("0").rstrip(".") + "%"
+
+        if not course.get("apply_assignment_group_weights"):
+            return CourseGrades(course["name"], canvas_grade, None, AssignmentBatch())
+
+        groups, groups_changed = self.get_json_changed(f"/api/v1/courses/{course_id}/assignment_groups")
+        assignments, assignments_changed = self.get_json_changed(f"/api/v1/courses/{course_id}/assignments",
+                                                                 {"include[]": ["submission", "score_statistics"]})
+
+        # Nothing changed since the grades were cached: skipping the work below
+        # (grades of an older layout are never looked up again and get evicted)
+        parsed_key = f"{self.base_url}/courses/{course_id}/grades#parsed-v{GRADES_FORMAT}"
+        if self.cache is not None and not (course_changed or groups_changed or assignments_changed):
+            entry = self.cache.get(parsed_key)
+            if entry is not None and entry.parsed is not None:
+                return grades_from_json(entry.parsed)
+
+        # Groups are keyed by id: groups sharing a name are told apart by their id (instead of being merged)
+        name_counts = Counter(group["name"] for group in groups)
+        group_names = {group["id"]: group["name"] if name_counts[group["name"]] == 1
+                       else f"{group['name']} ({group['id']})" for group in groups}
+        group_weights = {group_names[group["id"]]: group["group_weight"] for group in groups}
+        dropped = set()
+        for group in groups:
+            dropped |= dropped_assignments(group, [a for a in assignments if a["assignment_group_id"] == group["id"]])
+
+        rows = AssignmentBatchBuilder()
+        for assignment in assignments:
+            if assignment["assignment_group_id"] not in group_names:
+                continue
+            submission = assignment.get("submission") or {}
+            statistics = assignment.get("score_statistics") or {}
+            score = submission.get("score")
+            flags = (EXCUSED if submission.get("excused") else 0) | (DROPPED if assignment["id"] in dropped else 0) | \
+                (UNGRADED if score is None else 0)
+            rows.add(group_names[assignment["assignment_group_id"]], float(assignment.get("points_possible") or 0),
+                     0.0 if score is None else float(score), flags, int(assignment["id"]))
+            rows.add_mean(float(statistics.get("mean", 0)))
+
+        grades = CourseGrades(course["name"], canvas_grade, group_weights, rows.build())
+        if self.cache is not None:
+            self.cache.put(parsed_key, "", grades_to_json(grades))
+        return grades
+
+    def iter_course_grades(self, course_ids, max_workers=MAX_CONCURRENT_FETCHES):
+        """
+        Fetches the grades of many courses concurrently (at most max_workers in flight at once),
+        yielding each course as soon as its fetch completes.
+
+        A failing course does not stop the others: its exception is yielded in place of its grades.
+
+        :param course_ids: iterable of course ids
+        :param max_workers: maximum number of courses fetched at the same time
+        :return: generator of tuples (course id, CourseGrades or None, exception or None) in completion order
+        """
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {executor.submit(self.get_course_grades, course_id): course_id for course_id in course_ids}
+            for future in as_completed(futures):
+                try:
+                    yield futures[future], future.result(), None
+                except Exception as e:
+                    yield futures[future], None, e
+
+    def close(self):
+        """
+        Closes every pooled connection
+
+        :return: None
+        """
+        self.session.close()
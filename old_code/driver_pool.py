@@ -0,0 +1,147 @@
+#!/usr/bin/env python
+
+"""driver_pool.py: Pool of headless browsers sharing the login cookies, loading only what the grades scraper reads"""
+
+__author__ = "Leo Shen, Dhruba Paul"
+__copyright__ = "Copyright 2022, Canvas Course Mean Project"
+
+import queue
+import subprocess
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import tracing
+
+DEFAULT_POOL_SIZE = 3  # every headless Chrome costs a few hundred MB
+
+# Requests the browsers drop (Chrome DevTools Network.setBlockedURLs patterns): page_source never needs them
+BLOCKED_URL_PATTERNS = ["*.png", "*.jpg", "*.jpeg", "*.gif", "*.svg", "*.ico", "*.webp",
+                        "*.woff", "*.woff2", "*.ttf", "*.otf", "*.eot", "*.css", "*.mp4", "*.webm",
+                        "*google-analytics*", "*googletagmanager*", "*doubleclick*", "*/analytics*"]
+
+
+def create_driver(block_resources=True):
+    """
+    Starts a headless Chrome for fetching pages: page loads return at DOMContentLoaded (eager strategy) and, when
+    block_resources is set, images, fonts, stylesheets, media and analytics are never downloaded
+
+    :param block_resources: blocks the non-essential resources
+    :return: selenium webdriver
+    """
+    from selenium import webdriver
+    from selenium.webdriver.chrome.options import Options
+    from selenium.webdriver.chrome.service import Service as ChromeService
+
+    options = Options()
+    options.add_argument("--headless=new")
+    options.page_load_strategy = "eager"
+    if block_resources:
+        options.add_experimental_option("prefs", {"profile.managed_default_content_settings.images": 2})
+    chrome_service = ChromeService('chromedriver')
+    chrome_service.creationflags = getattr(subprocess, "CREATE_NO_WINDOW", 0)  # only available in windows
+    dvr = webdriver.Chrome(options=options, service=chrome_service)
+    if block_resources:
+        dvr.execute_cdp_cmd("Network.enable", {})
+        dvr.execute_cdp_cmd("Network.setBlockedURLs", {"urls": BLOCKED_URL_PATTERNS})
+    return dvr
+
+
+class DriverPool:
+    """
+    N browsers logged in with the same cookies. Pages are handed to whichever browser is free.
+
+    Usage:
+        with DriverPool(3, dvr.get_cookies()) as pool:
+            for url, html, error in pool.fetch_pages(urls):
+                ...
+    """
+
+    def __init__(self, size=DEFAULT_POOL_SIZE, cookies=(), base_url=None, driver_factory=create_driver,
+                 block_resources=True):
+        """
+        :param size: number of browsers
+        :param cookies: cookies of the logged in session (same shape as selenium's driver.get_cookies())
+        :param base_url: root url of the canvas instance the cookies belong to (defaults to canvas_api.CANVAS_URL)
+        :param driver_factory: function of block_resources starting one browser
+        :param block_resources: blocks the non-essential resources (see create_driver)
+        """
+        if base_url is None:
+            from canvas_api import CANVAS_URL
+            base_url = CANVAS_URL
+        self.base_url = base_url.rstrip("/")
+        self.cookies = list(cookies)
+        self.free = queue.Queue()
+        self.drivers = []
+        self.executor = ThreadPoolExecutor(max_workers=size)
+
+        # Starting the browsers in parallel (all of them are quit again if any fails to start)
+        futures = [self.executor.submit(self._start, driver_factory, block_resources) for _ in range(size)]
+        errors = [future.exception() for future in futures if future.exception() is not None]
+        for future in futures:
+            if future.exception() is None:
+                self.drivers.append(future.result())
+                self.free.put(future.result())
+        if errors:
+            self.close()
+            raise errors[0]
+
+    def _start(self, driver_factory, block_resources):
+        """
+        Helper Method.
+        Starts a browser and gives it the session cookies
+
+        :return: selenium webdriver
+        """
+        with tracing.span("browser start", "browser"):
+            dvr = driver_factory(block_resources)
+            if self.cookies:
+                dvr.get(self.base_url + "/robots.txt")  # cookies can only be set on a page of their domain
+                for cookie in self.cookies:
+                    dvr.add_cookie({key: cookie[key] for key in ("name", "value", "path", "secure", "httpOnly",
+                                                                 "expiry") if key in cookie})
+        return dvr
+
+    def fetch_page(self, url):
+        """
+        Loads a page on a free browser (waiting for one if they are all busy)
+
+        :param url: url of the page
+        :return: html of the page
+        """
+        dvr = self.free.get()
+        try:
+            with tracing.span("fetch", "browser", url=url) as fetch_span:
+                dvr.get(url)
+                html = dvr.page_source
+                fetch_span.set(bytes=len(html))
+            return html
+        finally:
+            self.free.put(dvr)
+
+    def fetch_pages(self, urls):
+        """
+        Loads many pages, as many at once as there are browsers
+
+        :param urls: iterable of urls
+        :return: generator of tuples (url, html or None, exception or None), in order of completion
+        """
+        futures = {self.executor.submit(self.fetch_page, url): url for url in urls}
+        for future in as_completed(futures):
+            error = future.exception()
+            yield futures[future], (future.result() if error is None else None), error
+
+    def close(self):
+        """
+        Cancels the pages not started yet and quits every browser
+
+        :return: None
+        """
+        self.executor.shutdown(wait=True, cancel_futures=True)
+        with ThreadPoolExecutor(max_workers=max(len(self.drivers), 1)) as executor:
+            for dvr in self.drivers:
+                executor.submit(dvr.quit)
+        self.drivers = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,223 @@
+#!/usr/bin/env python
+
+"""fake_driver.py: Stand-ins for the selenium webdriver: a scripted login on a virtual clock, and a page loader"""
+
+__author__ = "Leo Shen, Dhruba Paul"
+__copyright__ = "Copyright 2022, Canvas Course Mean Project"
+
+import fnmatch
+import re
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from selenium.common.exceptions import NoSuchElementException
+from selenium.webdriver import Keys
+from selenium.webdriver.common.by import By
+from browser_wait import (DUO_MESSAGES_SCRIPT, LOGIN_FORM_SCRIPT, LOGIN_STATE_SCRIPT, BAD_PASSWORD, DUO_TIMED_OUT,
+                          DUO_DENIED, LOGGED_IN)
+from driver_pool import BLOCKED_URL_PATTERNS
+
+DUO_TEXTS = {DUO_TIMED_OUT: "Login timed out.", DUO_DENIED: "Login request denied."}
+
+
+class FakeClock:
+    """
+    Virtual time: sleeping advances the clock instantly
+    """
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+class FakeElement:
+    """
+    Element of the fake pages
+    """
+
+    def __init__(self, driver, name, text=""):
+        self.driver = driver
+        self.name = name
+        self._text = text
+
+    @property
+    def text(self):
+        self.driver.round_trip()
+        return self._text
+
+    def send_keys(self, *keys):
+        self.driver.round_trip()
+        if self.name == "password" and Keys.RETURN in keys:
+            self.driver.submitted_at = self.driver.clock()
+
+
+class _SwitchTo:
+    def __init__(self, driver):
+        self.driver = driver
+
+    def frame(self, frame):
+        self.driver.round_trip()
+        self.driver.in_duo_frame = True
+
+    def parent_frame(self):
+        self.driver.round_trip()
+        self.driver.in_duo_frame = False
+
+
+class FakeLoginDriver:
+    """
+    Plays the Canvas/Duo login: the login form appears form_delay seconds after the start, and the outcome
+    (LOGGED_IN, BAD_PASSWORD, DUO_TIMED_OUT or DUO_DENIED) outcome_delay seconds after the password is submitted.
+    Every call costs round_trip_cost seconds of virtual time and is counted.
+    """
+
+    def __init__(self, clock, outcome=LOGGED_IN, form_delay=0.3, outcome_delay=1.0, round_trip_cost=0.003):
+        """
+        :param clock: FakeClock
+        :param outcome: how the login ends
+        :param form_delay: seconds before the login form is on the page
+        :param outcome_delay: seconds between submitting the password and the outcome
+        :param round_trip_cost: seconds taken by every driver call
+        """
+        self.clock = clock
+        self.outcome = outcome
+        self.form_delay = form_delay
+        self.outcome_delay = outcome_delay
+        self.round_trip_cost = round_trip_cost
+        self.submitted_at = None
+        self.in_duo_frame = False
+        self.calls = 0
+        self.switch_to = _SwitchTo(self)
+
+    def round_trip(self):
+        self.calls += 1
+        self.clock.sleep(self.round_trip_cost)
+
+    @property
+    def outcome_at(self):
+        """
+        :return: virtual time at which the outcome shows up (None before the password is submitted)
+        """
+        return None if self.submitted_at is None else self.submitted_at + self.outcome_delay
+
+    def _visible(self):
+        """
+        Helper Method.
+        :return: set of the names of the elements currently on the page
+        """
+        now = self.clock()
+        if self.submitted_at is None:
+            return {"input", "password"} if now >= self.form_delay else set()
+        if now < self.outcome_at:
+            return {"duo_iframe", "duo message"}
+        if self.outcome == LOGGED_IN:
+            return {"dashboard_header_container"}
+        if self.outcome == BAD_PASSWORD:
+            return {"strong"}
+        return {"duo_iframe", "duo message", self.outcome}
+
+    def _duo_messages(self, visible):
+        """
+        Helper Method.
+        :return: list of the message elements of the Duo iframe
+        """
+        if "duo message" not in visible:
+            return []
+        return [FakeElement(self, "duo message", next((DUO_TEXTS[name] for name in DUO_TEXTS if name in visible),
+                                                       "Pushed a login request to your device..."))]
+
+    def find_elements(self, by=By.ID, value=None):
+        self.round_trip()
+        visible = self._visible()
+        if self.in_duo_frame:
+            return self._duo_messages(visible)
+        name = "password" if value == "j_password" else value
+        return [FakeElement(self, name)] if name in visible else []
+
+    def find_element(self, by=By.ID, value=None):
+        elements = self.find_elements(by, value)
+        if not elements:
+            raise NoSuchElementException(value)
+        return elements[0]
+
+    def execute_script(self, script, *args):
+        self.round_trip()
+        visible = self._visible()
+        if script == DUO_MESSAGES_SCRIPT:
+            return [element._text for element in self._duo_messages(visible)] if self.in_duo_frame else []
+        if script == LOGIN_FORM_SCRIPT:
+            return [FakeElement(self, name) if name in visible else None for name in ("input", "password")]
+        assert script == LOGIN_STATE_SCRIPT
+        return ["dashboard_header_container" in visible, "strong" in visible,
+                FakeElement(self, "duo_iframe") if "duo_iframe" in visible else None]
+
+
+class FakeBrowser:
+    """
+    Loads pages over HTTP the way a browser does, for the parts that cost time: the page, then its stylesheets,
+    fonts, scripts and images (6 connections at once). With the "normal" page load strategy get() returns once
+    everything is downloaded, with "eager" once the scripts are (DOMContentLoaded). URLs matching the patterns
+    given to Network.setBlockedURLs are never requested.
+    """
+    ASSET = re.compile(r'<(?:link|script|img)\b[^>]*?\b(?:href|src)="([^"]+)"')
+    CONNECTIONS = 6
+
+    def __init__(self, page_load_strategy="normal"):
+        """
+        :param page_load_strategy: "normal" or "eager"
+        """
+        self.page_load_strategy = page_load_strategy
+        self.blocked = []
+        self.session = requests.Session()
+        self.page_source = ""
+        self.requested = 0  # resources downloaded (page included)
+
+    @classmethod
+    def create(cls, block_resources=True):
+        """
+        Same configuration as driver_pool.create_driver (eager page loads, blocked resources)
+
+        :param block_resources: blocks the non-essential resources
+        :return: FakeBrowser
+        """
+        browser = cls("eager")
+        if block_resources:
+            browser.execute_cdp_cmd("Network.setBlockedURLs", {"urls": BLOCKED_URL_PATTERNS})
+        return browser
+
+    def execute_cdp_cmd(self, command, params):
+        if command == "Network.setBlockedURLs":
+            self.blocked = list(params["urls"])
+        return {}
+
+    def _download(self, url):
+        """
+        Helper Method.
+        :return: body of the response
+        """
+        self.requested += 1
+        return self.session.get(url).content
+
+    def get(self, url):
+        response = self.session.get(url)
+        self.requested += 1
+        self.page_source = response.text
+        assets = [requests.compat.urljoin(url, asset) for asset in self.ASSET.findall(self.page_source)]
+        assets = [asset for asset in assets if not any(fnmatch.fnmatch(asset, p) for p in self.blocked)]
+        if self.page_load_strategy == "eager":
+            assets = [asset for asset in assets if asset.endswith(".js")]
+        with ThreadPoolExecutor(max_workers=self.CONNECTIONS) as executor:
+            list(executor.map(self._download, assets))
+
+    def add_cookie(self, cookie):
+        self.session.cookies.set(cookie["name"], cookie["value"], path=cookie.get("path", "/"))
+
+    def get_cookies(self):
+        return [{"name": c.name, "value": c.value, "path": c.path} for c in self.session.cookies]
+
+    def quit(self):
+        self.session.close()
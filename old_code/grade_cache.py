@@ -0,0 +1,202 @@
+#!/usr/bin/env python
+
+"""grade_cache.py: Persistent on-disk cache of fetched Canvas payloads and their parsed grades, with LRU eviction"""
+
+__author__ = "Leo Shen, Dhruba Paul"
+__copyright__ = "Copyright 2022, Canvas Course Mean Project"
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+from grade_columns import AssignmentBatch
+from grade_parser import CourseGrades
+
+DEFAULT_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".canvas_course_mean", "grades_cache.sqlite3")
+DEFAULT_MAX_BYTES = 50 * 1024 * 1024
+DEFAULT_TTL = 5 * 60  # seconds an entry is used without asking the server
+GRADES_FORMAT = 3  # version of the grades_to_json layout, part of the keys of the parsed grades
+
+CacheEntry = namedtuple("CacheEntry", ["key", "payload", "parsed", "etag", "last_modified", "next_url",
+                                       "fetched_at", "size"])
+
+
+def grades_to_json(grades):
+    """
+    Helper Method.
+    Serializes CourseGrades
+
+    :param grades: CourseGrades
+    :return: JSON string
+    """
+    return json.dumps([grades.course_name, grades.canvas_grade, grades.group_weights,
+                       grades.assignments.to_columns()])
+
+
+def grades_from_json(text):
+    """
+    Helper Method.
+    Deserializes CourseGrades
+
+    :param text: JSON string made by grades_to_json (same GRADES_FORMAT)
+    :return: CourseGrades
+    """
+    values = json.loads(text)
+    return CourseGrades(*values[:3], AssignmentBatch.from_columns(values[3]))
+
+
+class GradeCache:
+    """
+    Cache of raw payloads (JSON bodies or grades pages) keyed by url, along with their parsed CourseGrades.
+
+    Entries younger than the TTL are used as is. Older ones are revalidated with their ETag/Last-Modified
+    (see CanvasAPI) or refetched. The least recently used entries are evicted above max_bytes.
+    Lookups only write to the file when something is stored (their access times are kept in memory until then),
+    so a hit costs no disk sync. Safe to share between threads.
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, max_bytes=DEFAULT_MAX_BYTES, ttl=DEFAULT_TTL):
+        """
+        :param path: sqlite file holding the cache (":memory:" for a cache that is not persisted)
+        :param max_bytes: size cap of the payloads and parsed grades kept
+        :param ttl: seconds an entry is used without revalidation
+        """
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode = WAL")
+        self.connection.execute("PRAGMA synchronous = NORMAL")  # durable at checkpoints, enough for a cache
+        self.connection.execute("""CREATE TABLE IF NOT EXISTS entries (
+            key TEXT PRIMARY KEY, payload TEXT, parsed TEXT, etag TEXT, last_modified TEXT, next_url TEXT,
+            fetched_at REAL, accessed_at REAL, size INTEGER)""")
+        self.connection.execute("CREATE INDEX IF NOT EXISTS entries_accessed_at ON entries (accessed_at)")
+        self.connection.commit()
+        self.accessed = {}  # key: time of the last lookup, not written yet
+
+        # Counters
+        self.hits = 0  # served without a request
+        self.not_modified = 0  # revalidated by a 304
+        self.misses = 0  # fetched in full
+        self.bytes_saved = 0  # payload bytes that did not have to be downloaded
+
+    def get(self, key):
+        """
+        Looks up an entry (and marks it as recently used)
+
+        :param key: url (or any string) the entry is stored under
+        :return: CacheEntry, None if there is no entry
+        """
+        with self.lock:
+            row = self.connection.execute("SELECT key, payload, parsed, etag, last_modified, next_url, fetched_at, "
+                                          "size FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            self.accessed[key] = time.time()
+        return CacheEntry(*row)
+
+    def _write_accessed(self):
+        """
+        Helper Method.
+        Writes the access times of the lookups since the last write (the caller holds the lock and commits)
+
+        :return: None
+        """
+        if self.accessed:
+            self.connection.executemany("UPDATE entries SET accessed_at = ? WHERE key = ?",
+                                        [(accessed_at, key) for key, accessed_at in self.accessed.items()])
+            self.accessed = {}
+
+    def is_fresh(self, entry):
+        """
+        :param entry: CacheEntry
+        :return: True if the entry is younger than the TTL
+        """
+        return time.time() - entry.fetched_at < self.ttl
+
+    def put(self, key, payload, parsed=None, etag=None, last_modified=None, next_url=None):
+        """
+        Stores an entry, evicting the least recently used ones if the cache grows above max_bytes
+
+        :param key: url (or any string) the entry is stored under
+        :param payload: raw payload (string)
+        :param parsed: parsed form of the payload (string), if any
+        :param etag: ETag header of the response
+        :param last_modified: Last-Modified header of the response
+        :param next_url: pagination link of the response
+        :return: None
+        """
+        now = time.time()
+        size = len(payload) + len(parsed or "")
+        with self.lock:
+            self._write_accessed()  # the eviction order needs them
+            self.connection.execute("INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                                    (key, payload, parsed, etag, last_modified, next_url, now, now, size))
+            total = self.connection.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+            if total > self.max_bytes:
+                for old_key, old_size in self.connection.execute(
+                        "SELECT key, size FROM entries ORDER BY accessed_at").fetchall():
+                    if total <= self.max_bytes or old_key == key:
+                        break
+                    self.connection.execute("DELETE FROM entries WHERE key = ?", (old_key,))
+                    total -= old_size
+            self.connection.commit()
+
+    def refresh(self, key):
+        """
+        Restarts the TTL of an entry the server reported as not modified
+
+        :param key: key of the entry
+        :return: None
+        """
+        with self.lock:
+            self.connection.execute("UPDATE entries SET fetched_at = ? WHERE key = ?", (time.time(), key))
+            self.connection.commit()
+
+    def record(self, outcome, nbytes=0):
+        """
+        Counts the outcome of a lookup
+
+        :param outcome: "hit", "not_modified" or "miss"
+        :param nbytes: payload bytes that did not have to be downloaded
+        :return: None
+        """
+        with self.lock:
+            if outcome == "hit":
+                self.hits += 1
+            elif outcome == "not_modified":
+                self.not_modified += 1
+            else:
+                self.misses += 1
+            self.bytes_saved += nbytes
+
+    def stats(self):
+        """
+        :return: dictionary with the hit/miss/bytes-saved counters and the current size of the cache
+        """
+        with self.lock:
+            entries, size = self.connection.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+        return {"hits": self.hits, "not_modified": self.not_modified, "misses": self.misses,
+                "bytes_saved": self.bytes_saved, "entries": entries, "size": size}
+
+    def clear(self):
+        """
+        Removes every entry
+
+        :return: None
+        """
+        with self.lock:
+            self.accessed = {}
+            self.connection.execute("DELETE FROM entries")
+            self.connection.commit()
+
+    def close(self):
+        with self.lock:
+            self._write_accessed()
+            self.connection.commit()
+            self.connection.close()
@@ -0,0 +1,154 @@
+#!/usr/bin/env python
+
+"""grade_calc.py: Computes the course average and student grade of Canvas courses (no GUI, no browser)"""
+
+__author__ = "Leo Shen, Dhruba Paul"
+__copyright__ = "Copyright 2022, Canvas Course Mean Project"
+
+from collections import namedtuple
+import tracing
+from grade_kernel import batch_table, group_table, table_totals
+from grade_parser import parse_grades_page
+
+
+class CourseResult(namedtuple("CourseResult", ["course_name", "canvas_grade", "course_avg", "student_grade",
+                                               "table"])):
+    """
+    Immutable result of one course computation.
+
+    course_avg, student_grade and table (per-group GroupTable) are None when the class has no weights.
+    Every computation returns its own result, so courses can be computed concurrently.
+    """
+    __slots__ = ()
+
+    @property
+    def summary(self):
+        """
+        :return: a string with useful information for the user
+        """
+        return_str = self.course_name + "\n"
+        if self.table is None:
+            return return_str + "Class has no weights\n"
+        if self.canvas_grade is not None:
+            return_str = return_str + "Your Grade on Canvas: " + self.canvas_grade + "\n"
+        return return_str + 'Course Average: ' + str(self.course_avg) + "\n" \
+                          + 'Student Grade: ' + str(self.student_grade) + "\n"
+
+
+# Calculating course mean and student grade with the numpy kernel
+def calculate_grade(group_list, mean_list, total_list, dropped_list, student_score_list, group_weights,
+                    verbose=False):
+    """
+    Helper Method.
+    Calculates course average grade, and student grade
+
+    :param group_list: list of all the assignment groups within a course
+    :param mean_list: list of average scores for all assignments
+    :param total_list: list of total scores for all assignments
+    :param dropped_list: boolean list indicating whether an assignment has been dropped or not
+    :param student_score_list: list of student scores achieved on all assignments
+    :param group_weights: dictionary with assignment groups and their corresponding weights
+    :param verbose: prints the per-group table if True
+    :return: CourseResult with the per-group table, course avg. grade and student grade (course name not set)
+    """
+    table = group_table(group_list, mean_list, total_list, dropped_list, student_score_list, group_weights)
+    if verbose:
+        print(table.to_string())
+
+    course_avg, student_grade = table_totals(table)
+    return CourseResult(None, None, course_avg, student_grade, table)
+
+
+def calculate_grade_pandas(group_list, mean_list, total_list, dropped_list, student_score_list, group_weights):
+    """
+    Helper Method.
+    Calculates course average grade, and student grade with a pandas dataframe.
+    Reference implementation (calculate_grade gives the same numbers without pandas).
+
+    :param group_list: list of all the assignment groups within a course
+    :param mean_list: list of average scores for all assignments
+    :param total_list: list of total scores for all assignments
+    :param dropped_list: boolean list indicating whether an assignment has been dropped or not
+    :param student_score_list: list of student scores achieved on all assignments
+    :param group_weights: dictionary with assignment groups and their corresponding weights
+    :return: A tuple (course avg. grade, student grade, per-group dataframe)
+    """
+    import pandas as pd
+    df = pd.DataFrame()
+    df["groups"] = group_list
+    df["mean_sum"] = mean_list
+    df["student_score_sum"] = student_score_list
+    df["total_sum"] = total_list
+    df["dropped"] = dropped_list
+
+    # Counting number of dropped courses per group
+    dropped_count = df[["groups", "dropped"]]
+    dropped_count = dropped_count.groupby("groups").sum()
+
+    df = df[df["dropped"] == False]  # dropping rows with dropped assignments
+    df = df.astype({'mean_sum': 'float', 'total_sum': 'float', 'student_score_sum': 'float'})  # type conversion
+    df = df.groupby("groups").sum()  # getting mean_sum and total_sum
+    df["dropped"] = dropped_count  # getting count for the number of assignments dropped
+
+    df = df.reset_index()  # resetting index to use the groups values
+    df["weights"] = df["groups"].apply(lambda x: group_weights[x])  # Fetching weights
+    df = df.astype({'weights': 'float'})  # type conversion
+    # weighted percentages (class average)
+    df["weighted_percentage (course avg)"] = df["mean_sum"] / df["total_sum"] * df["weights"]
+    # weighted percentages (student score)
+    df["student_weighted_percentage (student grade)"] = df["student_score_sum"] / df["total_sum"] * df["weights"]
+    return df["weighted_percentage (course avg)"].sum(), df["student_weighted_percentage (student grade)"].sum(), df
+
+
+def calculate_course(grades, verbose=False):
+    """
+    Uses the scraped (or fetched) grades of a course to compute the course avg and student grades.
+
+    :param grades: CourseGrades of the course
+    :param verbose: prints the results (and per-group table) if True
+    :return: CourseResult
+    """
+    if grades.group_weights is None:
+        result = CourseResult(grades.course_name, grades.canvas_grade, None, None, None)
+    else:
+        with tracing.span("compute", course=grades.course_name, assignments=len(grades.assignments)):
+            table = batch_table(grades.assignments, grades.group_weights)
+            if verbose:
+                print(table.to_string())
+            result = CourseResult(grades.course_name, grades.canvas_grade, *table_totals(table), table)
+
+    if verbose:
+        print(result.summary)
+    return result
+
+
+def compute_grades(grades):
+    """
+    Compute stage of the course pipelines (see canvas_api.grade_stages)
+
+    :param grades: CourseGrades of the course
+    :return: A tuple (CourseGrades, CourseResult)
+    """
+    return grades, calculate_course(grades)
+
+
+def scrape_course(html):
+    """
+    Scrapes the "grade" page of the course.
+
+    :param html: The html code of the grades page
+    :return: CourseGrades
+    """
+    with tracing.span("parse", bytes=len(html)):
+        return parse_grades_page(html)
+
+
+def scrape_and_calculate(html, verbose=False):
+    """
+    Scrapes the "grade" page of the course, and uses the information to computer the course avg and student grades.
+
+    :param html: The html code of the grades page
+    :param verbose: prints the results (and per-group table) if True
+    :return: CourseResult
+    """
+    return calculate_course(scrape_course(html), verbose)
@@ -0,0 +1,169 @@
+#!/usr/bin/env python
+
+"""grade_columns.py: Compact columnar storage of the assignment rows of a course (typed arrays, no object per row)"""
+
+__author__ = "Leo Shen, Dhruba Paul"
+__copyright__ = "Copyright 2022, Canvas Course Mean Project"
+
+from array import array
+
+# Bits of the flags column
+DROPPED = 1  # dropped by a rule of the group
+EXCUSED = 2
+UNGRADED = 4  # no score yet (its score column holds 0.0)
+NOT_COUNTED = DROPPED | EXCUSED  # left out of the group sums
+
+
+class AssignmentBatch:
+    """
+    Assignment rows of a course as typed columns: float64 means, totals and scores, a group code per row indexing
+    into group_names (in order of appearance), a bitmask of DROPPED, EXCUSED and UNGRADED per row, and the Canvas id
+    of every assignment (0 when unknown).
+
+    Columns are array.array objects, so numpy reads them in place (np.frombuffer) and a row costs 35 bytes.
+    Batches are treated as immutable: with_scores gives a new batch sharing the other columns.
+    """
+    __slots__ = ("group_names", "group_codes", "means", "totals", "scores", "flags", "ids")
+
+    def __init__(self, group_names=(), group_codes=None, means=None, totals=None, scores=None, flags=None, ids=None):
+        """
+        :param group_names: tuple of the names of the assignment groups
+        :param group_codes: array('H'), index in group_names of the group of every assignment
+        :param means: array('d'), class average score of every assignment
+        :param totals: array('d'), total score of every assignment
+        :param scores: array('d'), student score of every assignment
+        :param flags: array('B'), DROPPED | EXCUSED | UNGRADED bits of every assignment
+        :param ids: array('q'), Canvas id of every assignment (zeros if None)
+        """
+        self.group_names = tuple(group_names)
+        self.group_codes = array("H") if group_codes is None else group_codes
+        self.means = array("d") if means is None else means
+        self.totals = array("d") if totals is None else totals
+        self.scores = array("d") if scores is None else scores
+        self.flags = array("B") if flags is None else flags
+        self.ids = array("q", bytes(8 * len(self.flags))) if ids is None else ids
+
+    def __len__(self):
+        return len(self.flags)
+
+    def __eq__(self, other):
+        return isinstance(other, AssignmentBatch) and self.group_list == other.group_list and \
+            (self.means, self.totals, self.scores, self.flags, self.ids) == \
+            (other.means, other.totals, other.scores, other.flags, other.ids)
+
+    def __repr__(self):
+        return f"AssignmentBatch({len(self)} assignments, groups {self.group_names})"
+
+    @property
+    def nbytes(self):
+        """
+        :return: bytes held by the columns
+        """
+        return sum(column.itemsize * len(column)
+                   for column in (self.group_codes, self.means, self.totals, self.scores, self.flags, self.ids))
+
+    # Row views, as lists (copies, for display and the list-based implementations)
+
+    @property
+    def group_list(self):
+        return [self.group_names[code] for code in self.group_codes]
+
+    @property
+    def mean_list(self):
+        return self.means.tolist()
+
+    @property
+    def total_list(self):
+        return self.totals.tolist()
+
+    @property
+    def dropped_list(self):
+        return [bool(flag & NOT_COUNTED) for flag in self.flags]
+
+    @property
+    def student_score_list(self):
+        return self.scores.tolist()
+
+    def with_scores(self, scores):
+        """
+        :param scores: student score of every assignment
+        :return: AssignmentBatch with these scores (no longer UNGRADED), other columns shared
+        """
+        return AssignmentBatch(self.group_names, self.group_codes, self.means, self.totals,
+                               array("d", map(float, scores)), array("B", (flag & ~UNGRADED for flag in self.flags)),
+                               self.ids)
+
+    def to_columns(self):
+        """
+        :return: list of the group names and columns, as JSON-able lists
+        """
+        return [list(self.group_names), self.group_codes.tolist(), self.means.tolist(), self.totals.tolist(),
+                self.scores.tolist(), self.flags.tolist(), self.ids.tolist()]
+
+    @classmethod
+    def from_columns(cls, columns):
+        """
+        :param columns: list made by to_columns
+        :return: AssignmentBatch
+        """
+        group_names, group_codes, means, totals, scores, flags, ids = columns
+        return cls(group_names, array("H", group_codes), array("d", means), array("d", totals), array("d", scores),
+                   array("B", flags), array("q", ids))
+
+
+class AssignmentBatchBuilder:
+    """
+    Appends assignment rows as the parsers read them (means can come after their row, as on the grades page).
+
+    Usage:
+        builder = AssignmentBatchBuilder()
+        builder.add("Exams", 100.0, 87.5, assignment_id=4242)
+        builder.add_mean(78.2)
+        batch = builder.build()
+    """
+    __slots__ = ("group_index", "group_codes", "means", "totals", "scores", "flags", "ids")
+
+    def __init__(self):
+        self.group_index = {}
+        self.group_codes = array("H")
+        self.means = array("d")
+        self.totals = array("d")
+        self.scores = array("d")
+        self.flags = array("B")
+        self.ids = array("q")
+
+    def add(self, group, total, score, flags=0, assignment_id=0):
+        """
+        :param group: name of the assignment group
+        :param total: total score
+        :param score: student score (0.0 with the UNGRADED flag if there is none)
+        :param flags: DROPPED | EXCUSED | UNGRADED bits
+        :param assignment_id: Canvas id of the assignment (0 if unknown)
+        :return: None
+        """
+        code = self.group_index.get(group)
+        if code is None:
+            code = self.group_index[group] = len(self.group_index)
+        self.group_codes.append(code)
+        self.totals.append(total)
+        self.scores.append(score)
+        self.flags.append(flags)
+        self.ids.append(assignment_id)
+
+    def add_mean(self, mean):
+        """
+        :param mean: class average score of the next assignment without one
+        :return: None
+        """
+        self.means.append(mean)
+
+    def build(self):
+        """
+        :return: AssignmentBatch (assignments without a mean get 0.0, as ungraded ones have no statistics)
+        """
+        n = len(self.flags)
+        if len(self.means) < n:
+            self.means.extend([0.0] * (n - len(self.means)))
+        del self.means[n:]
+        return AssignmentBatch(self.group_index, self.group_codes, self.means, self.totals, self.scores, self.flags,
+                               self.ids)
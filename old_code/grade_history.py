@@ -0,0 +1,219 @@
+#!/usr/bin/env python
+
+"""grade_history.py: On-disk history of the grades of every run, storing only what changed since the last snapshot"""
+
+__author__ = "Leo Shen, Dhruba Paul"
+__copyright__ = "Copyright 2022, Canvas Course Mean Project"
+
+import os
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+
+DEFAULT_HISTORY_PATH = os.path.join(os.path.expanduser("~"), ".canvas_course_mean", "grades_history.sqlite3")
+
+CoursePoint = namedtuple("CoursePoint", ["taken_at", "course_avg", "student_grade", "canvas_grade"])
+GroupPoint = namedtuple("GroupPoint", ["taken_at", "mean_sum", "student_score_sum", "total_sum", "dropped", "weight"])
+AssignmentPoint = namedtuple("AssignmentPoint", ["taken_at", "group", "mean", "score", "total", "flags"])
+
+# Assignment rows are keyed by course, Canvas id of the assignment and the time of the snapshot they were first seen
+# in (group rows by course, group and time), so an assignment published ahead of others does not move their history.
+# WITHOUT ROWID keeps every table clustered on its key, so a time series is a single range scan. An assignment or
+# group that is no longer on the page gets a tombstone: a row with removed = 1 and NULL values, so it is not part
+# of the state from then on.
+SCHEMA_VERSION = 2  # files of version 1 keyed the assignments by position: their group and assignment rows are dropped
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS snapshots (
+    course TEXT, taken_at REAL, course_avg REAL, student_grade REAL, canvas_grade TEXT,
+    PRIMARY KEY (course, taken_at)) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS group_stats (
+    course TEXT, grp TEXT, taken_at REAL, mean_sum REAL, student_score_sum REAL, total_sum REAL, dropped INTEGER,
+    weight REAL, removed INTEGER NOT NULL DEFAULT 0, PRIMARY KEY (course, grp, taken_at)) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS assignments (
+    course TEXT, assignment INTEGER, taken_at REAL, grp TEXT, mean REAL, score REAL, total REAL, flags INTEGER,
+    removed INTEGER NOT NULL DEFAULT 0, PRIMARY KEY (course, assignment, taken_at)) WITHOUT ROWID;
+"""
+
+
+def assignment_rows(grades):
+    """
+    Helper Method.
+    Keys and values of the assignments of a course
+
+    :param grades: CourseGrades
+    :return: dictionary {Canvas id of the assignment (-1 - its row for rows without one): (group, mean, score, total,
+             DROPPED | EXCUSED | UNGRADED flags)}
+    """
+    assignments = grades.assignments
+    names = assignments.group_names
+    return {assignment_id or -1 - row: (names[code], mean, score, total, flags)
+            for row, (assignment_id, code, mean, score, total, flags) in enumerate(zip(
+                assignments.ids, assignments.group_codes, assignments.means, assignments.scores, assignments.totals,
+                assignments.flags))}
+
+
+class GradeHistory:
+    """
+    Snapshots of the grades of the courses, one per course per run.
+
+    Every snapshot records the course avg. and student grade. Assignments and group totals are only written when
+    their values changed since the previous snapshot of the course (the last known values of the courses are kept
+    in memory), so the store grows with the changes rather than with the number of runs.
+    Safe to share between threads.
+    """
+
+    def __init__(self, path=DEFAULT_HISTORY_PATH):
+        """
+        :param path: sqlite file holding the history (":memory:" for a history that is not persisted)
+        """
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode = WAL")
+        self.connection.execute("PRAGMA synchronous = NORMAL")  # durable at checkpoints, enough for a history
+        if self.connection.execute("PRAGMA user_version").fetchone()[0] < SCHEMA_VERSION:
+            self.connection.executescript("DROP TABLE IF EXISTS assignments; DROP TABLE IF EXISTS group_stats;")
+            self.connection.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        self.connection.executescript(SCHEMA)
+        self.connection.commit()
+        self.latest = {}  # course: (assignment rows, group rows) of its last snapshot
+
+    def _latest(self, course):
+        """
+        Helper Method.
+        Last known assignment and group values of a course (read from the store on first use), removed ones left out
+
+        :return: A tuple of dictionaries ({assignment id: values}, {group: values})
+        """
+        if course not in self.latest:
+            assignments = {assignment: tuple(values) for assignment, *values in self.connection.execute(
+                "SELECT assignment, grp, mean, score, total, flags FROM assignments a WHERE course = ? "
+                "AND taken_at = (SELECT MAX(taken_at) FROM assignments WHERE course = a.course "
+                "AND assignment = a.assignment) AND NOT removed", (course,))}
+            groups = {grp: tuple(values) for grp, *values in self.connection.execute(
+                "SELECT grp, mean_sum, student_score_sum, total_sum, dropped, weight FROM group_stats g "
+                "WHERE course = ? AND taken_at = (SELECT MAX(taken_at) FROM group_stats WHERE course = g.course "
+                "AND grp = g.grp) AND NOT removed", (course,))}
+            self.latest[course] = (assignments, groups)
+        return self.latest[course]
+
+    def ingest(self, grades, result, taken_at=None):
+        """
+        Records a snapshot of a course
+
+        :param grades: CourseGrades of the course
+        :param result: CourseResult computed from grades
+        :param taken_at: time of the snapshot (defaults to now), later than the previous snapshots of the course
+        :return: number of assignment rows written (tombstones of removed assignments included)
+        """
+        taken_at = time.time() if taken_at is None else taken_at
+        course = grades.course_name
+        rows = assignment_rows(grades)
+        table = result.table
+        group_values = {} if table is None else {
+            group: (float(table.mean_sum[i]), float(table.student_score_sum[i]), float(table.total_sum[i]),
+                    int(table.dropped[i]), float(table.weights[i])) for i, group in enumerate(table.groups)}
+
+        with self.lock:
+            latest_rows, latest_groups = self._latest(course)
+            changed_rows = [(course, assignment, taken_at) + values + (0,)
+                            for assignment, values in rows.items() if latest_rows.get(assignment) != values]
+            removed_rows = [assignment for assignment in latest_rows if assignment not in rows]
+            changed_rows += [(course, assignment, taken_at) + (None,) * 5 + (1,) for assignment in removed_rows]
+            changed_groups = [(course, grp, taken_at) + values + (0,) for grp, values in group_values.items()
+                              if latest_groups.get(grp) != values]
+            removed_groups = [grp for grp in latest_groups if grp not in group_values]
+            changed_groups += [(course, grp, taken_at) + (None,) * 5 + (1,) for grp in removed_groups]
+            with self.connection:
+                self.connection.execute("INSERT OR REPLACE INTO snapshots VALUES (?, ?, ?, ?, ?)",
+                                        (course, taken_at, result.course_avg, result.student_grade,
+                                         grades.canvas_grade))
+                self.connection.executemany("INSERT OR REPLACE INTO assignments VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                                            changed_rows)
+                self.connection.executemany("INSERT OR REPLACE INTO group_stats VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                                            changed_groups)
+            for assignment in removed_rows:
+                del latest_rows[assignment]
+            for grp in removed_groups:
+                del latest_groups[grp]
+            latest_rows.update(rows)
+            latest_groups.update(group_values)
+        return len(changed_rows)
+
+    def courses(self):
+        """
+        :return: list of the names of the courses with snapshots
+        """
+        with self.lock:
+            return [course for course, in self.connection.execute("SELECT DISTINCT course FROM snapshots")]
+
+    def course_series(self, course, since=None, until=None):
+        """
+        Course avg. and student grade of every snapshot of a course
+
+        :param course: name of the course
+        :param since: earliest time included
+        :param until: latest time included
+        :return: list of CoursePoint, oldest first
+        """
+        with self.lock:
+            return [CoursePoint(*row) for row in self.connection.execute(
+                "SELECT taken_at, course_avg, student_grade, canvas_grade FROM snapshots WHERE course = ? "
+                "AND taken_at BETWEEN ? AND ? ORDER BY taken_at",
+                (course, -float("inf") if since is None else since, float("inf") if until is None else until))]
+
+    def group_series(self, course, group):
+        """
+        Sums of an assignment group, each point holding until the next one.
+        A point of None values marks the removal of the group.
+
+        :param course: name of the course
+        :param group: name of the assignment group
+        :return: list of GroupPoint, oldest first
+        """
+        with self.lock:
+            return [GroupPoint(*row) for row in self.connection.execute(
+                "SELECT taken_at, mean_sum, student_score_sum, total_sum, dropped, weight FROM group_stats "
+                "WHERE course = ? AND grp = ? ORDER BY taken_at", (course, group))]
+
+    def assignment_series(self, course, assignment):
+        """
+        Values of an assignment, each point holding until the next one.
+        A point of None values marks the removal of the assignment.
+
+        :param course: name of the course
+        :param assignment: Canvas id of the assignment
+        :return: list of AssignmentPoint, oldest first
+        """
+        with self.lock:
+            return [AssignmentPoint(*row) for row in self.connection.execute(
+                "SELECT taken_at, grp, mean, score, total, flags FROM assignments WHERE course = ? AND assignment = ? "
+                "ORDER BY taken_at", (course, assignment))]
+
+    def assignments_at(self, course, taken_at):
+        """
+        Assignments of a course as they were at a given time, removed ones left out
+
+        :param course: name of the course
+        :param taken_at: time
+        :return: dictionary {assignment id: (group, mean, score, total, flags)} (same as assignment_rows)
+        """
+        with self.lock:
+            return {assignment: tuple(values) for assignment, *values in self.connection.execute(
+                "SELECT assignment, grp, mean, score, total, flags FROM assignments a WHERE course = ? "
+                "AND taken_at = (SELECT MAX(taken_at) FROM assignments WHERE course = a.course "
+                "AND assignment = a.assignment AND taken_at <= ?) AND NOT removed", (course, taken_at))}
+
+    def stats(self):
+        """
+        :return: dictionary with the number of rows of every table
+        """
+        with self.lock:
+            return {table: self.connection.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+                    for table in ("snapshots", "group_stats", "assignments")}
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
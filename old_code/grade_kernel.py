@@ -0,0 +1,215 @@
+#!/usr/bin/env python
+
+"""grade_kernel.py: NumPy kernel computing weighted course averages and student grades, one course or many at once"""
+
+__author__ = "Leo Shen, Dhruba Paul"
+__copyright__ = "Copyright 2022, Canvas Course Mean Project"
+
+from collections import namedtuple
+import numpy as np
+from grade_columns import NOT_COUNTED
+
+# Column names of the per-group table shown to the user
+TABLE_COLUMNS = ["groups", "mean_sum", "student_score_sum", "total_sum", "dropped", "weights",
+                 "weighted_percentage (course avg)", "student_weighted_percentage (student grade)"]
+
+
+class GroupTable(namedtuple("GroupTable", ["groups", "mean_sum", "student_score_sum", "total_sum", "dropped",
+                                           "weights", "weighted_percentage", "student_weighted_percentage"])):
+    """
+    Immutable per-group table of a course (groups sorted by name, groups with only dropped assignments left out).
+
+    groups is a tuple of names, every other column is a read-only numpy array.
+    """
+    __slots__ = ()
+
+    def __len__(self):
+        return len(self.groups)
+
+    def to_dataframe(self):
+        """
+        :return: the table as a pandas dataframe (for display)
+        """
+        import pandas as pd
+        return pd.DataFrame(dict(zip(TABLE_COLUMNS, [list(self.groups)] + [np.array(c) for c in self[1:]])))
+
+    def to_string(self):
+        """
+        :return: the table as printable text
+        """
+        return self.to_dataframe().to_string()
+
+
+def encode_groups(group_list):
+    """
+    Helper Method.
+    Maps group names to integer codes, codes following the sorted order of the names
+
+    :param group_list: list of the assignment group of every assignment
+    :return: A tuple (sorted list of group names, numpy array with the code of every assignment)
+    """
+    index = {}
+    codes = np.fromiter((index.setdefault(g, len(index)) for g in group_list), np.intp, len(group_list))
+    names = sorted(index)
+    remap = np.empty(len(names), np.intp)
+    remap[[index[name] for name in names]] = np.arange(len(names))
+    return names, remap[codes]
+
+
+def _weighted_percentages(sums, total_sum, weights):
+    """
+    Helper Method.
+    sums / total_sum * weights, giving nan (0/0) or inf like pandas does instead of warning
+    """
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return sums / total_sum * weights
+
+
+def group_table(group_list, mean_list, total_list, dropped_list, student_score_list, group_weights):
+    """
+    Sums the scores of the assignments of a course per group (dropped assignments left out) and weighs them.
+
+    :param group_list: list of all the assignment groups within a course
+    :param mean_list: list of average scores for all assignments (numbers or numeric strings)
+    :param total_list: list of total scores for all assignments (numbers or numeric strings)
+    :param dropped_list: boolean list indicating whether an assignment has been dropped or not
+    :param student_score_list: list of student scores achieved on all assignments (numbers or numeric strings)
+    :param group_weights: dictionary with assignment groups and their corresponding weights
+    :return: GroupTable
+    """
+    names, codes = encode_groups(group_list)
+    return _group_table(names, codes, ~np.asarray(dropped_list, dtype=bool).reshape(-1),
+                        np.asarray(mean_list, dtype=np.float64).reshape(-1),
+                        np.asarray(total_list, dtype=np.float64).reshape(-1),
+                        np.asarray(student_score_list, dtype=np.float64).reshape(-1), group_weights)
+
+
+def columns(assignments):
+    """
+    Numpy views (no copy) of the columns of an AssignmentBatch
+
+    :param assignments: AssignmentBatch
+    :return: A tuple of arrays (group codes, means, totals, scores, flags)
+    """
+    return (np.frombuffer(assignments.group_codes, dtype=np.uint16), np.frombuffer(assignments.means),
+            np.frombuffer(assignments.totals), np.frombuffer(assignments.scores),
+            np.frombuffer(assignments.flags, dtype=np.uint8))
+
+
+def batch_table(assignments, group_weights):
+    """
+    group_table of an AssignmentBatch, read in place
+
+    :param assignments: AssignmentBatch
+    :param group_weights: dictionary with assignment groups and their corresponding weights
+    :return: GroupTable
+    """
+    codes, means, totals, scores, flags = columns(assignments)
+    names = sorted(assignments.group_names)
+    order = np.empty(len(names), np.intp)  # code of the batch -> code in sorted order
+    order[[assignments.group_names.index(name) for name in names]] = np.arange(len(names))
+    return _group_table(names, order[codes], (flags & NOT_COUNTED) == 0, means, totals, scores, group_weights)
+
+
+def _group_table(names, codes, kept, means, totals, scores, group_weights):
+    """
+    Helper Method.
+    group_table of the encoded columns (names sorted, codes following their order)
+    """
+    n_groups = len(names)
+    dropped = np.bincount(codes, weights=~kept, minlength=n_groups).astype(np.int64)
+    present = np.bincount(codes[kept], minlength=n_groups) > 0  # groups with at least one assignment counted
+    mean_sum = np.bincount(codes[kept], weights=means[kept], minlength=n_groups)[present]
+    score_sum = np.bincount(codes[kept], weights=scores[kept], minlength=n_groups)[present]
+    total_sum = np.bincount(codes[kept], weights=totals[kept], minlength=n_groups)[present]
+    groups = tuple(name for name, p in zip(names, present) if p)
+    weights = np.array([float(group_weights[g]) for g in groups], dtype=np.float64)
+
+    columns = [mean_sum, score_sum, total_sum, dropped[present], weights,
+               _weighted_percentages(mean_sum, total_sum, weights),
+               _weighted_percentages(score_sum, total_sum, weights)]
+    for column in columns:
+        column.flags.writeable = False
+    return GroupTable(groups, *columns)
+
+
+def table_totals(table):
+    """
+    Course avg. and student grade of a group table (nan groups are skipped, like pandas' sum)
+
+    :param table: GroupTable
+    :return: A tuple (course avg. grade, student grade)
+    """
+    return float(np.nansum(table.weighted_percentage)), float(np.nansum(table.student_weighted_percentage))
+
+
+def pack_courses(courses):
+    """
+    Flattens many courses into the arrays taken by calculate_grades_batch
+
+    :param courses: iterable of CourseGrades (courses without weights are skipped)
+    :return: dictionary of arrays (see calculate_grades_batch)
+    """
+    group_codes, means, totals, scores, dropped, weights = [], [], [], [], [], []
+    offsets, weight_offsets = [0], [0]
+    for course in courses:
+        if course.group_weights is None:
+            continue
+        names = list(course.group_weights)
+        index = {name: i for i, name in enumerate(names)}
+        codes, course_means, course_totals, course_scores, flags = columns(course.assignments)
+        group_codes.append(np.array([index[g] for g in course.assignments.group_names], dtype=np.intp)[codes])
+        means.append(course_means)
+        totals.append(course_totals)
+        scores.append(course_scores)
+        dropped.append((flags & NOT_COUNTED) != 0)
+        weights.extend(course.group_weights[name] for name in names)
+        offsets.append(offsets[-1] + len(codes))
+        weight_offsets.append(len(weights))
+
+    def concatenate(arrays, dtype):
+        return np.concatenate(arrays) if arrays else np.zeros(0, dtype)
+    return {"group_codes": concatenate(group_codes, np.intp), "means": concatenate(means, np.float64),
+            "totals": concatenate(totals, np.float64), "scores": concatenate(scores, np.float64),
+            "dropped": concatenate(dropped, bool), "offsets": np.asarray(offsets, dtype=np.intp),
+            "weights": np.asarray(weights, dtype=np.float64),
+            "weight_offsets": np.asarray(weight_offsets, dtype=np.intp)}
+
+
+def calculate_grades_batch(group_codes, means, totals, scores, dropped, offsets, weights, weight_offsets):
+    """
+    Computes the course avg. and student grade of many courses at once.
+
+    Assignments of course i are rows offsets[i]:offsets[i + 1] of the flat arrays, and its groups are
+    weights[weight_offsets[i]:weight_offsets[i + 1]] (group_codes index into the groups of their own course).
+
+    :param group_codes: int array, group of every assignment (within its course)
+    :param means: float array, average score of every assignment
+    :param totals: float array, total score of every assignment
+    :param scores: float array, student score of every assignment
+    :param dropped: bool array, whether every assignment is dropped
+    :param offsets: int array (n_courses + 1), start of the assignments of every course
+    :param weights: float array, weight of every group of every course
+    :param weight_offsets: int array (n_courses + 1), start of the groups of every course
+    :return: A tuple of float arrays (course avg. grades, student grades)
+    """
+    n_courses = len(offsets) - 1
+    n_groups = len(weights)
+    row_course = np.repeat(np.arange(n_courses), np.diff(offsets))
+    group_ids = (np.asarray(weight_offsets)[:-1][row_course] + group_codes)
+
+    kept = ~np.asarray(dropped, dtype=bool)
+    group_ids = group_ids[kept]
+    mean_sum = np.bincount(group_ids, weights=np.asarray(means)[kept], minlength=n_groups)
+    score_sum = np.bincount(group_ids, weights=np.asarray(scores)[kept], minlength=n_groups)
+    total_sum = np.bincount(group_ids, weights=np.asarray(totals)[kept], minlength=n_groups)
+    present = np.bincount(group_ids, minlength=n_groups) > 0
+
+    group_course = np.repeat(np.arange(n_courses), np.diff(weight_offsets))
+    course_pct = _weighted_percentages(mean_sum, total_sum, weights)
+    student_pct = _weighted_percentages(score_sum, total_sum, weights)
+    # groups without any counted assignment, and nan groups, add nothing
+    course_pct = np.where(present & ~np.isnan(course_pct), course_pct, 0.0)
+    student_pct = np.where(present & ~np.isnan(student_pct), student_pct, 0.0)
+    return (np.bincount(group_course, weights=course_pct, minlength=n_courses),
+            np.bincount(group_course, weights=student_pct, minlength=n_courses))
@@ -0,0 +1,240 @@
+#!/usr/bin/env python
+
+"""grade_parser.py: Extracts the assignment rows of Canvas grades pages"""
+
+__author__ = "Leo Shen, Dhruba Paul"
+__copyright__ = "Copyright 2022, Canvas Course Mean Project"
+
+from collections import namedtuple
+from itertools import islice
+from grade_columns import AssignmentBatch, AssignmentBatchBuilder, DROPPED, EXCUSED, UNGRADED
+
+
+class CourseGrades(namedtuple("CourseGrades", ["course_name", "canvas_grade", "group_weights", "assignments"])):
+    """
+    Everything the grade computation needs from one course, whether it was scraped from the page or fetched as JSON.
+
+    assignments is an AssignmentBatch (columns of the assignment rows).
+    """
+    __slots__ = ()
+
+
+# Checking if the argument is a float value
+def is_number(s):
+    """
+    Helper Method.
+    Checks if the string argument is a number or not
+
+    :param s: a string
+    :return: True if it is a number, false otherwise
+    """
+    try:
+        float(s)
+        return True
+    except ValueError:
+        return False
+
+
+# Finding the groups, total scores, and average scores of ALL ASSIGNMENTS ##########################################
+def start_with_illegal_val(tr_ID):
+    """
+    Helper Method.
+    checking if the tr_ID starts with one of the illegal expression
+
+    :param tr_ID: the ID of the tr tag
+    :return: True if the tr ID starts with an illegal expression, false otherwise
+    """
+    illegal_expressions = ['submission_group', "submission_final-grade", 'grade_info_final', 'grade_info_group']
+    for f in illegal_expressions:
+        if tr_ID.startswith(f):
+            return True
+    return False
+
+
+def assignment_id(tr_id):
+    """
+    Helper Method.
+    Canvas id of the assignment of a row
+
+    :param tr_id: the ID of the tr tag ("submission_<assignment id>")
+    :return: the id, 0 if the ID holds none
+    """
+    digits = tr_id[len("submission_"):]
+    return int(digits) if digits.isascii() and digits.isdigit() else 0
+
+
+def scrape_grades_soup(html):
+    """
+    Scrapes the "grade" page of the course for everything needed to compute the course avg and student grades.
+    Reference implementation building a full BeautifulSoup tree (parse_grades_page gives the same output, faster).
+
+    :param html: The html code that is to be scraped with BeautifulSoup
+    :return: CourseGrades (group_weights is None if the class has no weights)
+    """
+    from bs4 import BeautifulSoup
+    soup = BeautifulSoup(html, features="lxml")
+
+    course_name = soup.find(id='breadcrumbs').find_all("span")[2].text
+
+    # Getting the weights
+    try:
+        # Creating a dictionary of groups corresponding to the weights
+        unweighted_assignments = soup.find(id="assignments-not-weighted")
+        unweighted_assignments_tbody = unweighted_assignments.find("tbody")
+        groups = [tag.text for tag in unweighted_assignments_tbody.find_all("th")]
+        weights = [tag.text[:-1] for tag in unweighted_assignments.find_all("td")]
+        group_weights = dict(zip(groups, weights))
+    except AttributeError:
+        return CourseGrades(course_name, None, None, AssignmentBatch())
+
+    # The "tr" tags represent assignment label (assignment group), grade info (has mean and total scores),
+    # or grader comments (we don't need)
+    grade_summary = soup.find(id="grades_summary").find("tbody")
+    tr_lst = grade_summary.find_all("tr")
+    assignments = AssignmentBatchBuilder()
+    student_grade = None
+
+    # Looping over all the tr tags
+    for tr in tr_lst:
+        tr_id_val = tr.get("id", -1)
+        tr_class_val = tr.get("class", "")
+
+        # Skipping elements without ids
+        if tr_id_val == -1:
+            continue
+
+        # Get student's own grade from Canvas
+        if tr_id_val.startswith('submission_final-grade'):
+            student_grade = tr.find_all("span")[2].text.strip()
+
+        # Skips if the tr ID start with an illegal expression
+        if start_with_illegal_val(tr_id_val):
+            continue
+
+        # Adding groups and total scores and "dropped boolean" values to their respective lists
+        if tr_id_val.startswith("submission"):
+            total = float(tr.find_all("td")[-2].text.strip())  # total
+            group = tr.find("div").text  # group
+            student_score_string = tr.find_all("td")[-3].text.split()[-5]
+
+            # grade info has attribute if assignment is dropped
+            grade_info = tr.find("td", {"class": "details"}).find("a").attrs.get("aria-expanded", -1)
+            flags = (DROPPED if "dropped" in tr_class_val or grade_info != -1 else 0) | \
+                (EXCUSED if "excused" in tr_class_val else 0)
+            if is_number(student_score_string):  # student score
+                assignments.add(group, total, float(student_score_string), flags, assignment_id(tr_id_val))
+            else:
+                assignments.add(group, total, 0.0, flags | UNGRADED, assignment_id(tr_id_val))
+            continue
+
+        # Adding mean to its respective lists
+        if tr_id_val.startswith("grade_info"):
+            try:
+                # throws exception when assignment is ungraded
+                mean_string = tr.find("tbody").find("td").text
+                assignments.add_mean(float(mean_string.split(":")[-1].strip()))  # Mean
+            except AttributeError:
+                assignments.add_mean(0.0)
+
+    return CourseGrades(course_name, student_grade, group_weights, assignments.build())
+
+
+_lxml = None  # (etree module, HTML parser, XPath of the sections), set up on the first parse
+
+
+def _lxml_parser():
+    """
+    Helper Method.
+    Imports lxml and compiles the XPath of the sections on first use (keeps lxml out of the app's startup)
+
+    :return: A tuple (etree module, HTML parser, XPath of the sections)
+    """
+    global _lxml
+    if _lxml is None:
+        from lxml import etree
+        _lxml = (etree, etree.HTMLParser(),
+                 etree.XPath("//*[@id='breadcrumbs' or @id='assignments-not-weighted' or @id='grades_summary']"))
+    return _lxml
+
+
+def _text(element):
+    """
+    Helper Method.
+    Text of an element and all of its descendants (same as BeautifulSoup's .text)
+
+    :param element: lxml element
+    :return: the text
+    """
+    return "".join(element.itertext())
+
+
+def parse_grades_page(html):
+    """
+    Parses the "grade" page of the course for everything needed to compute the course avg and student grades.
+
+    Only the three parts of the page that are needed (#breadcrumbs, #assignments-not-weighted and #grades_summary)
+    are looked up (in one pass), and every assignment row is read in a single pass over its cells.
+    Gives the same output as scrape_grades_soup.
+
+    :param html: The html code of the grades page
+    :return: CourseGrades (group_weights is None if the class has no weights)
+    """
+    etree, html_parser, sections_xpath = _lxml_parser()
+    sections = {}
+    for element in sections_xpath(etree.fromstring(html, html_parser)):
+        sections.setdefault(element.get("id"), element)
+
+    course_name = _text(next(islice(sections["breadcrumbs"].iter("span"), 2, None)))
+
+    # Creating a dictionary of groups corresponding to the weights
+    unweighted_assignments = sections.get("assignments-not-weighted")
+    unweighted_assignments_tbody = next(unweighted_assignments.iter("tbody"), None) \
+        if unweighted_assignments is not None else None
+    if unweighted_assignments_tbody is None:
+        return CourseGrades(course_name, None, None, AssignmentBatch())
+    groups = [_text(tag) for tag in unweighted_assignments_tbody.iter("th")]
+    weights = [_text(tag)[:-1] for tag in unweighted_assignments.iter("td")]
+    group_weights = dict(zip(groups, weights))
+
+    grade_summary = next(sections["grades_summary"].iter("tbody"))
+    assignments = AssignmentBatchBuilder()
+    student_grade = None
+
+    for tr in grade_summary.iter("tr"):
+        tr_id_val = tr.get("id")
+        if tr_id_val is None:
+            continue
+
+        # Get student's own grade from Canvas
+        if tr_id_val.startswith('submission_final-grade'):
+            student_grade = _text(next(islice(tr.iter("span"), 2, None))).strip()
+
+        if start_with_illegal_val(tr_id_val):
+            continue
+
+        if tr_id_val.startswith("submission"):
+            # Single pass over the cells: total, score and details cell
+            tds = list(tr.iter("td"))
+            total = float(_text(tds[-2]).strip())  # total
+            group = _text(next(tr.iter("div")))  # group
+            student_score_string = _text(tds[-3]).split()[-5]
+
+            # grade info has attribute if assignment is dropped
+            details = next(td for td in tds if "details" in td.get("class", "").split())
+            grade_info = next(details.iter("a")).get("aria-expanded", -1)
+            tr_class_val = tr.get("class", "").split()
+            flags = (DROPPED if "dropped" in tr_class_val or grade_info != -1 else 0) | \
+                (EXCUSED if "excused" in tr_class_val else 0)
+            if is_number(student_score_string):
+                assignments.add(group, total, float(student_score_string), flags, assignment_id(tr_id_val))
+            else:
+                assignments.add(group, total, 0.0, flags | UNGRADED, assignment_id(tr_id_val))
+            continue
+
+        if tr_id_val.startswith("grade_info"):
+            # no table in the row when assignment is ungraded
+            tbody = next(tr.iter("tbody"), None)
+            td = next(tbody.iter("td"), None) if tbody is not None else None
+            assignments.add_mean(float(_text(td).split(":")[-1].strip()) if td is not None else 0.0)  # Mean
+
+    return CourseGrades(course_name, student_grade, group_weights, assignments.build())
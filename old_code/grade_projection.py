@@ -0,0 +1,169 @@
+#!/usr/bin/env python
+
+"""grade_projection.py: What-if projections of a course, updating the grades in constant time per hypothetical score"""
+
+__author__ = "Leo Shen, Dhruba Paul"
+__copyright__ = "Copyright 2022, Canvas Course Mean Project"
+
+import math
+from collections import namedtuple
+from grade_columns import NOT_COUNTED
+
+Assignment = namedtuple("Assignment", ["group", "total", "mean", "score", "dropped"])
+
+
+def _contribution(part_sum, total_sum, weight):
+    """
+    Helper Method.
+    part_sum / total_sum * weight, with the conventions of grade_kernel.table_totals (nan counts as 0, x/0 is inf)
+    """
+    try:
+        value = part_sum / total_sum * weight
+    except ZeroDivisionError:
+        value = math.nan if part_sum == 0 else math.copysign(math.inf, part_sum) * weight
+    return 0.0 if math.isnan(value) else value
+
+
+class Projection:
+    """
+    Course avg. and student grade of a course under hypothetical scores.
+
+    Keeps the per-group sums of the computation (mean_sum, student_score_sum, total_sum, dropped count) and the
+    weighted percentage of every group. Changing a score or adding an assignment only updates the sums of its group
+    and the running totals, so every change costs the same whatever the size of the course. Dropped assignments keep
+    the flags read from the page (drop rules are not applied again).
+
+    Usage:
+        projection = Projection(grades)
+        final = projection.add_assignment("Exams", 100)
+        projection.needed_score(final, 90.0)  # score needed on the final for a 90% student grade
+    """
+
+    def __init__(self, grades):
+        """
+        :param grades: CourseGrades of a course with weights
+        """
+        if grades.group_weights is None:
+            raise ValueError(f"{grades.course_name}: class has no weights")
+        self.course_name = grades.course_name
+        assignments = grades.assignments
+        self.groups = sorted(set(grades.group_weights) | set(assignments.group_names))
+        self.group_index = {group: g for g, group in enumerate(self.groups)}
+        self.weights = [float(grades.group_weights.get(group, 0.0)) for group in self.groups]
+        n_groups = len(self.groups)
+        self.mean_sum = [0.0] * n_groups
+        self.student_score_sum = [0.0] * n_groups
+        self.total_sum = [0.0] * n_groups
+        self.counted = [0] * n_groups  # assignments counted (not dropped) per group
+        self.dropped = [0] * n_groups
+        self.assignments = []
+
+        names = assignments.group_names
+        for code, mean, total, flags, score in zip(assignments.group_codes, assignments.means, assignments.totals,
+                                                   assignments.flags, assignments.scores):
+            self._add(Assignment(names[code], total, mean, score, bool(flags & NOT_COUNTED)))
+
+        # Weighted percentage of every group, and their sums
+        self._avg_parts = [self._part(g, self.mean_sum) for g in range(n_groups)]
+        self._student_parts = [self._part(g, self.student_score_sum) for g in range(n_groups)]
+        self.course_avg = math.fsum(self._avg_parts)
+        self.student_grade = math.fsum(self._student_parts)
+
+    def __len__(self):
+        return len(self.assignments)
+
+    def _add(self, assignment):
+        """
+        Helper Method.
+        Adds an assignment to the sums of its group (weighted percentages not updated)
+
+        :return: index of the assignment
+        """
+        g = self.group_index[assignment.group]
+        if assignment.dropped:
+            self.dropped[g] += 1
+        else:
+            self.counted[g] += 1
+            self.mean_sum[g] += assignment.mean
+            self.student_score_sum[g] += assignment.score
+            self.total_sum[g] += assignment.total
+        self.assignments.append(assignment)
+        return len(self.assignments) - 1
+
+    def _part(self, g, sums):
+        """
+        Helper Method.
+        :return: weighted percentage of group g for the given sums (0 for groups with nothing counted)
+        """
+        return _contribution(sums[g], self.total_sum[g], self.weights[g]) if self.counted[g] else 0.0
+
+    def _update_group(self, g):
+        """
+        Helper Method.
+        Updates the weighted percentages of group g and the running totals after its sums changed
+        """
+        for parts, sums, total in ((self._avg_parts, self.mean_sum, "course_avg"),
+                                   (self._student_parts, self.student_score_sum, "student_grade")):
+            old = parts[g]
+            parts[g] = self._part(g, sums)
+            if math.isfinite(old) and math.isfinite(parts[g]):
+                setattr(self, total, getattr(self, total) + parts[g] - old)
+            else:
+                setattr(self, total, math.fsum(parts))  # inf - inf would stick as nan
+
+    def set_score(self, index, score):
+        """
+        Changes the student score of an assignment
+
+        :param index: index of the assignment (order of the grades page, added assignments after)
+        :param score: hypothetical score
+        :return: A tuple (course avg. grade, student grade)
+        """
+        assignment = self.assignments[index]
+        score = float(score)
+        if not assignment.dropped:
+            g = self.group_index[assignment.group]
+            self.student_score_sum[g] += score - assignment.score
+            self._update_group(g)
+        self.assignments[index] = assignment._replace(score=score)
+        return self.course_avg, self.student_grade
+
+    def add_assignment(self, group, total, score=0.0, mean=None):
+        """
+        Adds a hypothetical (future) assignment
+
+        :param group: assignment group of the assignment
+        :param total: total score of the assignment
+        :param score: hypothetical student score
+        :param mean: hypothetical class average (defaults to the current average of the group, leaving the course
+                     avg. unchanged)
+        :return: index of the assignment
+        """
+        if group not in self.group_index:
+            raise KeyError(f"{self.course_name}: no assignment group {group!r}")
+        g = self.group_index[group]
+        total = float(total)
+        if mean is None:
+            mean = self.mean_sum[g] / self.total_sum[g] * total if self.total_sum[g] else 0.0
+        index = self._add(Assignment(group, total, float(mean), float(score), False))
+        self._update_group(g)
+        return index
+
+    def needed_score(self, index, target):
+        """
+        Solves for the minimum score on an assignment giving a student grade of at least target
+
+        :param index: index of the assignment whose score is unknown
+        :param target: student grade aimed at (same scale as student_grade)
+        :return: minimum score (0.0 if the target is reached whatever the score, more than the total of the
+                 assignment if it cannot be reached), None if the score of the assignment does not change the grade
+        """
+        assignment = self.assignments[index]
+        g = self.group_index[assignment.group]
+        if assignment.dropped or not self.total_sum[g] or not self.weights[g]:
+            return None
+        rest = self.student_grade - self._student_parts[g]  # grade without the group
+        if not math.isfinite(rest):
+            return None
+        other_scores = self.student_score_sum[g] - assignment.score
+        return max((target - rest) * self.total_sum[g] / self.weights[g] - other_scores, 0.0)
@@ -0,0 +1,367 @@
+#!/usr/bin/env python
+
+"""grade_server.py: Local JSON/HTTP service serving the computed course averages to several clients at once
+
+Usage:
+    python grade_server.py --port 8080        (uses the session saved by CanvasCourseMean.py)
+
+    GET /courses                    list of the active courses
+    GET /courses/<id>               course avg., student grade and Canvas grade of a course
+    GET /courses/<id>/groups        per-group table of a course
+"""
+
+__author__ = "Leo Shen, Dhruba Paul"
+__copyright__ = "Copyright 2022, Canvas Course Mean Project"
+
+import argparse
+import asyncio
+import hashlib
+import json
+import re
+import sys
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from batch_cli import course_record
+from canvas_api import CanvasAPI, MAX_CONCURRENT_FETCHES
+from grade_calc import calculate_course
+import tracing
+
+DEFAULT_PORT = 8080
+DEFAULT_TTL = 60  # seconds a computed course is served without asking Canvas again
+MAX_HEADER_BYTES = 16 * 1024
+
+ENTITY_TAG = re.compile(r'\s*(?:W/)?"([^"]*)"\s*(?:,|$)')  # one entity tag of a list (weak or strong)
+
+CachedBody = namedtuple("CachedBody", ["body", "etag"])
+CacheEntry = namedtuple("CacheEntry", ["data", "bodies", "fetched_at"])
+
+
+class HTTPError(Exception):
+    """
+    Error answered to the client with its status and message
+    """
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def encode(data):
+    """
+    Helper Method.
+    :param data: JSON-able data
+    :return: CachedBody with the JSON body and its ETag
+    """
+    body = json.dumps(data).encode()
+    return CachedBody(body, '"%s"' % hashlib.blake2b(body, digest_size=16).hexdigest())
+
+
+def not_modified(if_none_match, etag):
+    """
+    Helper Method.
+    Evaluates an If-None-Match header against the ETag of a response (RFC 9110 13.1.2): the header is "*" or a
+    comma-separated list of entity tags, compared with the weak comparison (a W/ prefix on either side is ignored)
+
+    :param if_none_match: value of the header, None if the request has none
+    :param etag: ETag of the response
+    :return: True if the client's copy is current (the response is 304 Not Modified)
+    """
+    if if_none_match is None:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag[2:] if etag.startswith("W/") else etag
+    return any('"%s"' % tag == opaque for tag in ENTITY_TAG.findall(if_none_match))
+
+
+class GradeServer:
+    """
+    Serves the course list, course summaries and per-group tables from an in-memory cache.
+
+    Entries older than ttl are refreshed from Canvas on the next request. Refreshes are coalesced: however many
+    requests for a course arrive while it is being fetched, there is a single upstream fetch and computation,
+    which they all wait for. A failing refresh keeps serving the previous entry if there is one.
+    Responses carry an ETag, and matching If-None-Match requests are answered with 304 Not Modified.
+    """
+
+    def __init__(self, api, ttl=DEFAULT_TTL, max_workers=MAX_CONCURRENT_FETCHES, clock=time.monotonic):
+        """
+        :param api: CanvasAPI object (logged in) the courses are fetched with
+        :param ttl: seconds an entry is served without refreshing it
+        :param max_workers: maximum number of upstream fetches at the same time
+        :param clock: monotonic clock (injectable for tests)
+        """
+        self.api = api
+        self.ttl = ttl
+        self.clock = clock
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+        self.entries = {}  # key: CacheEntry
+        self.refreshing = {}  # key: future of the refresh in progress
+
+        # Counters
+        self.requests = 0
+        self.not_modified = 0
+        self.upstream_fetches = 0
+
+    # Cache
+
+    async def get(self, key, load, views):
+        """
+        Looks up an entry, refreshing it (once for all concurrent callers) if it is missing or too old
+
+        :param key: key of the entry
+        :param load: blocking function returning the data of the entry (run on the thread pool)
+        :param views: dictionary {view name: function of the data returning the JSON-able body of the view}
+        :return: CacheEntry
+        """
+        entry = self.entries.get(key)
+        if entry is not None and self.clock() - entry.fetched_at < self.ttl:
+            return entry
+        future = self.refreshing.get(key)
+        if future is None:
+            future = asyncio.ensure_future(self._refresh(key, load, views))
+            self.refreshing[key] = future
+            future.add_done_callback(lambda f: self.refreshing.pop(key, None))
+        try:
+            return await asyncio.shield(future)  # a client going away does not cancel the others' refresh
+        except HTTPError:
+            raise
+        except Exception as e:
+            if entry is not None:
+                return entry  # Canvas unreachable: the last known numbers are better than none
+            raise HTTPError(HTTPStatus.BAD_GATEWAY, f"Could not fetch from Canvas: {e}")
+
+    async def _refresh(self, key, load, views):
+        """
+        Helper Method.
+        Fetches and encodes an entry
+
+        :return: CacheEntry
+        """
+        self.upstream_fetches += 1
+        data = await asyncio.get_running_loop().run_in_executor(self.executor, load)
+        entry = CacheEntry(data, {name: encode(view(data)) for name, view in views.items()}, self.clock())
+        self.entries[key] = entry
+        return entry
+
+    async def courses(self):
+        """
+        :return: CacheEntry of the active courses (data: dictionary {course id: course name})
+        """
+        def load():
+            return {course_id: name for name, course_id in self.api.get_active_courses().items()}
+        return await self.get("courses", load, {
+            "list": lambda courses: [{"id": course_id, "name": name, "url": f"/courses/{course_id}"}
+                                     for course_id, name in courses.items()]})
+
+    async def course(self, course_id):
+        """
+        :param course_id: id of the course
+        :return: CacheEntry of the course (data: record of batch_cli.course_record)
+        """
+        if course_id not in (await self.courses()).data:
+            raise HTTPError(HTTPStatus.NOT_FOUND, f"No active course {course_id}")
+
+        def load():
+            with tracing.span("serve", course_id=course_id):
+                return course_record(calculate_course(self.api.get_course_grades(course_id)))
+        return await self.get(("course", course_id), load, {
+            "summary": lambda record: {"id": course_id, **{k: v for k, v in record.items() if k != "groups"}},
+            "groups": lambda record: {"id": course_id, "course_name": record["course_name"],
+                                      "groups": record.get("groups", [])}})
+
+    async def route(self, path):
+        """
+        :param path: path of the request
+        :return: CachedBody of the response
+        """
+        path = path.split("?", 1)[0].rstrip("/")
+        if path == "/courses":
+            return (await self.courses()).bodies["list"]
+        match = re.fullmatch(r"/courses/(\d+)(/groups)?", path)
+        if match is None:
+            raise HTTPError(HTTPStatus.NOT_FOUND, f"No such endpoint: {path}")
+        return (await self.course(match.group(1))).bodies["groups" if match.group(2) else "summary"]
+
+    # HTTP
+
+    async def handle(self, reader, writer):
+        """
+        Serves the requests of one connection (HTTP/1.1 with keep-alive, GET and HEAD only)
+
+        :param reader: asyncio.StreamReader of the connection
+        :param writer: asyncio.StreamWriter of the connection
+        :return: None
+        """
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b"\r\n\r\n")
+                except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError,
+                        asyncio.CancelledError):  # cancelled: server shutting down while the client idles
+                    return
+                request_line, *header_lines = head.decode("latin-1").split("\r\n")
+                headers = {}
+                for line in header_lines:
+                    if ":" in line:
+                        name, value = line.split(":", 1)
+                        headers[name.strip().lower()] = value.strip()
+                parts = request_line.split()
+                keep_alive = len(parts) == 3 and parts[2] == "HTTP/1.1" and \
+                    headers.get("connection", "").lower() != "close"
+                length = headers.get("content-length") or "0"
+                if not (length.isascii() and length.isdigit()):  # the body cannot be skipped: 400, then close
+                    parts, keep_alive = [], False
+                elif int(length):
+                    await reader.readexactly(int(length))
+                await self.respond(writer, parts, headers, keep_alive)
+                await writer.drain()
+                if not keep_alive:
+                    return
+        except (ConnectionError, asyncio.IncompleteReadError):  # incomplete: client gone before the end of the body
+            pass
+        finally:
+            writer.close()
+
+    async def respond(self, writer, parts, headers, keep_alive):
+        """
+        Helper Method.
+        Writes the response to one request
+        """
+        self.requests += 1
+        status, body, etag = HTTPStatus.OK, b"", None
+        if len(parts) != 3 or parts[0] not in ("GET", "HEAD"):
+            status = HTTPStatus.METHOD_NOT_ALLOWED if len(parts) == 3 else HTTPStatus.BAD_REQUEST
+            body = json.dumps({"error": status.phrase}).encode()
+        else:
+            try:
+                body, etag = await self.route(parts[1])
+            except HTTPError as e:
+                status, body = e.status, json.dumps({"error": str(e)}).encode()
+            if etag is not None and not_modified(headers.get("if-none-match"), etag):
+                self.not_modified += 1
+                status, body = HTTPStatus.NOT_MODIFIED, b""
+
+        lines = [f"HTTP/1.1 {status.value} {status.phrase}", "Content-Type: application/json",
+                 f"Content-Length: {len(body)}", "Cache-Control: max-age=0, must-revalidate",
+                 "Connection: " + ("keep-alive" if keep_alive else "close")]
+        if etag is not None:
+            lines.append(f"ETag: {etag}")
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + (body if parts[:1] != ["HEAD"] else b""))
+
+    async def serve(self, host="127.0.0.1", port=DEFAULT_PORT):
+        """
+        Starts listening
+
+        :param host: interface to listen on ("0.0.0.0" to share with other machines)
+        :param port: port to listen on (0 picks a free one)
+        :return: asyncio.Server
+        """
+        return await asyncio.start_server(self.handle, host, port, limit=MAX_HEADER_BYTES)
+
+    def close(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+class ServerThread:
+    """
+    GradeServer running on an event loop of its own, on a background thread.
+
+    Usage:
+        with ServerThread(GradeServer(api)) as server:
+            requests.get(server.url + "/courses")
+    """
+
+    def __init__(self, grade_server, host="127.0.0.1", port=0):
+        """
+        :param grade_server: GradeServer
+        :param host: interface to listen on
+        :param port: port to listen on (0 picks a free one)
+        """
+        self.grade_server = grade_server
+        self.host = host
+        self.port = port
+        self.loop = asyncio.new_event_loop()
+        self.thread = None
+        self.server = None
+        self.url = None
+
+    def start(self):
+        started = threading.Event()
+
+        def run():
+            asyncio.set_event_loop(self.loop)
+            self.server = self.loop.run_until_complete(self.grade_server.serve(self.host, self.port))
+            self.url = "http://%s:%d" % self.server.sockets[0].getsockname()[:2]
+            started.set()
+            self.loop.run_forever()
+            # Connections still open (keep-alive clients) are closed before the loop is
+            tasks = asyncio.all_tasks(self.loop)
+            for task in tasks:
+                task.cancel()
+            self.loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+            self.loop.close()
+
+        self.thread = threading.Thread(target=run, daemon=True)
+        self.thread.start()
+        started.wait()
+        return self
+
+    def stop(self):
+        self.loop.call_soon_threadsafe(self.server.close)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        self.grade_server.close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main(argv=None):
+    """
+    Command line entry point
+
+    :param argv: command line arguments (defaults to sys.argv)
+    :return: exit status
+    """
+    from canvas_api import CANVAS_URL
+    from grade_cache import GradeCache
+    from session_store import SessionStore, resume_session
+    parser = argparse.ArgumentParser(description="Local JSON/HTTP service serving the course averages")
+    parser.add_argument("--host", default="127.0.0.1", help="interface to listen on (0.0.0.0 to share)")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--ttl", type=float, default=DEFAULT_TTL, help="seconds a course is served before refreshing")
+    parser.add_argument("--canvas", default=CANVAS_URL, help="root url of the Canvas instance")
+    args = parser.parse_args(argv)
+
+    cookies = resume_session(SessionStore(), args.canvas)
+    if cookies is None:
+        print("No valid Canvas session: log in with CanvasCourseMean.py first", file=sys.stderr)
+        return 1
+    api = CanvasAPI(args.canvas, cookies, cache=GradeCache())
+    grade_server = GradeServer(api, args.ttl)
+
+    async def serve():
+        server = await grade_server.serve(args.host, args.port)
+        print(f"Serving the course averages on http://{args.host}:{server.sockets[0].getsockname()[1]}")
+        async with server:
+            await server.serve_forever()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        grade_server.close()
+        api.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
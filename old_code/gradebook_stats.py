@@ -0,0 +1,343 @@
+#!/usr/bin/env python
+
+"""gradebook_stats.py: Class statistics of a Canvas gradebook CSV export, streamed in chunks (no GUI, no browser)
+
+Usage:
+    python gradebook_stats.py gradebook.csv --groups groups.json --students ranks.csv
+
+groups.json gives the weight of every assignment group (the group_weights of the grades page) and a regular
+expression matching the columns of its assignments (Canvas names them "<assignment name> (<assignment id>)"):
+    {"Exams": {"weight": 40, "match": "Midterm|Final"}, "Homework": {"weight": 60, "match": "^HW"}}
+"""
+
+__author__ = "Leo Shen, Dhruba Paul"
+__copyright__ = "Copyright 2022, Canvas Course Mean Project"
+
+import argparse
+import csv
+import json
+import re
+import sys
+from collections import namedtuple
+import numpy as np
+from grade_calc import calculate_grade
+
+DEFAULT_CHUNK_SIZE = 5000  # students held in memory at a time
+DEFAULT_PERCENTILES = (10, 25, 50, 75, 90)
+EXCUSED = "EX"
+POINTS_POSSIBLE = "Points Possible"
+TEST_STUDENT = "Student, Test"  # student view account Canvas adds to every export
+MAX_PREAMBLE_ROWS = 3  # rows between the header and the students ("Manual Posting", "Points Possible")
+
+Distribution = namedtuple("Distribution", ["count", "mean", "median", "percentiles"])
+
+
+class GradebookStats(namedtuple("GradebookStats", ["groups", "weights", "course_avg", "students", "student_ids",
+                                                   "grades", "ranks", "overall", "group_stats",
+                                                   "group_percentages", "ignored_columns"])):
+    """
+    Statistics of a gradebook.
+
+    grades (weighted grade of every student), ranks (1 for the best grade, ties share a rank) and
+    group_percentages (students x groups, percentage of every group, nan where nothing is counted) are numpy
+    arrays in the order of the export. course_avg is computed from the class mean of every assignment, the way
+    calculate_grade does for a single student's grades page.
+    """
+    __slots__ = ()
+
+    @property
+    def summary(self):
+        """
+        :return: a string with the statistics for the user
+        """
+        def line(name, d):
+            if not d.count:
+                return f"{name}: no grades\n"
+            return f"{name}: mean {d.mean:.2f}, median {d.median:.2f}, " + \
+                ", ".join(f"p{p:g} {v:.2f}" for p, v in d.percentiles.items()) + f" ({d.count} students)\n"
+
+        return_str = f"Students: {len(self.students)}\nCourse Average: {self.course_avg}\n" + \
+            line("Student Grades", self.overall)
+        for group, weight in zip(self.groups, self.weights):
+            return_str += line(f"  {group} ({weight:g}%)", self.group_stats[group])
+        if self.ignored_columns:
+            return_str += f"Columns matching no group (not counted): {', '.join(self.ignored_columns)}\n"
+        return return_str
+
+
+def load_group_spec(path):
+    """
+    Helper Method.
+    Reads a group specification file (see the usage of the module)
+
+    :param path: path of the JSON file
+    :return: dictionary {group: {"weight": weight, "match": regular expression}}
+    """
+    with open(path, encoding="utf-8") as f:
+        spec = json.load(f)
+    for group, entry in spec.items():
+        if "weight" not in entry or "match" not in entry:
+            raise ValueError(f"{path}: group {group!r} needs a weight and a match expression")
+    return spec
+
+
+def read_preamble(f):
+    """
+    Helper Method.
+    Reads the header and the "Points Possible" row of an export, leaving f at the first student
+
+    :param f: text file of the export
+    :return: A tuple (list of column names, list of the points possible of every column)
+    """
+    reader = csv.reader(f)
+    header = next(reader, None)
+    if header is None:
+        raise ValueError("empty gradebook export")
+    for _ in range(MAX_PREAMBLE_ROWS):
+        row = next(reader, None)
+        if row and row[0].strip() == POINTS_POSSIBLE:
+            return header, row
+    raise ValueError(f"no {POINTS_POSSIBLE!r} row: not a Canvas gradebook export")
+
+
+def assignment_columns(header, points, spec):
+    """
+    Helper Method.
+    Finds the assignment columns (columns with points possible) and the group of every one
+
+    :param header: list of column names
+    :param points: list of the points possible of every column
+    :param spec: dictionary {group: {"weight": weight, "match": regular expression}}
+    :return: A tuple (list of column indices, list of their group, list of their points, list of the names of the
+             assignment columns matching no group)
+    """
+    patterns = [(group, re.compile(entry["match"])) for group, entry in spec.items()]
+    columns, groups, totals, ignored = [], [], [], []
+    for i, (name, possible) in enumerate(zip(header, points)):
+        try:
+            total = float(possible)
+        except ValueError:
+            continue  # identity and computed score columns ("(read only)")
+        group = next((group for group, pattern in patterns if pattern.search(name)), None)
+        if group is None:
+            ignored.append(name)
+            continue
+        columns.append(i)
+        groups.append(group)
+        totals.append(total)
+    return columns, groups, totals, ignored
+
+
+def to_scores(cells):
+    """
+    Helper Method.
+    Converts a chunk of cells to scores
+
+    :param cells: 2D object array of the cell strings
+    :return: A tuple (float array of the scores, nan where there is none; bool array, True where excused)
+    """
+    excused = cells == EXCUSED
+    cells[excused | (cells == "")] = "nan"
+    try:
+        return cells.astype(np.float64), excused
+    except ValueError:  # text in a score column: not a score
+        import pandas as pd
+        return pd.to_numeric(cells.ravel(), errors="coerce").reshape(cells.shape).astype(np.float64), excused
+
+
+def distribution(values, percentiles):
+    """
+    Helper Method.
+    :param values: float array (nan values left out)
+    :param percentiles: percentiles to compute
+    :return: Distribution
+    """
+    values = values[~np.isnan(values)]
+    if not len(values):
+        return Distribution(0, None, None, {p: None for p in percentiles})
+    return Distribution(len(values), float(values.mean()), float(np.median(values)),
+                        dict(zip(percentiles, (float(v) for v in np.percentile(values, percentiles)))))
+
+
+def competition_ranks(grades):
+    """
+    Helper Method.
+    :param grades: float array
+    :return: int array, 1 + the number of grades strictly better than every grade
+    """
+    ordered = np.sort(grades)
+    return len(grades) - np.searchsorted(ordered, grades, side="right") + 1
+
+
+class GradebookAccumulator:
+    """
+    Folds chunks of students into per-student group sums and per-assignment class sums.
+
+    Memory is one chunk of cells plus a few numbers per student (grade and group percentages), whatever the number
+    of assignments. Scores follow the grades page computation: per group, sum of scores / sum of points * weight,
+    summed over the groups with at least one assignment counted. Excused assignments are not counted, ungraded ones
+    count as 0 (like the grades page) unless skip_ungraded is set (Canvas' "current score").
+    """
+
+    def __init__(self, groups, weights, column_groups, column_totals, skip_ungraded=False):
+        """
+        :param groups: list of the group names
+        :param weights: list of the weights of the groups
+        :param column_groups: list of the group of every assignment column
+        :param column_totals: list of the points possible of every assignment column
+        :param skip_ungraded: leaves ungraded assignments out instead of counting them as 0
+        """
+        self.groups = list(groups)
+        self.weights = np.asarray(weights, dtype=np.float64)
+        index = {group: g for g, group in enumerate(self.groups)}
+        self.column_groups = list(column_groups)
+        self.totals = np.asarray(column_totals, dtype=np.float64)
+        # assignments x groups: 1 where the assignment belongs to the group
+        self.membership = np.zeros((len(self.totals), len(self.groups)))
+        self.membership[np.arange(len(self.totals)), [index[group] for group in self.column_groups]] = 1.0
+        self.points_membership = self.membership * self.totals[:, None]
+        self.skip_ungraded = skip_ungraded
+
+        self.score_sums = np.zeros(len(self.totals))  # per assignment, over the students it counts for
+        self.counts = np.zeros(len(self.totals))
+        self.grades = []  # one array per chunk
+        self.group_percentages = []
+
+    def add(self, scores, excused):
+        """
+        :param scores: float array (students x assignment columns), nan where there is no score
+        :param excused: bool array (students x assignment columns), True where excused
+        :return: None
+        """
+        graded = ~np.isnan(scores)
+        counted = graded if self.skip_ungraded else ~excused
+        scores = np.where(graded & counted, scores, 0.0)
+        counted = counted.astype(np.float64)
+        self.score_sums += scores.sum(axis=0)
+        self.counts += counted.sum(axis=0)
+
+        score_sum = scores @ self.membership
+        total_sum = counted @ self.points_membership
+        present = (counted @ self.membership) > 0
+        with np.errstate(divide="ignore", invalid="ignore"):
+            fractions = score_sum / total_sum
+        weighted = fractions * self.weights
+        self.grades.append(np.where(present & ~np.isnan(weighted), weighted, 0.0).sum(axis=1))
+        self.group_percentages.append(np.where(present, fractions * 100, np.nan))
+
+    def course_avg(self):
+        """
+        :return: course avg. of the class means of the assignments (assignments nobody is counted for left out)
+        """
+        with np.errstate(divide="ignore", invalid="ignore"):
+            means = self.score_sums / self.counts
+        dropped = self.counts == 0
+        if dropped.all():
+            return None
+        means = np.where(dropped, 0.0, means)
+        result = calculate_grade(self.column_groups, means, self.totals, dropped, means,
+                                 dict(zip(self.groups, self.weights)))
+        return result.course_avg
+
+
+def gradebook_stats(f, spec, chunk_size=DEFAULT_CHUNK_SIZE, skip_ungraded=False, percentiles=DEFAULT_PERCENTILES):
+    """
+    Computes the statistics of a gradebook export, chunk_size students at a time
+
+    :param f: path or text file of the export
+    :param spec: dictionary {group: {"weight": weight, "match": regular expression}}
+    :param chunk_size: number of students read at a time
+    :param skip_ungraded: leaves ungraded assignments out instead of counting them as 0
+    :param percentiles: percentiles to compute
+    :return: GradebookStats
+    """
+    import pandas as pd
+    if isinstance(f, str):
+        with open(f, encoding="utf-8-sig", newline="") as file:
+            return gradebook_stats(file, spec, chunk_size, skip_ungraded, percentiles)
+
+    header, points = read_preamble(f)
+    columns, column_groups, column_totals, ignored = assignment_columns(header, points, spec)
+    groups = list(spec)
+    accumulator = GradebookAccumulator(groups, [float(spec[group]["weight"]) for group in groups], column_groups,
+                                       column_totals, skip_ungraded)
+    identity = [header.index(name) if name in header else None for name in ("Student", "ID")]
+    students, student_ids = [], []
+    usecols = sorted({i for i in identity if i is not None} | set(columns))
+    positions = {column: p for p, column in enumerate(usecols)}
+
+    for chunk in pd.read_csv(f, header=None, usecols=usecols, dtype=str, keep_default_na=False,
+                             chunksize=chunk_size):
+        cells = chunk.to_numpy(dtype=object)
+        names = cells[:, positions[identity[0]]] if identity[0] is not None else np.full(len(cells), "")
+        keep = names != TEST_STUDENT
+        if not keep.all():
+            cells, names = cells[keep], names[keep]
+        students.extend(names)
+        student_ids.extend(cells[:, positions[identity[1]]] if identity[1] is not None else [""] * len(cells))
+        accumulator.add(*to_scores(cells[:, [positions[c] for c in columns]]))
+        del chunk, cells  # the chunk is not needed once folded into the sums
+
+    grades = np.concatenate(accumulator.grades) if accumulator.grades else np.zeros(0)
+    group_percentages = np.concatenate(accumulator.group_percentages) if accumulator.group_percentages \
+        else np.zeros((0, len(groups)))
+    return GradebookStats(groups, accumulator.weights.tolist(), accumulator.course_avg(), students, student_ids,
+                          grades, competition_ranks(grades), distribution(grades, percentiles),
+                          {group: distribution(group_percentages[:, g], percentiles)
+                           for g, group in enumerate(groups)},
+                          group_percentages, ignored)
+
+
+def write_students(stats, f):
+    """
+    Writes the grade and rank of every student as CSV, best first
+
+    :param stats: GradebookStats
+    :param f: text file to write to
+    :return: None
+    """
+    writer = csv.writer(f)
+    writer.writerow(["Student", "ID", "grade", "rank"] + [f"{group} %" for group in stats.groups])
+    for i in np.argsort(stats.ranks, kind="stable"):
+        writer.writerow([stats.students[i], stats.student_ids[i], "%.4f" % stats.grades[i], stats.ranks[i]] +
+                        ["" if np.isnan(p) else "%.4f" % p for p in stats.group_percentages[i]])
+
+
+def main(argv=None):
+    """
+    Command line entry point
+
+    :param argv: command line arguments (defaults to sys.argv)
+    :return: exit status
+    """
+    parser = argparse.ArgumentParser(description="Class statistics of a Canvas gradebook CSV export")
+    parser.add_argument("gradebook", help="CSV export of the Canvas gradebook")
+    parser.add_argument("--groups", required=True, help="JSON file with the weight and columns of every group")
+    parser.add_argument("--students", help="CSV file to write the grade and rank of every student to")
+    parser.add_argument("--skip-ungraded", action="store_true",
+                        help="leave ungraded assignments out instead of counting them as 0")
+    parser.add_argument("--percentiles", default=",".join(map(str, DEFAULT_PERCENTILES)),
+                        help="comma separated percentiles")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="students read at a time")
+    args = parser.parse_args(argv)
+
+    try:
+        spec = load_group_spec(args.groups)
+    except (OSError, ValueError) as e:
+        print(f"{args.groups}: {e}", file=sys.stderr)
+        return 1
+    try:
+        stats = gradebook_stats(args.gradebook, spec, args.chunk_size, args.skip_ungraded,
+                                tuple(float(p) for p in args.percentiles.split(",")))
+    except (OSError, ValueError) as e:
+        print(f"{args.gradebook}: {e}", file=sys.stderr)
+        return 1
+    print(stats.summary, end="")
+    if args.students:
+        with open(args.students, "w", encoding="utf-8", newline="") as f:
+            write_students(stats, f)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
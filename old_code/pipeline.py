@@ -0,0 +1,153 @@
+#!/usr/bin/env python
+
+"""pipeline.py: Runs items through stages on their own threads, with bounded queues between the stages"""
+
+__author__ = "Leo Shen, Dhruba Paul"
+__copyright__ = "Copyright 2022, Canvas Course Mean Project"
+
+import queue
+import threading
+from collections import namedtuple
+
+DEFAULT_QUEUE_SIZE = 2  # items waiting between two stages
+POLL_TIMEOUT = 0.1  # seconds a blocked thread waits before checking whether the pipeline was stopped
+COMPUTE_WORKERS = 1  # threads parsing and computing while the next courses are fetched (parsing holds the GIL)
+
+Stage = namedtuple("Stage", ["name", "function", "workers"])
+
+_DONE = object()  # end of the items, passed down the queues
+
+
+class Pipeline:
+    """
+    Overlaps the stages of a job: while stage 2 works on item N, stage 1 already works on item N + 1 (and the
+    consumer of the results on item N - 1). Every stage has its own worker threads.
+
+    The queues between the stages hold at most queue_size items. A stage getting ahead of the next one blocks
+    until it catches up (backpressure), so at most sum(workers) + (number of stages + 1) * queue_size + 1 items
+    are in flight whatever the number of items, and every intermediate value (e.g. the html of a page) is released
+    as soon as the next stage is done with it. A Pipeline runs once.
+    An item failing in a stage skips the next stages and comes out with its exception.
+
+    Usage:
+        pipeline = Pipeline([Stage("fetch", pool.fetch_page, 3), Stage("compute", compute_page, 2)])
+        for url, result, error in pipeline.run(urls):
+            ...
+    """
+
+    def __init__(self, stages, queue_size=DEFAULT_QUEUE_SIZE):
+        """
+        :param stages: list of Stage (name, function of the value of the previous stage, number of threads)
+        :param queue_size: maximum number of items waiting between two stages
+        """
+        self.stages = list(stages)
+        self.queue_size = queue_size
+        self.stopped = threading.Event()
+
+        # Counters
+        self.in_flight = 0  # items taken from the input and not handed to the consumer yet
+        self.max_in_flight = 0
+        self.lock = threading.Lock()
+
+    def _put(self, q, entry):
+        """
+        Helper Method.
+        Puts an entry in a queue, waiting for room unless the pipeline is stopped
+
+        :return: False if the pipeline was stopped
+        """
+        while not self.stopped.is_set():
+            try:
+                q.put(entry, timeout=POLL_TIMEOUT)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def _get(self, q):
+        """
+        Helper Method.
+        Takes an entry from a queue, waiting for one unless the pipeline is stopped
+
+        :return: the entry, _DONE if the pipeline was stopped
+        """
+        while not self.stopped.is_set():
+            try:
+                return q.get(timeout=POLL_TIMEOUT)
+            except queue.Empty:
+                pass
+        return _DONE
+
+    def _feed(self, items, q):
+        """
+        Helper Method.
+        Puts the items in the first queue (as the first stage takes them)
+        """
+        try:
+            for item in items:
+                with self.lock:
+                    self.in_flight += 1
+                    self.max_in_flight = max(self.max_in_flight, self.in_flight)
+                if not self._put(q, (item, item, None)):
+                    return
+        finally:
+            self._put(q, _DONE)
+
+    def _work(self, stage, q_in, q_out, remaining):
+        """
+        Helper Method.
+        Worker thread of a stage: applies the function of the stage to the entries of q_in until the end
+        """
+        try:
+            while True:
+                entry = self._get(q_in)
+                if entry is _DONE:
+                    self._put(q_in, _DONE)  # for the other workers of the stage
+                    return
+                item, value, error = entry
+                del entry
+                if error is None:
+                    try:
+                        value = stage.function(value)
+                    except Exception as e:
+                        value, error = None, e
+                if not self._put(q_out, (item, value, error)):
+                    return
+                del value  # the value of the previous stage is not held while waiting for the next entry
+        finally:
+            with self.lock:
+                remaining[0] -= 1
+                last = remaining[0] == 0
+            if last:
+                self._put(q_out, _DONE)
+
+    def run(self, items):
+        """
+        Runs the items through the stages
+
+        :param items: iterable of items (the value handed to the first stage)
+        :return: generator of tuples (item, value of the last stage or None, exception or None), in order of
+                 completion. Closing it early stops the stages.
+        """
+        queues = [queue.Queue(maxsize=self.queue_size) for _ in range(len(self.stages) + 1)]
+        threads = [threading.Thread(target=self._feed, args=(items, queues[0]), daemon=True)]
+        for i, stage in enumerate(self.stages):
+            remaining = [stage.workers]
+            threads += [threading.Thread(target=self._work, args=(stage, queues[i], queues[i + 1], remaining),
+                                         name=f"{stage.name} {n + 1}", daemon=True) for n in range(stage.workers)]
+        for thread in threads:
+            thread.start()
+
+        try:
+            while True:
+                entry = self._get(queues[-1])
+                if entry is _DONE:
+                    return
+                with self.lock:
+                    self.in_flight -= 1
+                yield entry
+                del entry
+        finally:
+            self.stopped.set()
+            for thread in threads:
+                thread.join()
@@ -0,0 +1,260 @@
+#!/usr/bin/env python
+
+"""refresh_scheduler.py: Re-checks the courses on an interval and reports only what changed since the last check"""
+
+__author__ = "Leo Shen, Dhruba Paul"
+__copyright__ = "Copyright 2022, Canvas Course Mean Project"
+
+import hashlib
+import random
+import threading
+import time
+from collections import namedtuple
+from grade_cache import grades_to_json
+from grade_columns import NOT_COUNTED, UNGRADED
+import tracing
+
+DEFAULT_INTERVAL = 15 * 60  # seconds between two checks
+DEFAULT_JITTER = 0.1  # fraction of the interval the checks are moved by at random (no synchronized bursts)
+
+# Kinds of changes
+COURSE_ADDED = "course added"
+GRADE_POSTED = "grade posted"
+SCORE_CHANGED = "score changed"
+MEAN_UPDATED = "mean updated"
+ASSIGNMENT_DROPPED = "assignment dropped"
+ASSIGNMENT_RESTORED = "assignment no longer dropped"
+ASSIGNMENT_ADDED = "assignment added"
+ASSIGNMENT_REMOVED = "assignment removed"
+CANVAS_GRADE_CHANGED = "canvas grade changed"
+
+
+class Change(namedtuple("Change", ["course", "kind", "group", "position", "old", "new"])):
+    """
+    One change of a course between two checks. group and position (within the group, order of the grades page)
+    are None for changes of the whole course, old and new are the values that changed.
+    """
+    __slots__ = ()
+
+    @property
+    def message(self):
+        """
+        :return: a string describing the change for the user
+        """
+        where = "" if self.group is None else f"{self.group} #{self.position + 1}: "
+        if self.kind in (COURSE_ADDED, ASSIGNMENT_DROPPED, ASSIGNMENT_RESTORED, ASSIGNMENT_REMOVED):
+            return f"{where}{self.kind}"
+        if self.kind == ASSIGNMENT_ADDED:
+            return f"{where}{self.kind} (out of {self.new[2]:g})"
+        if self.kind == GRADE_POSTED:
+            return f"{where}{self.kind} ({self.new})"
+        return f"{where}{self.kind} ({self.old} -> {self.new})"
+
+
+def content_hash(grades):
+    """
+    Helper Method.
+    :param grades: CourseGrades
+    :return: digest of everything the computation reads
+    """
+    return hashlib.blake2b(grades_to_json(grades).encode(), digest_size=16).digest()
+
+
+def scored_rows(grades):
+    """
+    Helper Method.
+    Assignment rows of a course keyed by Canvas id (so an assignment published ahead of others does not shift them),
+    with None as the score of the ungraded assignments (an ungraded assignment and a grade of 0 both have a score of 0)
+
+    :param grades: CourseGrades
+    :return: dictionary {assignment id (or (group, position) without one): (group, position within the group,
+             (mean, score or None, total, dropped))}
+    """
+    rows = {}
+    positions = {}
+    assignments = grades.assignments
+    names = assignments.group_names
+    for code, assignment_id, mean, total, flags, score in zip(assignments.group_codes, assignments.ids,
+                                                              assignments.means, assignments.totals,
+                                                              assignments.flags, assignments.scores):
+        group = names[code]
+        position = positions[group] = positions.get(group, -1) + 1
+        rows[assignment_id or (group, position)] = (group, position, (mean, None if flags & UNGRADED else score,
+                                                                      total, int(bool(flags & NOT_COUNTED))))
+    return rows
+
+
+def diff_courses(old, new):
+    """
+    Compares two versions of the grades of a course, assignment by assignment
+
+    :param old: CourseGrades of the previous check, None for a course seen for the first time
+    :param new: CourseGrades of this check
+    :return: list of Change (at the group and position of the assignment in new, in old for removed ones)
+    """
+    course = new.course_name
+    if old is None:
+        return [Change(course, COURSE_ADDED, None, None, None, None)]
+    changes = []
+    if old.canvas_grade != new.canvas_grade:
+        changes.append(Change(course, CANVAS_GRADE_CHANGED, None, None, old.canvas_grade, new.canvas_grade))
+    old_rows = scored_rows(old)
+    new_rows = scored_rows(new)
+    for key, (group, position, values) in new_rows.items():
+        previous = old_rows.get(key)
+        if previous is None:
+            changes.append(Change(course, ASSIGNMENT_ADDED, group, position, None, values))
+            continue
+        (old_mean, old_score, _, old_dropped), (mean, score, _, dropped) = previous[2], values
+        if old_score != score:
+            changes.append(Change(course, GRADE_POSTED if old_score is None else SCORE_CHANGED, group, position,
+                                  old_score, score))
+        if old_mean != mean:
+            changes.append(Change(course, MEAN_UPDATED, group, position, old_mean, mean))
+        if old_dropped != dropped:
+            changes.append(Change(course, ASSIGNMENT_DROPPED if dropped else ASSIGNMENT_RESTORED, group, position,
+                                  bool(old_dropped), bool(dropped)))
+    changes.extend(Change(course, ASSIGNMENT_REMOVED, group, position, values, None)
+                   for key, (group, position, values) in old_rows.items() if key not in new_rows)
+    return changes
+
+
+def api_courses(api, max_workers=None):
+    """
+    Fetcher of the scheduler going over the Canvas API, on the same pipeline stages as get_all_active_courses
+    (canvas_api.grade_stages: fetch, then compute). With a GradeCache on the api, courses that did not change cost
+    a conditional request (304) per endpoint and no parsing.
+
+    :param api: CanvasAPI object
+    :param max_workers: maximum number of courses fetched at the same time (defaults to MAX_CONCURRENT_FETCHES)
+    :return: function of the function of the compute stage (None for grade_calc.compute_grades) returning a list
+             of tuples (course name, value of the compute stage or None, exception or None)
+    """
+    def fetch(compute=None):
+        from canvas_api import grade_stages
+        from pipeline import Pipeline
+        with tracing.span("navigation"):
+            course_links = api.get_active_courses()
+        course_names = {course_id: course for course, course_id in course_links.items()}
+        return [(course_names[course_id], value, error) for course_id, value, error
+                in Pipeline(grade_stages(api, max_workers, compute)).run(course_links.values())]
+    return fetch
+
+
+class RefreshScheduler:
+    """
+    Checks the courses every interval (moved by up to jitter * interval at random) and hands the courses that
+    changed to on_changes. A course whose content hash did not change is neither recomputed nor handed on
+    (so it is not rendered again either).
+
+    Usage:
+        scheduler = RefreshScheduler(api_courses(api), on_changes, interval=600)
+        Thread(target=scheduler.run, daemon=True).start()
+        ...
+        scheduler.stop()
+    """
+
+    def __init__(self, fetch, on_changes, interval=DEFAULT_INTERVAL, jitter=DEFAULT_JITTER, wait=None,
+                 rand=random.random, clock=time.time):
+        """
+        :param fetch: function of the function of the compute stage (see compute) returning a list of tuples
+                      (course name, value of the compute stage or None, exception or None), e.g. api_courses(api)
+        :param on_changes: function of a list of tuples (CourseGrades, CourseResult, list of Change) of the courses
+                           that changed, called after every check (with an empty list if nothing changed)
+        :param interval: seconds between two checks
+        :param jitter: fraction of the interval the checks are moved by at random
+        :param wait: function of the seconds to wait, returning True to stop (defaults to waiting on stop())
+        :param rand: random number generator in [0, 1) (injectable for tests)
+        :param clock: clock giving the time of the checks (injectable for tests)
+        """
+        self.fetch = fetch
+        self.on_changes = on_changes
+        self.interval = interval
+        self.jitter = jitter
+        self.stopped = threading.Event()
+        self.wait = wait or self.stopped.wait
+        self.rand = rand
+        self.clock = clock
+        self.hashes = {}  # course name: content hash of the last check
+        self.grades = {}  # course name: CourseGrades of the last check
+        self.errors = {}  # course name: exception of the last check (courses that failed)
+
+        # Counters
+        self.checks = 0
+        self.unchanged = 0  # courses skipped because their hash did not change
+        self.recomputed = 0
+        self.last_check = None
+
+    def next_delay(self):
+        """
+        :return: seconds until the next check
+        """
+        return self.interval * (1 + self.jitter * (2 * self.rand() - 1))
+
+    def compute(self, grades):
+        """
+        Compute stage of the fetches of the checks: a course is only computed if its content hash changed
+
+        :param grades: CourseGrades
+        :return: A tuple (CourseGrades, content hash, CourseResult or None if the hash did not change)
+        """
+        from grade_calc import calculate_course
+        digest = content_hash(grades)
+        if self.hashes.get(grades.course_name) == digest:
+            return grades, digest, None
+        return grades, digest, calculate_course(grades)
+
+    def check(self):
+        """
+        Fetches every course once and recomputes those that changed
+
+        :return: list of tuples (CourseGrades, CourseResult, list of Change) of the courses that changed
+        """
+        from grade_calc import calculate_course
+        changed = []
+        self.errors = {}
+        for course_name, value, error in self.fetch(self.compute):
+            if error is not None:
+                self.errors[course_name] = error  # the last good version is kept
+                continue
+            grades, digest, result = value
+            if self.hashes.get(course_name) == digest:
+                self.unchanged += 1
+                continue
+            changes = diff_courses(self.grades.get(course_name), grades)
+            if result is None:  # listed under another name than the one of its page
+                result = calculate_course(grades)
+            self.hashes[course_name] = digest
+            self.grades[course_name] = grades
+            self.recomputed += 1
+            changed.append((grades, result, changes))
+        self.checks += 1
+        self.last_check = self.clock()
+        self.on_changes(changed)
+        return changed
+
+    def run(self, max_checks=None):
+        """
+        Checks the courses until stop() is called (a failing check is retried at the next interval)
+
+        :param max_checks: number of checks after which the scheduler stops by itself
+        :return: None
+        """
+        while not self.stopped.is_set() and (max_checks is None or self.checks < max_checks):
+            try:
+                self.check()
+            except Exception as e:
+                self.checks += 1
+                print(f"Could not check the courses: {e}")
+            if max_checks is not None and self.checks >= max_checks:
+                break
+            if self.wait(self.next_delay()):
+                break
+
+    def stop(self):
+        """
+        Stops run() (right away if it is waiting for the next check)
+
+        :return: None
+        """
+        self.stopped.set()
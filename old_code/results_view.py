@@ -0,0 +1,384 @@
+#!/usr/bin/env python
+
+"""results_view.py: Results window filled course by course from worker threads, and the what-if grade editor"""
+
+__author__ = "Leo Shen, Dhruba Paul"
+__copyright__ = "Copyright 2022, Canvas Course Mean Project"
+
+import queue
+import threading
+from threading import Thread
+from tkinter import *
+from tkinter import ttk
+from tkinter.ttk import Combobox, Progressbar
+from grade_projection import Projection
+import tracing
+
+POLL_INTERVAL = 30  # milliseconds between two looks at the queue
+MAX_MESSAGES_PER_POLL = 10  # bounds the time the main loop spends per poll
+ROW_HEIGHT = 20  # pixels per table row
+VIEW_MARGIN = 400  # pixels above and below the visible area where tables are already created
+
+
+def drain(message_queue, limit):
+    """
+    Helper Method.
+    Takes the messages waiting in a queue, without blocking
+
+    :param message_queue: queue.Queue
+    :param limit: maximum number of messages taken
+    :return: list of messages (oldest first)
+    """
+    messages = []
+    while len(messages) < limit:
+        try:
+            messages.append(message_queue.get_nowait())
+        except queue.Empty:
+            break
+    return messages
+
+
+def sections_in_view(extents, top, bottom, margin=VIEW_MARGIN):
+    """
+    Helper Method.
+    Finds the sections overlapping the visible area (extended by margin)
+
+    :param extents: list of tuples (y, height) of the sections, in pixels
+    :param top: y of the top of the visible area
+    :param bottom: y of the bottom of the visible area
+    :param margin: pixels added above and below the visible area
+    :return: list of indices of the sections in view
+    """
+    return [i for i, (y, height) in enumerate(extents) if y < bottom + margin and y + height > top - margin]
+
+
+def _preload_table_modules():
+    """
+    Helper Method.
+    Imports pandas and pandastable in the background so that the first table does not stall the main loop
+    """
+    import pandas  # noqa: F401
+    import pandastable  # noqa: F401
+
+
+class ResultsView:
+    """
+    Window listing the courses as their results come in.
+
+    Worker threads only call set_total, add_course, set_status, fail and finish, which queue messages. The Tk main
+    loop applies them every POLL_INTERVAL ms (Tk widgets must only be touched from the main loop). The table of a
+    course is only created once its section scrolls near the visible area.
+    """
+
+    def __init__(self, master, title='Course Results'):
+        """
+        Creates the (empty) window. Must be called from the main loop.
+
+        :param master: tkinter window the results window belongs to
+        :param title: title of the window
+        """
+        self.queue = queue.Queue()
+        self.sections = []  # [section frame, table frame, GroupTable or None, True once the table is created]
+        self.total = None
+        self.received = 0
+        self.check_scheduled = False
+        self.closed = threading.Event()  # set once the window is closed (lets workers stop early)
+        Thread(target=_preload_table_modules, daemon=True).start()
+
+        self.root = Toplevel(master)
+        self.root.title(title)
+        self.root.bind('<Destroy>', lambda e: self.closed.set() if e.widget is self.root else None)
+        self.root.resizable(True, True)
+        try:
+            self.root.state("zoomed")  # adjusting window size to display course dataframes
+        except TclError:
+            self.root.geometry("900x700")  # "zoomed" only exists on Windows
+
+        # Status of the computation
+        header = Frame(self.root)
+        header.pack(fill="x", padx=(20, 20), pady=(10, 10))
+        self.status = Label(header, text="Loading courses...", fg="blue", justify=LEFT)
+        self.status.pack(side=LEFT)
+        self.progress = Progressbar(header, orient=HORIZONTAL, length=100, mode='indeterminate')
+        self.progress.pack(side=RIGHT)
+        self.progress.start(10)
+
+        # Create A Main Frame
+        main_frame = Frame(self.root)
+        main_frame.pack(fill=BOTH, expand=1)
+
+        # Create A Canvas
+        self.canvas = Canvas(main_frame)
+        self.canvas.pack(side=LEFT, fill=BOTH, expand=1)
+
+        # Add A Scrollbar To The Canvas (tables are created as sections scroll into view)
+        scrollbar = ttk.Scrollbar(main_frame, orient=VERTICAL, command=self.canvas.yview)
+        scrollbar.pack(side=RIGHT, fill=Y)
+        self.canvas.configure(yscrollcommand=lambda first, last: (scrollbar.set(first, last),
+                                                                   self._schedule_tables()))
+        self.canvas.bind('<Configure>', lambda e: self._schedule_tables())
+        self.root.bind('<MouseWheel>', lambda e: self.canvas.yview_scroll(int(-e.delta / 120), "units"))
+
+        # Create ANOTHER Frame INSIDE the Canvas, the scroll region following its size
+        self.inner = Frame(self.canvas)
+        self.inner.bind('<Configure>', lambda e: self.canvas.configure(scrollregion=self.canvas.bbox("all")))
+        self.canvas.create_window((0, 0), window=self.inner, anchor="nw")
+
+        self.root.after(POLL_INTERVAL, self._poll)
+
+    # Thread-safe methods (called by the workers)
+
+    def set_total(self, total):
+        self.queue.put(("total", total))
+
+    def add_course(self, course_name, summary, table, grades=None):
+        """
+        :param course_name: name of the course
+        :param summary: text shown for the course (see CourseResult.summary)
+        :param table: GroupTable of the course, None if there is none
+        :param grades: CourseGrades of the course, opens the what-if editor when given (with weights)
+        """
+        self.queue.put(("course", course_name, summary, table, grades))
+
+    def set_status(self, message):
+        self.queue.put(("status", message))
+
+    def fail(self, message):
+        self.queue.put(("fail", message))
+
+    def finish(self):
+        self.queue.put(("finish",))
+
+    # Main loop
+
+    def _poll(self):
+        """
+        Helper Method.
+        Applies the queued messages (at most MAX_MESSAGES_PER_POLL, the rest wait for the next poll)
+        """
+        if not self.root.winfo_exists():
+            return  # window closed by the user, the workers' messages are dropped
+        for message in drain(self.queue, MAX_MESSAGES_PER_POLL):
+            if message[0] == "total":
+                self.total = message[1]
+                self.progress.stop()
+                self.progress.configure(mode='determinate', maximum=max(self.total, 1), value=0)
+            elif message[0] == "course":
+                self._add_section(*message[1:])
+            elif message[0] == "status":
+                self.progress.stop()
+                self.progress.pack_forget()
+                self.status.configure(text=message[1], fg="black")
+            elif message[0] == "fail":
+                self.progress.stop()
+                self.status.configure(text=message[1], fg="red")
+                return
+            else:
+                self.progress.destroy()
+                self.status.configure(text=f"Computed {self.received} course(s)", fg="black")
+                if tracing.is_enabled():
+                    Label(self.inner, text="", justify=LEFT).pack()
+                    Label(self.inner, text=tracing.summary_table(), justify=LEFT, font='Courier 9').pack()
+                return
+        self.root.after(POLL_INTERVAL, self._poll)
+
+    def _add_section(self, course_name, summary, table, grades):
+        """
+        Helper Method.
+        Adds the labels of a course, with room for its table (created once in view)
+        """
+        with tracing.span("render", course=course_name):
+            section = Frame(self.inner)
+            section.pack(fill="x", expand=True)
+            Label(section, text="", justify=LEFT).pack()
+            Label(section, text=course_name, justify=LEFT, font='Helvetica 10 bold').pack()
+            Label(section, text=summary, justify=LEFT).pack()
+            if grades is not None and grades.group_weights is not None:
+                Button(section, text="What if...", command=lambda: WhatIfEditor(self.root, grades)).pack()
+            table_frame = Frame(section, height=((len(table) if table is not None else 0) + 2) * ROW_HEIGHT)
+            table_frame.pack(fill="x", expand=True)
+            self.sections.append([section, table_frame, table, False])
+
+        self.received += 1
+        self.status.configure(text=f"Computing {self.received}/{self.total or '?'} courses")
+        self.progress["value"] = self.received
+        self._schedule_tables()
+
+    def _schedule_tables(self):
+        """
+        Helper Method.
+        Checks which tables came into view once the layout is up to date (at most once per idle period)
+        """
+        if not self.check_scheduled:
+            self.check_scheduled = True
+            self.root.after_idle(self._create_tables_in_view)
+
+    def _create_tables_in_view(self):
+        """
+        Helper Method.
+        Creates the tables of the sections near the visible area
+        """
+        self.check_scheduled = False
+        if not self.root.winfo_exists():
+            return
+        self.inner.update_idletasks()
+        top = self.canvas.canvasy(0)
+        extents = [(section[0].winfo_y(), section[0].winfo_height()) for section in self.sections]
+        for i in sections_in_view(extents, top, top + self.canvas.winfo_height()):
+            section = self.sections[i]
+            if not section[3]:
+                section[3] = True
+                self._create_table(section[1], section[2])
+
+    def _create_table(self, frame, table):
+        """
+        Helper Method.
+        Shows a GroupTable as a pandastable in frame
+        """
+        import pandas as pd
+        from pandastable import Table
+        with tracing.span("render", table_rows=len(table) if table is not None else 0):
+            course_df = table.to_dataframe() if table is not None else pd.DataFrame()
+            pt = Table(frame, dataframe=course_df, height=(len(course_df) + 1) * ROW_HEIGHT)
+            pt.show()
+            pt.redrawVisible()
+
+
+def _number(text):
+    """
+    Helper Method.
+    :return: text as a float, None if it is not a number
+    """
+    try:
+        return float(text)
+    except ValueError:
+        return None
+
+
+class WhatIfEditor:
+    """
+    Window editing hypothetical scores of a course. The grades are recomputed as the user types (see Projection),
+    and the score needed on the selected assignment for a target grade is solved for.
+    """
+
+    def __init__(self, master, grades):
+        """
+        :param master: tkinter window the editor belongs to
+        :param grades: CourseGrades of a course with weights
+        """
+        self.projection = Projection(grades)
+        self.root = Toplevel(master)
+        self.root.title(f"What if: {grades.course_name}")
+        self.root.geometry("560x640")
+
+        # Projected grades and target
+        header = Frame(self.root)
+        header.pack(fill="x", padx=(20, 20), pady=(10, 10))
+        self.grades_label = Label(header, justify=LEFT)
+        self.grades_label.grid(row=0, column=0, columnspan=3, sticky="w")
+        Label(header, text="Target grade:").grid(row=1, column=0, sticky="w")
+        self.target = StringVar(value=f"{round(self.projection.student_grade)}")
+        Entry(header, textvariable=self.target, width=8).grid(row=1, column=1, sticky="w")
+        self.needed_label = Label(header, justify=LEFT, fg="blue")
+        self.needed_label.grid(row=2, column=0, columnspan=3, sticky="w")
+        self.target.trace_add("write", lambda *_: self._refresh())
+
+        # Hypothetical assignment
+        add_frame = Frame(self.root)
+        add_frame.pack(fill="x", padx=(20, 20))
+        Label(add_frame, text="Add assignment to").pack(side=LEFT)
+        self.new_group = Combobox(add_frame, values=self.projection.groups, state="readonly", width=16)
+        self.new_group.pack(side=LEFT)
+        Label(add_frame, text="out of").pack(side=LEFT)
+        self.new_total = StringVar(value="100")
+        Entry(add_frame, textvariable=self.new_total, width=6).pack(side=LEFT)
+        add_button = Button(add_frame, text="Add", command=self._add_assignment)
+        add_button.pack(side=LEFT, padx=(10, 0))
+        if self.projection.groups:
+            self.new_group.current(0)
+        else:  # course without assignment groups: there is no group to add an assignment to
+            self.new_group.configure(state="disabled")
+            add_button.configure(state="disabled")
+
+        # Assignments (scrolling list)
+        main_frame = Frame(self.root)
+        main_frame.pack(fill=BOTH, expand=1, pady=(10, 0))
+        canvas = Canvas(main_frame)
+        canvas.pack(side=LEFT, fill=BOTH, expand=1)
+        scrollbar = ttk.Scrollbar(main_frame, orient=VERTICAL, command=canvas.yview)
+        scrollbar.pack(side=RIGHT, fill=Y)
+        canvas.configure(yscrollcommand=scrollbar.set)
+        self.rows = Frame(canvas)
+        self.rows.bind('<Configure>', lambda e: canvas.configure(scrollregion=canvas.bbox("all")))
+        canvas.create_window((0, 0), window=self.rows, anchor="nw")
+        for column, text in enumerate(["Group", "Score", "", "Solve for"]):
+            Label(self.rows, text=text, font='Helvetica 10 bold').grid(row=0, column=column, sticky="w")
+
+        self.solve_for = IntVar(value=-1)
+        self.solve_for.trace_add("write", lambda *_: self._refresh())
+        self.entries = []
+        for index in range(len(self.projection)):
+            self._add_row(index)
+        self._refresh()
+
+    def _add_row(self, index):
+        """
+        Helper Method.
+        Adds the row of an assignment (group, editable score, total, solve-for choice)
+        """
+        assignment = self.projection.assignments[index]
+        row = index + 1
+        Label(self.rows, text=assignment.group + (" (dropped)" if assignment.dropped else ""),
+              justify=LEFT).grid(row=row, column=0, sticky="w")
+        score = StringVar(value=f"{assignment.score:g}")
+        entry = Entry(self.rows, textvariable=score, width=8)
+        entry.grid(row=row, column=1)
+        Label(self.rows, text=f"/ {assignment.total:g}").grid(row=row, column=2, sticky="w")
+        Radiobutton(self.rows, variable=self.solve_for, value=index).grid(row=row, column=3)
+        score.trace_add("write", lambda *_: self._set_score(index, score, entry))
+        self.entries.append(entry)
+
+    def _set_score(self, index, score, entry):
+        """
+        Helper Method.
+        Applies a typed score (scores that are not numbers are shown in red and not applied)
+        """
+        value = _number(score.get())
+        entry.configure(fg="red" if value is None else "black")
+        if value is not None:
+            self.projection.set_score(index, value)
+            self._refresh()
+
+    def _add_assignment(self):
+        """
+        Helper Method.
+        Adds a hypothetical assignment of the chosen group and total, and solves for it
+        """
+        total = _number(self.new_total.get())
+        if total is None or total <= 0 or not self.new_group.get():
+            return
+        index = self.projection.add_assignment(self.new_group.get(), total)
+        self._add_row(index)
+        self.solve_for.set(index)
+
+    def _refresh(self):
+        """
+        Helper Method.
+        Shows the projected grades and the score needed for the target grade
+        """
+        self.grades_label["text"] = f"Course Average: {self.projection.course_avg:.2f}\n" \
+                                    f"Student Grade: {self.projection.student_grade:.2f}"
+        index = self.solve_for.get()
+        target = _number(self.target.get())
+        if index < 0 or target is None:
+            self.needed_label["text"] = "Select an assignment (or add one) to solve for the target grade"
+            return
+        total = self.projection.assignments[index].total
+        needed = self.projection.needed_score(index, target)
+        if needed is None:
+            self.needed_label["text"] = "The score of this assignment does not change the grade"
+        elif needed > total:
+            self.needed_label["text"] = f"Not reachable: needs {needed:.2f} / {total:g}"
+        else:
+            self.needed_label["text"] = f"Needed: {needed:.2f} / {total:g}" + \
+                                        (f" ({needed / total * 100:.1f}%)" if total else "")
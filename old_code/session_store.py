@@ -0,0 +1,172 @@
+#!/usr/bin/env python
+
+"""session_store.py: Encrypted on-disk store of the Canvas session cookies, so returning users can skip the login"""
+
+__author__ = "Leo Shen, Dhruba Paul"
+__copyright__ = "Copyright 2022, Canvas Course Mean Project"
+
+import json
+import os
+from cryptography.fernet import Fernet, InvalidToken
+
+DEFAULT_SESSION_PATH = os.path.join(os.path.expanduser("~"), ".canvas_course_mean", "session.bin")
+DEFAULT_MAX_AGE = 14 * 24 * 60 * 60  # seconds a saved session is tried at all
+KEYRING_SERVICE = "canvas_course_mean"  # service name of the encryption key in the OS credential store
+
+
+def os_keyring():
+    """
+    Helper Method.
+    :return: the keyring module when an OS credential store (Windows Credential Manager, macOS Keychain, Secret
+             Service, ...) is available, None otherwise (keyring is an optional dependency)
+    """
+    try:
+        import keyring
+        from keyring.backends.fail import Keyring as NoKeyring
+    except ImportError:
+        return None
+    return None if isinstance(keyring.get_keyring(), NoKeyring) else keyring
+
+
+class SessionStore:
+    """
+    Session cookies of the last login, encrypted (Fernet: AES-128-CBC + HMAC-SHA256).
+    A missing, expired, tampered or unreadable store simply loads as no session.
+
+    The key is kept in the OS credential store when the keyring package finds one. Otherwise it falls back to a
+    file readable by the user only, next to the session: anyone who can read the session file can then read the
+    key too, so the encryption only keeps the cookies from being read at a glance (or picked up by tools
+    scanning for cookie files), not from another program running as the user.
+    """
+
+    def __init__(self, path=DEFAULT_SESSION_PATH, key_path=None, max_age=DEFAULT_MAX_AGE, use_keyring=True):
+        """
+        :param path: file holding the encrypted session
+        :param key_path: file holding the encryption key without a credential store (defaults to path + ".key")
+        :param max_age: seconds after which a saved session is not even tried
+        :param use_keyring: keeps the key in the OS credential store when there is one
+        """
+        self.path = path
+        self.key_path = key_path or path + ".key"
+        self.max_age = max_age
+        self.use_keyring = use_keyring
+
+    def _read_key(self, keyring):
+        """
+        Helper Method.
+        :param keyring: keyring module, None to only use the key file
+        :return: the key (bytes), None if there is none
+        """
+        if keyring is not None:
+            try:
+                key = keyring.get_password(KEYRING_SERVICE, os.path.abspath(self.path))
+            except keyring.errors.KeyringError:
+                key = None
+            if key:
+                return key.encode()
+        try:  # no credential store, or it refused the key when it was saved (see _write_key)
+            with open(self.key_path, "rb") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def _write_key(self, keyring, key):
+        """
+        Helper Method.
+        :param keyring: keyring module, None to use the key file
+        :param key: the key (bytes)
+        :return: None
+        """
+        if keyring is not None:
+            try:
+                keyring.set_password(KEYRING_SERVICE, os.path.abspath(self.path), key.decode())
+                return
+            except keyring.errors.KeyringError:  # locked or unavailable store: key file instead
+                pass
+        os.makedirs(os.path.dirname(os.path.abspath(self.key_path)), exist_ok=True)
+        fd = os.open(self.key_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "wb") as f:
+            f.write(key)
+
+    def _fernet(self, create=False):
+        """
+        Helper Method.
+        :param create: creates the key if there is none
+        :return: Fernet object, None if there is no key
+        """
+        keyring = os_keyring() if self.use_keyring else None  # imported here: the login window does not wait for it
+        try:
+            return Fernet(self._read_key(keyring))
+        except (TypeError, ValueError):  # no key, or not a key
+            if not create:
+                return None
+        key = Fernet.generate_key()
+        self._write_key(keyring, key)
+        return Fernet(key)
+
+    def save(self, cookies, base_url):
+        """
+        Encrypts and saves the cookies of a logged in session
+
+        :param cookies: list of cookies (same shape as selenium's driver.get_cookies())
+        :param base_url: root url of the canvas instance the cookies belong to
+        :return: None
+        """
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        token = self._fernet(create=True).encrypt(json.dumps({"base_url": base_url, "cookies": cookies}).encode())
+        fd = os.open(self.path + ".tmp", os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "wb") as f:
+            f.write(token)
+        os.replace(self.path + ".tmp", self.path)
+
+    def load(self, base_url):
+        """
+        :param base_url: root url of the canvas instance
+        :return: list of the saved cookies, None if there is no usable session
+        """
+        fernet = self._fernet()
+        if fernet is None:
+            return None
+        try:
+            with open(self.path, "rb") as f:
+                session = json.loads(fernet.decrypt(f.read(), ttl=self.max_age))
+        except (OSError, InvalidToken, ValueError):
+            return None
+        return session["cookies"] if session.get("base_url") == base_url else None
+
+    def clear(self):
+        """
+        Forgets the saved session
+
+        :return: None
+        """
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+
+def resume_session(store, base_url=None):
+    """
+    Loads the saved session and checks with one request that Canvas still accepts it.
+    Sessions Canvas rejects are cleared.
+
+    :param store: SessionStore
+    :param base_url: root url of the canvas instance (defaults to canvas_api.CANVAS_URL)
+    :return: list of cookies of a valid session, None if the user has to log in
+    """
+    if not os.path.exists(store.path):
+        return None  # first launch: the HTTP client is not even imported
+    from canvas_api import CANVAS_URL, CanvasAPI
+    base_url = base_url or CANVAS_URL
+    cookies = store.load(base_url)
+    if cookies is None:
+        return None
+    api = CanvasAPI(base_url, cookies)
+    try:
+        valid = api.is_authenticated()
+    finally:
+        api.close()
+    if valid is False:
+        store.clear()
+    return cookies if valid else None
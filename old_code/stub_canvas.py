@@ -0,0 +1,538 @@
+#!/usr/bin/env python
+
+"""stub_canvas.py: Local stand-in for a Canvas server so the app can be exercised and benchmarked offline"""
+
+__author__ = "Leo Shen, Dhruba Paul"
+__copyright__ = "Copyright 2022, Canvas Course Mean Project"
+
+import argparse
+import csv
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs, urlencode
+from canvas_api import dropped_assignments
+
+SESSION_COOKIE = "canvas_session"
+SESSION_VALUE = "stub-session"
+# Resources a real Canvas page pulls in that the scraper never looks at (see heavy_page)
+HEAVY_ASSETS = (["/static/css/bundle_%d.css" % i for i in range(3)] +
+                ["/static/fonts/lato_%d.woff2" % i for i in range(4)] +
+                ["/static/js/vendor.js", "/static/js/google-analytics.js"] +
+                ["/static/images/avatar_%d.png" % i for i in range(12)])
+ASSET_SIZES = {".css": 150_000, ".woff2": 80_000, ".js": 300_000, ".png": 60_000}
+GROUP_NAMES = ["Exams", "Homework", "Quizzes", "Labs", "Projects", "Participation", "Readings", "Discussions"]
+
+
+def fmt_number(x):
+    """
+    Helper Method.
+    Formats a number the way Canvas prints scores (at most 2 decimals, no trailing zeros)
+
+    :param x: a float
+    :return: the formatted string
+    """
+    return ("%.2f" % x).rstrip("0").rstrip(".")
+
+
+def make_course(course_id, n_groups=4, n_assignments=10, seed=None, name=None, weighted=True,
+                ungraded_rate=0.15, excused_rate=0.05, hidden_mean_rate=0.1, drop_rate=0.5):
+    """
+    Builds a random (but reproducible) course with weighted groups, dropped, excused and ungraded assignments.
+
+    :param course_id: integer id of the course
+    :param n_groups: number of assignment groups
+    :param n_assignments: number of assignments per group
+    :param seed: seed for the random generator (defaults to the course id)
+    :param name: name of the course
+    :param weighted: whether the groups are weighted (the page has no weights table otherwise)
+    :param ungraded_rate: fraction of assignments not graded yet (no score, no mean)
+    :param excused_rate: fraction of graded assignments the student is excused from
+    :param hidden_mean_rate: fraction of graded assignments without score statistics
+    :param drop_rate: fraction of groups dropping their lowest score (groups of more than 3 assignments)
+    :return: a dictionary describing the course
+    """
+    rng = random.Random(course_id if seed is None else seed)
+    n_groups = max(1, n_groups)
+    weights = [rng.randint(1, 10) for _ in range(n_groups)]
+    groups = []
+    assignments = []
+    assignment_id = course_id * 100000
+    for g in range(n_groups):
+        group_id = course_id * 100 + g
+        group_name = GROUP_NAMES[g] if g < len(GROUP_NAMES) else f"Group {g + 1}"
+        drop_lowest = 1 if n_assignments > 3 and rng.random() < drop_rate else 0
+        groups.append({"id": group_id, "name": group_name, "position": g + 1,
+                       "group_weight": round(100 * weights[g] / sum(weights), 2),
+                       "rules": {"drop_lowest": drop_lowest} if drop_lowest else {}})
+
+        group_assignments = []
+        for a in range(n_assignments):
+            assignment_id += 1
+            points = float(rng.choice([5, 10, 20, 25, 50, 100]))
+            graded = rng.random() < 1 - ungraded_rate
+            score = round(points * rng.uniform(0.4, 1.0), 2) if graded else None
+            mean = round(points * rng.uniform(0.5, 0.95), 2) if graded and rng.random() < 1 - hidden_mean_rate else None
+            group_assignments.append({"id": assignment_id, "name": f"{group_name} {a + 1}", "group_id": group_id,
+                                      "group_name": group_name, "points_possible": points, "score": score,
+                                      "mean": mean, "excused": graded and rng.random() < excused_rate,
+                                      "dropped": False})
+
+        # Canvas drops the graded assignments that leave the group its highest grade
+        dropped = dropped_assignments(groups[-1], [{"id": a["id"], "points_possible": a["points_possible"],
+                                                    "submission": {"score": a["score"], "excused": a["excused"]}}
+                                                   for a in group_assignments])
+        for a in group_assignments:
+            a["dropped"] = a["id"] in dropped
+        assignments.extend(group_assignments)
+
+    # Score shown by Canvas for the student (weighted, ignoring ungraded work)
+    total_score = 0.0
+    total_weight = 0.0
+    for group in groups:
+        counted = [a for a in assignments
+                   if a["group_id"] == group["id"] and a["score"] is not None and not a["dropped"] and not a["excused"]]
+        possible = sum(a["points_possible"] for a in counted)
+        if possible:
+            total_score += sum(a["score"] for a in counted) / possible * group["group_weight"]
+            total_weight += group["group_weight"]
+    current_score = round(total_score / total_weight * 100, 2) if total_weight else None
+
+    return {"id": course_id, "name": name or f"COMP SCI {300 + course_id}: Course {course_id}",
+            "apply_assignment_group_weights": weighted, "groups": groups, "assignments": assignments,
+            "current_score": current_score}
+
+
+def make_courses(n_courses=6, n_groups=4, n_assignments=10, **options):
+    """
+    Builds a dictionary of reproducible courses keyed by id
+
+    :param n_courses: number of courses
+    :param n_groups: number of assignment groups per course
+    :param n_assignments: number of assignments per group
+    :param options: other arguments of make_course
+    :return: dictionary {course id: course}
+    """
+    return {i: make_course(i, n_groups, n_assignments, **options) for i in range(1, n_courses + 1)}
+
+
+def write_pages(directory, n_courses=6, n_groups=4, n_assignments=10, **options):
+    """
+    Writes the grades pages of generated courses to a directory (course_<id>.html)
+
+    :param directory: directory to write to (created if needed)
+    :param n_courses: number of courses
+    :param n_groups: number of assignment groups per course
+    :param n_assignments: number of assignments per group
+    :param options: other arguments of make_course
+    :return: list of the paths written
+    """
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for course_id, course in make_courses(n_courses, n_groups, n_assignments, **options).items():
+        paths.append(os.path.join(directory, f"course_{course_id}.html"))
+        with open(paths[-1], "w", encoding="utf-8") as f:
+            f.write(render_grades_page(course))
+    return paths
+
+
+def write_gradebook_csv(f, n_students=100, n_groups=4, n_assignments=10, seed=0, ungraded_rate=0.1,
+                        excused_rate=0.02):
+    """
+    Writes a random (but reproducible) gradebook export, laid out like Canvas' "Export Entire Gradebook"
+
+    :param f: text file to write to
+    :param n_students: number of students (the student view account is added as well)
+    :param n_groups: number of assignment groups
+    :param n_assignments: number of assignments per group
+    :param seed: seed for the random generator
+    :param ungraded_rate: fraction of assignments not graded yet (blank for every student)
+    :param excused_rate: fraction of the scores the students are excused from
+    :return: group specification of the export (see gradebook_stats.py)
+    """
+    rng = random.Random(seed)
+    weights = [rng.randint(1, 10) for _ in range(n_groups)]
+    spec = {}
+    columns, points, graded = [], [], []
+    for g in range(n_groups):
+        group_name = GROUP_NAMES[g] if g < len(GROUP_NAMES) else f"Group {g + 1}"
+        spec[group_name] = {"weight": round(100 * weights[g] / sum(weights), 2), "match": f"^{group_name} \\d"}
+        for a in range(n_assignments):
+            columns.append(f"{group_name} {a + 1} ({seed * 100000 + g * 1000 + a + 1})")
+            points.append(float(rng.choice([5, 10, 20, 25, 50, 100])))
+            graded.append(rng.random() >= ungraded_rate)
+    computed = [f"{group} {kind}" for group in spec for kind in ("Current Score", "Final Score")] + \
+        ["Current Score", "Final Score", "Current Grade"]
+
+    scores = [[fmt_number(p * percent / 100) for percent in range(101)] for p in points]  # whole percentages
+    # 4096 draws to pick from: excused at excused_rate, gaussian deviations (in percent) otherwise
+    noise = [None if rng.random() < excused_rate else int(round(rng.gauss(0, 10))) for _ in range(4096)]
+    getrandbits = rng.getrandbits
+
+    writer = csv.writer(f, lineterminator="\n")
+    writer.writerow(["Student", "ID", "SIS User ID", "SIS Login ID", "Section"] + columns + computed)
+    writer.writerow(["    Points Possible", "", "", "", ""] + [fmt_number(p) for p in points] +
+                    ["(read only)"] * len(computed))
+    for student in range(n_students + 1):
+        if student == n_students:
+            name, ability = "Student, Test", 0.0
+        else:
+            name, ability = f"Student{student}, Some", rng.uniform(0.5, 0.95)
+        row = [name, str(1000 + student), f"S{student:06d}", f"student{student}", "Section 1"]
+        percent = int(ability * 100)
+        for column_scores, is_graded in zip(scores, graded):
+            if not is_graded:
+                row.append("")
+            else:
+                draw = noise[getrandbits(12)]  # excused (None) or deviation from the student's ability
+                row.append("EX" if draw is None else column_scores[min(100, max(0, percent + draw))])
+        writer.writerow(row + [""] * len(computed))
+    return spec
+
+
+def render_grades_page(course):
+    """
+    Renders the "grades" page of a course with the same markup Canvas uses for the parts scrape_and_calculate reads
+
+    :param course: a course built by make_course
+    :return: html string
+    """
+    parts = ['<!DOCTYPE html><html><head><title>Grades for Student: ', course["name"], '</title>',
+             '<link rel="stylesheet" href="/dist/brandable_css/new_styles_normal_contrast/bundles/common.css">',
+             '</head><body class="with-left-side course-menu-expanded">',
+             '<div id="application" class="ic-app"><header id="header" class="ic-app-header"></header>',
+             '<div id="wrapper" class="ic-Layout-wrapper"><div class="ic-app-nav-toggle-and-crumbs">',
+             '<nav id="breadcrumbs" role="navigation" aria-label="breadcrumbs"><ul>',
+             '<li class="home"><a href="/"><span class="ellipsible"><i class="icon-home"></i>',
+             '<span class="screenreader-only">My Dashboard</span></span></a></li>',
+             '<li><a href="/courses/%d"><span class="ellipsible">%s</span></a></li>' % (course["id"], course["name"]),
+             '<li><a href="/courses/%d/grades"><span class="ellipsible">Grades</span></a></li>' % course["id"],
+             '</ul></nav></div>',
+             '<div id="main" class="ic-Layout-columns"><div id="content" class="ic-Layout-contentMain">']
+
+    groups = course["groups"]
+    if course["apply_assignment_group_weights"]:
+        parts.append('<div id="assignments-not-weighted"><div><h2>Assignments are weighted by group:</h2>'
+                     '<table class="summary"><thead><tr><th scope="col">Group</th><th scope="col">Weight</th></tr>'
+                     '</thead><tbody>')
+        for group in groups:
+            parts.append('<tr><th scope="row">%s</th><td>%s%%</td></tr>' % (group["name"],
+                                                                          fmt_number(group["group_weight"])))
+        total_weight = sum(group["group_weight"] for group in groups)
+        parts.append('<tr><th scope="row">Total</th><td>%s%%</td></tr></tbody></table></div></div>'
+                     % fmt_number(total_weight))
+
+    parts.append('<table id="grades_summary" class="editable"><thead><tr><th scope="col">Name</th>'
+                 '<th scope="col">Due</th><th scope="col">Status</th><th scope="col">Score</th>'
+                 '<th scope="col">Out of</th><th scope="col">Details</th></tr></thead><tbody>')
+    for a in course["assignments"]:
+        classes = "student_assignment editable"
+        classes += " assignment_graded" if a["score"] is not None else ""
+        classes += " dropped" if a["dropped"] else ""
+        classes += " excused" if a["excused"] else ""
+        score = fmt_number(a["score"]) if a["score"] is not None else "-"
+        parts.append(
+            '<tr class="%s" id="submission_%d" data-muted="false">'
+            '<th class="title" scope="row"><a href="/courses/%d/assignments/%d">%s</a>'
+            '<div class="context">%s</div></th>'
+            '<td class="due"></td><td class="status" scope="row"></td>'
+            '<td class="assignment_score" title="Click to test a different score">'
+            '<div style="position: relative; height: 100%%;" class="score_holder">'
+            '<span class="assignment_presenter_for_submission" style="display: none;"></span>'
+            '<span class="react_pill_container"></span><span class="tooltip"><span class="grade">'
+            '<span class="tooltip_wrap right" aria-hidden="true">'
+            '<span class="tooltip_text score_teaser">Click to test a different score</span></span>\n'
+            '%s\n</span><span class="revert_score_link" style="display: none;">Revert to original score</span>'
+            '</span></div></td>'
+            '<td class="possible points_possible">%s</td>'
+            '<td class="details"><a href="#" class="toggle_comments_link tooltip" role="button">'
+            '<i class="icon-discussion"></i></a></td></tr>'
+            % (classes, a["id"], course["id"], a["id"], a["name"], a["group_name"], score,
+               fmt_number(a["points_possible"])))
+
+        parts.append('<tr id="grade_info_%d" class="grade_details assignment_graded" style="display: none;">'
+                      '<td colspan="6">' % a["id"])
+        if a["mean"] is not None:
+            parts.append('<table class="score_details_table"><thead><tr><th colspan="3">Score Details</th></tr>'
+                         '</thead><tbody><tr><td>Mean:\n %s</td><td>High:\n %s</td><td>Low:\n %s</td></tr>'
+                         '</tbody></table>' % (fmt_number(a["mean"]), fmt_number(a["points_possible"]),
+                                               fmt_number(a["mean"] / 2)))
+        parts.append('</td></tr><tr id="comments_thread_%d" class="comments thin" style="display: none;">'
+                     '<td colspan="6"></td></tr>' % a["id"])
+
+    for group in groups:
+        parts.append('<tr class="student_assignment hard_coded group_total" id="submission_group-%d">'
+                     '<th class="title" scope="row">%s</th><td class="due"></td><td class="status"></td>'
+                     '<td class="assignment_score"><div class="score_holder"><span class="tooltip">'
+                     '<span class="grade"></span></span></div></td><td class="details"></td></tr>'
+                     % (group["id"], group["name"]))
+
+    current = "%s%%" % fmt_number(course["current_score"]) if course["current_score"] is not None else "N/A"
+    parts.append('<tr class="student_assignment hard_coded final_grade" id="submission_final-grade">'
+                 '<th class="title" scope="row">Total</th><td class="due"></td><td class="status"></td>'
+                 '<td class="assignment_score"><div class="score_holder">'
+                 '<span class="assignment_presenter_for_submission" style="display: none;"></span>'
+                 '<span class="tooltip"><span class="grade">%s</span></span></div></td>'
+                 '<td class="details"></td></tr>' % current)
+    parts.append('</tbody></table></div></div></div></div></body></html>')
+    return "".join(parts)
+
+
+def heavy_page(html):
+    """
+    Adds the stylesheets, fonts, scripts and images of a real Canvas page to a rendered page
+
+    :param html: page made by render_grades_page
+    :return: html string
+    """
+    head, body = [], []
+    for asset in HEAVY_ASSETS:
+        if asset.endswith(".css"):
+            head.append('<link rel="stylesheet" href="%s">' % asset)
+        elif asset.endswith(".woff2"):
+            head.append('<link rel="preload" as="font" href="%s" crossorigin>' % asset)
+        elif asset.endswith(".js"):
+            head.append('<script src="%s"></script>' % asset)
+        else:
+            body.append('<img src="%s" alt="">' % asset)
+    return html.replace("</head>", "".join(head) + "</head>", 1).replace("</body>", "".join(body) + "</body>", 1)
+
+
+def course_json(course):
+    """
+    Course object as returned by GET /api/v1/courses/:id?include[]=total_scores
+
+    :param course: a course built by make_course
+    :return: dictionary
+    """
+    return {"id": course["id"], "name": course["name"], "course_code": course["name"].split(":")[0],
+            "workflow_state": "available",
+            "apply_assignment_group_weights": course["apply_assignment_group_weights"],
+            "enrollments": [{"type": "student", "enrollment_state": "active",
+                             "computed_current_score": course["current_score"]}]}
+
+
+def assignment_groups_json(course):
+    """
+    Assignment groups as returned by GET /api/v1/courses/:id/assignment_groups
+
+    :param course: a course built by make_course
+    :return: list of dictionaries
+    """
+    return [{"id": g["id"], "name": g["name"], "position": g["position"], "group_weight": g["group_weight"],
+             "rules": g["rules"]} for g in course["groups"]]
+
+
+def assignments_json(course):
+    """
+    Assignments as returned by GET /api/v1/courses/:id/assignments?include[]=submission&include[]=score_statistics
+
+    :param course: a course built by make_course
+    :return: list of dictionaries
+    """
+    assignments = []
+    for a in course["assignments"]:
+        assignment = {"id": a["id"], "name": a["name"], "assignment_group_id": a["group_id"],
+                      "points_possible": a["points_possible"], "published": True,
+                      "submission": {"assignment_id": a["id"], "score": a["score"], "excused": a["excused"],
+                                     "workflow_state": "graded" if a["score"] is not None else "unsubmitted"}}
+        if a["mean"] is not None:
+            assignment["score_statistics"] = {"min": a["mean"] / 2, "max": a["points_possible"], "mean": a["mean"]}
+        assignments.append(assignment)
+    return assignments
+
+
+class StubCanvasHandler(BaseHTTPRequestHandler):
+    """
+    Request handler serving the JSON API and grades pages of the courses held by the server
+    """
+    protocol_version = "HTTP/1.1"  # keep-alive
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_body(self, status, body, content_type):
+        body = body.encode("utf-8")
+        etag = '"%s"' % hashlib.md5(body).hexdigest()
+        if status == 200 and self.server.etags and self.headers.get("If-None-Match") == etag:
+            self.server.not_modified_count += 1
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        if status == 200 and self.server.etags:
+            self.send_header("ETag", etag)
+        for key, value in getattr(self, "extra_headers", {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_json(self, data, params):
+        # Paginating like Canvas does (per_page & page, with a Link header)
+        if isinstance(data, list):
+            per_page = int(params.get("per_page", ["10"])[0])
+            page = int(params.get("page", ["1"])[0])
+            if page * per_page < len(data):
+                next_params = dict(params, page=[str(page + 1)], per_page=[str(per_page)])
+                self.extra_headers = {"Link": '<%s?%s>; rel="next"' % (self.server.url + urlsplit(self.path).path,
+                                                                       urlencode(next_params, doseq=True))}
+            data = data[(page - 1) * per_page:page * per_page]
+        # Canvas protects cookie authenticated JSON against hijacking
+        self.send_body(200, "while(1);" + json.dumps(data), "application/json; charset=utf-8")
+
+    def do_GET(self):
+        self.extra_headers = {}
+        url = urlsplit(self.path)
+        params = parse_qs(url.query)
+        self.server.request_count += 1
+        if self.server.latency:
+            time.sleep(self.server.latency)  # simulated network/server time
+
+        if url.path.startswith("/static/"):  # served like a CDN would, without cookies
+            size = ASSET_SIZES.get(os.path.splitext(url.path)[1])
+            if size is None:
+                self.send_body(404, "", "text/plain")
+            else:
+                time.sleep(self.server.asset_latency)
+                self.send_body(200, "/" * size, "application/octet-stream")
+            return
+        if url.path == "/robots.txt":
+            self.send_body(200, "User-agent: *\nDisallow: /\n", "text/plain")
+            return
+
+        if f"{SESSION_COOKIE}={self.server.session_value}" not in self.headers.get("Cookie", ""):
+            self.send_body(401, json.dumps({"errors": [{"message": "Invalid access token."}]}),
+                           "application/json; charset=utf-8")
+            return
+
+        courses = self.server.courses
+        if url.path == "/":
+            self.send_body(200, '<html><body><div id="dashboard_header_container"></div></body></html>',
+                           "text/html; charset=utf-8")
+            return
+        if url.path == "/api/v1/users/self":
+            self.send_json({"id": 1, "name": "Stub Student"}, params)
+            return
+        if url.path == "/api/v1/courses":
+            self.send_json([course_json(c) for c in courses.values()], params)
+            return
+
+        match = re.fullmatch(r"(/api/v1)?/courses/(\d+)(/\w+)?", url.path)
+        course = courses.get(int(match.group(2))) if match else None
+        if course is None:
+            self.send_body(404, json.dumps({"errors": [{"message": "The specified resource does not exist."}]}),
+                           "application/json; charset=utf-8")
+            return
+        api, resource = match.group(1), match.group(3)
+        if api and resource is None:
+            self.send_json(course_json(course), params)
+        elif api and resource == "/assignment_groups":
+            self.send_json(assignment_groups_json(course), params)
+        elif api and resource == "/assignments":
+            self.send_json(assignments_json(course), params)
+        elif not api and resource == "/grades":
+            page = render_grades_page(course)
+            self.send_body(200, heavy_page(page) if self.server.heavy_pages else page, "text/html; charset=utf-8")
+        else:
+            self.send_body(404, "", "text/plain")
+
+
+class StubCanvas:
+    """
+    Local Canvas server running on a background thread.
+
+    Usage:
+        with StubCanvas(make_courses(8)) as canvas:
+            api = CanvasAPI(canvas.url, canvas.cookies)
+    """
+
+    def __init__(self, courses=None, port=0, latency=0.0, etags=True, heavy_pages=False, asset_latency=0.0):
+        """
+        :param courses: dictionary {course id: course} (see make_courses)
+        :param port: port to listen on (0 picks a free one)
+        :param latency: seconds added to every request
+        :param etags: sends ETags and answers matching If-None-Match with 304 Not Modified
+        :param heavy_pages: grades pages reference stylesheets, fonts, scripts and images (see heavy_page)
+        :param asset_latency: seconds added to every one of those resources
+        """
+        self.courses = make_courses() if courses is None else courses
+        self.server = ThreadingHTTPServer(("127.0.0.1", port), StubCanvasHandler)
+        self.server.daemon_threads = True
+        self.server.courses = self.courses
+        self.server.request_count = 0
+        self.server.latency = latency
+        self.server.etags = etags
+        self.server.not_modified_count = 0
+        self.server.session_value = SESSION_VALUE
+        self.server.heavy_pages = heavy_pages
+        self.server.asset_latency = asset_latency
+        self.url = "http://127.0.0.1:%d" % self.server.server_address[1]
+        self.server.url = self.url
+        # Same shape as selenium's driver.get_cookies()
+        self.cookies = [{"name": SESSION_COOKIE, "value": SESSION_VALUE, "path": "/", "domain": "127.0.0.1"}]
+        self.thread = None
+
+    @property
+    def request_count(self):
+        return self.server.request_count
+
+    @property
+    def not_modified_count(self):
+        return self.server.not_modified_count
+
+    def expire_sessions(self):
+        """
+        Logs every client out (their cookies get 401s from now on), like Canvas does when a session expires
+
+        :return: None
+        """
+        self.server.session_value = "%s-%d" % (SESSION_VALUE, random.getrandbits(32))
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+if __name__ == "__main__":
+    """
+    Serves a stub Canvas on localhost until interrupted, or writes the generated grades pages to a directory.
+    """
+    parser = argparse.ArgumentParser(description="Stub Canvas server and synthetic grades page generator")
+    parser.add_argument("--courses", type=int, default=6)
+    parser.add_argument("--groups", type=int, default=4)
+    parser.add_argument("--assignments", type=int, default=10, help="assignments per group")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--write", metavar="DIRECTORY", help="write the grades pages instead of serving them")
+    args = parser.parse_args()
+
+    if args.write:
+        print(f"Wrote {len(write_pages(args.write, args.courses, args.groups, args.assignments))} pages")
+    else:
+        stub = StubCanvas(make_courses(args.courses, args.groups, args.assignments), port=args.port)
+        print(f"Stub Canvas running on {stub.url} (cookie {SESSION_COOKIE}={SESSION_VALUE})")
+        try:
+            stub.server.serve_forever()
+        except KeyboardInterrupt:
+            stub.server.server_close()
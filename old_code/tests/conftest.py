@@ -0,0 +1,43 @@
+#!/usr/bin/env python
+
+"""conftest.py: Shared fixtures of the tests (run with python -m pytest from old_code)"""
+
+__author__ = "Leo Shen, Dhruba Paul"
+__copyright__ = "Copyright 2022, Canvas Course Mean Project"
+
+import os
+import sys
+import numpy as np
+import pytest
+
+# The modules under test are scripts next to this directory, not an installed package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from stub_canvas import StubCanvas, make_courses  # noqa: E402
+
+
+def _same_result(result, reference):
+    """
+    Helper Method.
+    Checks that two CourseResults hold exactly the same values
+
+    :return: True if they do, false otherwise
+    """
+    if result[:4] != reference[:4] or (result.table is None) != (reference.table is None):
+        return False
+    return result.table is None or (result.table.groups == reference.table.groups and all(
+        np.array_equal(a, b, equal_nan=True) for a, b in zip(result.table[1:], reference.table[1:])))
+
+
+@pytest.fixture
+def same_result():
+    return _same_result
+
+
+@pytest.fixture
+def stub():
+    """
+    Stub Canvas serving 6 courses of 4 groups of 10 assignments
+    """
+    with StubCanvas(make_courses(6, 4, 10)) as canvas:
+        yield canvas
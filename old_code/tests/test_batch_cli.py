@@ -0,0 +1,42 @@
+#!/usr/bin/env python
+
+"""test_batch_cli.py: Tests of the headless batch tool"""
+
+__author__ = "Leo Shen, Dhruba Paul"
+__copyright__ = "Copyright 2022, Canvas Course Mean Project"
+
+import os
+import tarfile
+from batch_cli import run_batch
+from grade_calc import scrape_and_calculate
+from stub_canvas import make_course, render_grades_page, write_pages
+
+
+def test_batch_computes_every_page_and_reports_bad_ones(tmp_path):
+    paths = write_pages(str(tmp_path), 12, 3, 8)
+    with open(os.path.join(tmp_path, "malformed.html"), "w", encoding="utf-8") as f:
+        f.write("<html><body>Not a grades page</body></html>")
+
+    records = {os.path.basename(record["source"]): record for record in run_batch([str(tmp_path)], 2)}
+
+    assert len(records) == len(paths) + 1
+    assert records["malformed.html"]["course_name"] is None and records["malformed.html"]["error"]
+    expected = scrape_and_calculate(render_grades_page(make_course(1, 3, 8)))
+    assert records["course_1.html"]["course_name"] == expected.course_name
+    assert records["course_1.html"]["student_grade"] == expected.student_grade
+
+
+def test_unreadable_archives_are_reported_and_the_batch_goes_on(tmp_path):
+    pages = write_pages(str(tmp_path / "pages"), 3, 2, 4)
+    with tarfile.open(tmp_path / "good.tar.gz", "w:gz") as tar:
+        for path in pages:
+            tar.add(path, os.path.basename(path))
+    (tmp_path / "corrupt.tar").write_bytes(b"not a tarball" * 100)
+
+    inputs = [str(tmp_path / "corrupt.tar"), str(tmp_path / "missing*.html"), str(tmp_path / "good.tar.gz")]
+    records = {record["source"]: record for record in run_batch(inputs, 2)}
+
+    assert len(records) == len(pages) + 2
+    assert records[str(tmp_path / "corrupt.tar")]["error"].startswith("ReadError")
+    assert records[str(tmp_path / "missing*.html")]["error"].startswith("FileNotFoundError")
+    assert all(record["error"] is None for source, record in records.items() if ":" in os.path.basename(source))
@@ -0,0 +1,47 @@
+#!/usr/bin/env python
+
+"""test_browser_wait.py: Tests of the login waits on a fake driver (virtual clock)"""
+
+__author__ = "Leo Shen, Dhruba Paul"
+__copyright__ = "Copyright 2022, Canvas Course Mean Project"
+
+import pytest
+from selenium.common.exceptions import TimeoutException
+from selenium.webdriver import Keys
+from browser_wait import (BackoffWait, LoginOutcome, login_form, LOGIN_FORM_TIMEOUT, LOGIN_OUTCOME_TIMEOUT,
+                          BAD_PASSWORD, DUO_DENIED, DUO_TIMED_OUT, LOGGED_IN)
+from fake_driver import FakeClock, FakeLoginDriver
+
+
+def login(dvr, clock):
+    """
+    Helper Method.
+    The login waits of login_canvas on a fake clock
+
+    :return: outcome of the login
+    """
+    input_net_id, input_password = BackoffWait(dvr, LOGIN_FORM_TIMEOUT, clock=clock, sleep=clock.sleep).until(
+        login_form)
+    input_net_id.send_keys("net id")
+    input_password.send_keys("password", Keys.RETURN)
+    return BackoffWait(dvr, LOGIN_OUTCOME_TIMEOUT, clock=clock, sleep=clock.sleep).until(LoginOutcome(clock=clock))
+
+
+@pytest.mark.parametrize("delay", [0.05, 1.0, 20.0])
+@pytest.mark.parametrize("outcome", [LOGGED_IN, BAD_PASSWORD, DUO_DENIED, DUO_TIMED_OUT])
+def test_login_outcomes(outcome, delay):
+    clock = FakeClock()
+    dvr = FakeLoginDriver(clock, outcome, form_delay=0.35, outcome_delay=delay)
+
+    assert login(dvr, clock) == outcome
+    assert dvr.submitted_at - 0.35 < 0.1  # the form is used as soon as it loads
+    assert clock() - dvr.outcome_at < 0.2  # the fixed 0.2 s polling of earlier versions, at best
+
+
+def test_login_form_deadline():
+    clock = FakeClock()
+    dvr = FakeLoginDriver(clock, form_delay=LOGIN_FORM_TIMEOUT + 1)
+
+    with pytest.raises(TimeoutException):
+        BackoffWait(dvr, LOGIN_FORM_TIMEOUT, clock=clock, sleep=clock.sleep).until(login_form)
+    assert LOGIN_FORM_TIMEOUT <= clock() < LOGIN_FORM_TIMEOUT + 0.2
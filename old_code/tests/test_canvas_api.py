@@ -0,0 +1,131 @@
+#!/usr/bin/env python
+
+"""test_canvas_api.py: Tests of the Canvas API client (concurrent fetches, cache revalidation, timeouts)"""
+
+__author__ = "Leo Shen, Dhruba Paul"
+__copyright__ = "Copyright 2022, Canvas Course Mean Project"
+
+import json
+import time
+import pytest
+import requests
+import canvas_api
+from canvas_api import CanvasAPI, dropped_assignments
+from grade_cache import GradeCache
+from grade_parser import parse_grades_page
+from stub_canvas import StubCanvas, make_courses, render_grades_page
+
+
+def test_concurrent_fetches_overlap_latency():
+    latency = 0.05
+    with StubCanvas(make_courses(8), latency=latency) as canvas:
+        api = CanvasAPI(canvas.url, canvas.cookies, pool_size=6)
+        course_ids = list(api.get_active_courses().values())
+        start = time.perf_counter()
+        done = [course_id for course_id, grades, error in api.iter_course_grades(course_ids, 6) if error is None]
+        elapsed = time.perf_counter() - start
+        api.close()
+
+    assert sorted(done) == sorted(course_ids)
+    sequential = len(course_ids) * 3 * latency  # course, assignment groups, assignments
+    assert elapsed < sequential / 2
+
+
+def test_failing_course_does_not_stop_the_others(stub):
+    api = CanvasAPI(stub.url, stub.cookies)
+    results = {course_id: error for course_id, grades, error in api.iter_course_grades(["1", "999", "2"])}
+    api.close()
+
+    assert results["1"] is None and results["2"] is None
+    assert isinstance(results["999"], requests.HTTPError)
+
+
+def test_cache_serves_and_revalidates(stub):
+    cache = GradeCache(":memory:", ttl=60)
+    api = CanvasAPI(stub.url, stub.cookies, cache=cache)
+    course_ids = [str(course_id) for course_id in stub.courses]
+    expected = {course_id: api.get_course_grades(course_id) for course_id in course_ids}
+
+    requests_before = stub.request_count
+    assert {course_id: api.get_course_grades(course_id) for course_id in course_ids} == expected
+    assert stub.request_count == requests_before  # within the TTL: no request at all
+
+    cache.ttl = 0
+    requests_before, not_modified_before = stub.request_count, stub.not_modified_count
+    assert {course_id: api.get_course_grades(course_id) for course_id in course_ids} == expected
+    assert stub.not_modified_count - not_modified_before == stub.request_count - requests_before > 0
+
+    stub.courses[1]["assignments"][0]["score"] = 0.0  # a new grade is posted
+    changed = [course_id for course_id in course_ids if api.get_course_grades(course_id) != expected[course_id]]
+    assert changed == ["1"]
+    api.close()
+    cache.close()
+
+
+def test_grades_cached_in_another_layout_are_not_read(stub, monkeypatch):
+    cache = GradeCache(":memory:", ttl=60)
+    api = CanvasAPI(stub.url, stub.cookies, cache=cache)
+    expected = api.get_course_grades("1")
+    a = expected.assignments
+    old_layout = [expected.course_name, expected.canvas_grade, expected.group_weights, a.group_list, a.mean_list,
+                  a.total_list, a.dropped_list, a.student_score_list]
+    cache.put(f"{stub.url}/courses/1/grades#parsed-v{canvas_api.GRADES_FORMAT}", "", json.dumps(old_layout))
+
+    monkeypatch.setattr(canvas_api, "GRADES_FORMAT", canvas_api.GRADES_FORMAT + 1)
+    cache.ttl = 0  # unchanged course: the parsed grades would be read if the key matched
+    assert api.get_course_grades("1") == expected
+    api.close()
+    cache.close()
+
+
+def test_stalled_request_times_out(monkeypatch):
+    monkeypatch.setattr(canvas_api, "REQUEST_TIMEOUT", 0.1)
+    with StubCanvas(make_courses(1), latency=1.0) as canvas:
+        api = CanvasAPI(canvas.url, canvas.cookies)
+        start = time.perf_counter()
+        with pytest.raises(requests.Timeout):
+            api.get_active_courses()
+        assert time.perf_counter() - start < 0.9
+        api.close()
+
+
+def test_assignments_carry_the_ids_of_the_grades_page(stub):
+    api = CanvasAPI(stub.url, stub.cookies)
+    grades = api.get_course_grades("1")
+    api.close()
+
+    assert grades.assignments.ids == parse_grades_page(render_grades_page(stub.courses[1])).assignments.ids
+    assert all(grades.assignments.ids)
+
+
+def graded(assignment_id, score, points):
+    return {"id": assignment_id, "points_possible": points, "submission": {"score": score, "excused": False}}
+
+
+def test_drops_with_mixed_points_keep_the_best_group_grade():
+    assignments = [graded(1, 50, 100), graded(2, 1, 4), graded(3, 100, 100)]
+    # Dropping 2 (the lowest percentage) leaves 75%, dropping 1 leaves 97%
+    assert dropped_assignments({"rules": {"drop_lowest": 1}}, assignments) == {1}
+    assert dropped_assignments({"rules": {"drop_lowest": 1, "never_drop": [1]}}, assignments) == {2}
+
+    assignments = [graded(1, 4, 4), graded(2, 90, 100), graded(3, 10, 100)]
+    # Dropping 1 (the highest percentage) leaves 50%, dropping 2 leaves 13%
+    assert dropped_assignments({"rules": {"drop_highest": 1}}, assignments) == {2}
+
+
+def test_drops_of_equal_points_follow_the_percentages():
+    assignments = [graded(i, score, 10) for i, score in enumerate([7, 3, 9, 5, 10])]
+    assert dropped_assignments({"rules": {"drop_lowest": 2, "drop_highest": 1}}, assignments) == {1, 3, 4}
+    assert dropped_assignments({"rules": {"drop_lowest": 9}}, assignments) == {0, 1, 2, 3}
+
+
+def test_groups_of_the_same_name_stay_apart(stub):
+    groups = stub.courses[1]["groups"]
+    groups[1]["name"] = groups[0]["name"]
+    api = CanvasAPI(stub.url, stub.cookies)
+    grades = api.get_course_grades("1")
+    api.close()
+
+    assert len(grades.group_weights) == len(groups)
+    assert grades.group_weights[f"{groups[1]['name']} ({groups[1]['id']})"] == groups[1]["group_weight"]
+    assert len(grades.assignments.group_names) == len(groups)
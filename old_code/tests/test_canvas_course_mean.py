@@ -0,0 +1,88 @@
+#!/usr/bin/env python
+
+"""test_canvas_course_mean.py: Tests of the GUI workers (without Tk) and of what the GUI imports at startup"""
+
+__author__ = "Leo Shen, Dhruba Paul"
+__copyright__ = "Copyright 2022, Canvas Course Mean Project"
+
+import os
+import subprocess
+import sys
+from CanvasCourseMean import get_all_active_courses, get_from_url
+from canvas_api import CanvasAPI
+
+# Heavy modules the GUI only imports once they are needed
+STARTUP_DEFERRED = ["pandas", "pandastable", "numpy", "lxml.etree", "bs4", "requests",
+                    "selenium.webdriver.chrome.webdriver"]
+
+
+class RecordingView:
+    """
+    Stand-in for results_view.ResultsView without Tk: records the messages of the worker
+    """
+
+    def __init__(self):
+        self.messages = []
+
+    def set_total(self, total):
+        self.messages.append(("total", total))
+
+    def add_course(self, course_name, summary, table, grades=None):
+        self.messages.append(("course", course_name, summary))
+
+    def fail(self, message):
+        self.messages.append(("fail", message))
+
+    def finish(self):
+        self.messages.append(("finish",))
+
+
+def test_every_course_is_shown_then_finished(stub):
+    api = CanvasAPI(stub.url, stub.cookies)
+    view = RecordingView()
+    get_all_active_courses(None, view, api)
+    api.close()
+
+    assert view.messages[0] == ("total", len(stub.courses))
+    shown = sorted(message[1] for message in view.messages if message[0] == "course")
+    assert shown == sorted(course["name"] for course in stub.courses.values())
+    assert view.messages[-1] == ("finish",)
+
+
+def test_rejected_session_fails_the_course_list(stub):
+    api = CanvasAPI(stub.url, stub.cookies)
+    stub.expire_sessions()
+    view = RecordingView()
+    get_all_active_courses(None, view, api)
+    api.close()
+
+    assert len(view.messages) == 1 and view.messages[0][0] == "fail"
+
+
+def test_unknown_course_fails(stub):
+    api = CanvasAPI(stub.url, stub.cookies)
+    view = RecordingView()
+    get_from_url(None, f"{stub.url}/courses/999999", view, api)
+    api.close()
+
+    assert len(view.messages) == 1 and view.messages[0][0] == "fail"
+
+
+def test_page_without_grades_fails():
+    class Browser:
+        page_source = "<html><body>Dashboard</body></html>"
+
+        def get(self, url):
+            pass
+
+    view = RecordingView()
+    get_from_url(Browser(), "https://canvas.wisc.edu/", view)
+
+    assert view.messages == [("fail", "Not the grades page of a course")]
+
+
+def test_heavy_modules_are_not_imported_at_startup():
+    code = "import sys, CanvasCourseMean; print(','.join(m for m in %r if m in sys.modules))" % STARTUP_DEFERRED
+    imported = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True,
+                              cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))).stdout.strip()
+    assert imported == ""
@@ -0,0 +1,37 @@
+#!/usr/bin/env python
+
+"""test_driver_pool.py: Tests of the browser pool, on fake browsers loading heavy pages from a stub Canvas"""
+
+__author__ = "Leo Shen, Dhruba Paul"
+__copyright__ = "Copyright 2022, Canvas Course Mean Project"
+
+from driver_pool import DriverPool
+from fake_driver import FakeBrowser
+from grade_calc import scrape_and_calculate
+from stub_canvas import StubCanvas, make_courses, render_grades_page
+
+
+def test_pool_loads_every_page(same_result):
+    courses = make_courses(8, 4, 10)
+    expected = {course_id: scrape_and_calculate(render_grades_page(course)) for course_id, course in courses.items()}
+    with StubCanvas(courses, heavy_pages=True) as stub, \
+            DriverPool(3, stub.cookies, stub.url, driver_factory=FakeBrowser.create) as pool:
+        urls = {f"{stub.url}/courses/{course_id}/grades": course_id for course_id in courses}
+        results = {url: (html, error) for url, html, error in pool.fetch_pages(urls)}
+
+    assert set(results) == set(urls)
+    for url, (html, error) in results.items():
+        assert error is None and same_result(scrape_and_calculate(html), expected[urls[url]])
+
+
+def test_blocked_resources_are_not_requested():
+    courses = make_courses(2, 4, 10)
+    with StubCanvas(courses, heavy_pages=True) as stub:
+        requested = {}
+        for name, factory in [("full", lambda block: FakeBrowser("normal")), ("blocking", FakeBrowser.create)]:
+            with DriverPool(1, stub.cookies, stub.url, driver_factory=factory) as pool:
+                before = stub.request_count
+                list(pool.fetch_pages(f"{stub.url}/courses/{course_id}/grades" for course_id in courses))
+                requested[name] = stub.request_count - before
+
+    assert requested["blocking"] < requested["full"]
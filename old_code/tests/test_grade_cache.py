@@ -0,0 +1,49 @@
+#!/usr/bin/env python
+
+"""test_grade_cache.py: Tests of the on-disk cache (lookups without writes, LRU eviction)"""
+
+__author__ = "Leo Shen, Dhruba Paul"
+__copyright__ = "Copyright 2022, Canvas Course Mean Project"
+
+import os
+import pytest
+from grade_cache import GradeCache
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = GradeCache(os.path.join(tmp_path, "cache.sqlite3"), max_bytes=300)
+    yield cache
+    cache.close()
+
+
+def test_lookups_do_not_write(cache):
+    cache.put("a", "x" * 100)
+    changes = cache.connection.total_changes
+    for _ in range(10):
+        assert cache.get("a").payload == "x" * 100
+    assert cache.connection.total_changes == changes
+
+
+def test_least_recently_looked_up_entry_is_evicted(cache):
+    for key in ("a", "b", "c"):
+        cache.put(key, "x" * 100)
+    cache.get("a")
+    cache.put("d", "x" * 100)
+
+    assert cache.get("b") is None
+    assert all(cache.get(key) is not None for key in ("a", "c", "d"))
+
+
+def test_access_times_survive_a_restart(tmp_path):
+    path = os.path.join(tmp_path, "cache.sqlite3")
+    cache = GradeCache(path, max_bytes=300)
+    for key in ("a", "b", "c"):
+        cache.put(key, "x" * 100)
+    cache.get("a")
+    cache.close()
+
+    cache = GradeCache(path, max_bytes=300)
+    cache.put("d", "x" * 100)
+    assert cache.get("a") is not None and cache.get("b") is None
+    cache.close()
@@ -0,0 +1,36 @@
+#!/usr/bin/env python
+
+"""test_grade_calc.py: Tests of the grade computation (thread safety, numpy kernel against pandas)"""
+
+__author__ = "Leo Shen, Dhruba Paul"
+__copyright__ = "Copyright 2022, Canvas Course Mean Project"
+
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from grade_calc import calculate_course, calculate_grade_pandas, scrape_and_calculate
+from grade_kernel import calculate_grades_batch, pack_courses
+from grade_parser import parse_grades_page
+from stub_canvas import make_course, render_grades_page
+
+
+def test_concurrent_computations_match_sequential(same_result):
+    pages = [render_grades_page(make_course(i, 2 + i % 5, 5 + i % 20)) for i in range(1, 21)]
+    expected = [scrape_and_calculate(page) for page in pages]
+
+    with ThreadPoolExecutor(max_workers=16) as executor:
+        results = list(executor.map(scrape_and_calculate, [pages[i % len(pages)] for i in range(100)]))
+
+    assert all(same_result(result, expected[i % len(pages)]) for i, result in enumerate(results))
+
+
+def test_numpy_kernel_matches_pandas():
+    courses = [parse_grades_page(render_grades_page(make_course(i, 2 + i % 5, 5 + i % 15))) for i in range(1, 31)]
+
+    reference = [calculate_grade_pandas(c.assignments.group_list, c.assignments.mean_list, c.assignments.total_list,
+                                        c.assignments.dropped_list, c.assignments.student_score_list,
+                                        c.group_weights)[:2] for c in courses]
+    single = [calculate_course(c)[2:4] for c in courses]
+    batch = calculate_grades_batch(**pack_courses(courses))
+
+    assert np.allclose(reference, single, equal_nan=True)
+    assert np.allclose(np.array(single), np.column_stack(batch), equal_nan=True)
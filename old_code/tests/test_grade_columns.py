@@ -0,0 +1,40 @@
+#!/usr/bin/env python
+
+"""test_grade_columns.py: Tests of the columnar assignment rows"""
+
+__author__ = "Leo Shen, Dhruba Paul"
+__copyright__ = "Copyright 2022, Canvas Course Mean Project"
+
+import numpy as np
+from grade_cache import grades_from_json, grades_to_json
+from grade_columns import AssignmentBatch, EXCUSED, UNGRADED
+from grade_kernel import batch_table, group_table, table_totals
+from grade_parser import parse_grades_page
+from stub_canvas import make_course, render_grades_page
+
+
+def test_columns_compute_like_the_row_lists():
+    grades = parse_grades_page(render_grades_page(make_course(3, 6, 30)))
+    a = grades.assignments
+
+    from_lists = group_table(a.group_list, a.mean_list, a.total_list, a.dropped_list, a.student_score_list,
+                             grades.group_weights)
+    assert np.allclose(table_totals(from_lists), table_totals(batch_table(a, grades.group_weights)))
+
+
+def test_round_trips():
+    grades = parse_grades_page(render_grades_page(make_course(4, 4, 10)))
+
+    assert grades_from_json(grades_to_json(grades)) == grades
+    assert AssignmentBatch.from_columns(grades.assignments.to_columns()) == grades.assignments
+    assert grades.assignments.nbytes == 35 * len(grades.assignments)
+
+
+def test_with_scores_clears_ungraded_only():
+    grades = parse_grades_page(render_grades_page(make_course(5, 4, 10)))
+    a = grades.assignments
+    scored = a.with_scores([1.0] * len(a))
+
+    assert not any(flag & UNGRADED for flag in scored.flags)
+    assert [flag & EXCUSED for flag in scored.flags] == [flag & EXCUSED for flag in a.flags]
+    assert scored.group_codes is a.group_codes and scored.totals is a.totals
@@ -0,0 +1,110 @@
+#!/usr/bin/env python
+
+"""test_grade_history.py: Tests of the grade history (changes only, removals, state rebuilt at any time)"""
+
+__author__ = "Leo Shen, Dhruba Paul"
+__copyright__ = "Copyright 2022, Canvas Course Mean Project"
+
+import os
+import numpy as np
+import pytest
+from grade_calc import calculate_course
+from grade_columns import UNGRADED
+from grade_history import GradeHistory, assignment_rows
+from grade_parser import parse_grades_page
+from stub_canvas import make_course, make_courses, render_grades_page
+
+
+@pytest.fixture
+def history(tmp_path):
+    history = GradeHistory(os.path.join(tmp_path, "history.sqlite3"))
+    yield history
+    history.close()
+
+
+def test_state_is_rebuilt_from_the_changes(history):
+    rng = np.random.default_rng(0)
+    courses = [parse_grades_page(render_grades_page(course)) for course in make_courses(4, 4, 10).values()]
+    checkpoints = {}
+    written = 0
+    for snapshot in range(60):
+        for c, grades in enumerate(courses):
+            if rng.random() < 0.2:
+                scores = grades.assignments.scores.tolist()
+                for index in rng.integers(len(scores), size=2):
+                    scores[index] = float(rng.uniform(0, grades.assignments.totals[index]))
+                courses[c] = grades = grades._replace(assignments=grades.assignments.with_scores(scores))
+            written += history.ingest(grades, calculate_course(grades), taken_at=float(snapshot))
+            checkpoints[(grades.course_name, snapshot)] = assignment_rows(grades)
+
+    for (course, snapshot), rows in checkpoints.items():
+        assert history.assignments_at(course, float(snapshot)) == rows, (course, snapshot)
+    assert written < 60 * len(courses) * len(courses[0].assignments) / 4  # unchanged rows are not written again
+    assert len(history.course_series(courses[0].course_name)) == 60
+
+
+def test_history_is_reloaded_from_disk(tmp_path):
+    path = os.path.join(tmp_path, "history.sqlite3")
+    grades = parse_grades_page(render_grades_page(make_courses(1, 4, 10)[1]))
+    history = GradeHistory(path)
+    history.ingest(grades, calculate_course(grades), taken_at=1.0)
+    history.close()
+
+    history = GradeHistory(path)
+    assert history.ingest(grades, calculate_course(grades), taken_at=2.0) == 0
+    assert history.assignments_at(grades.course_name, 2.0) == assignment_rows(grades)
+    history.close()
+
+
+def test_removed_assignments_and_groups_leave_the_state(tmp_path):
+    path = os.path.join(tmp_path, "history.sqlite3")
+    course = make_course(1, 4, 10)
+    last_group = course["groups"][-1]
+    removed_ids = {course["assignments"][0]["id"]} | {a["id"] for a in course["assignments"]
+                                                        if a["group_id"] == last_group["id"]}
+    smaller = dict(course, groups=course["groups"][:-1],
+                   assignments=[a for a in course["assignments"] if a["id"] not in removed_ids])
+    full = parse_grades_page(render_grades_page(course))
+    reduced = parse_grades_page(render_grades_page(smaller))
+    history = GradeHistory(path)
+    history.ingest(full, calculate_course(full), taken_at=1.0)
+    history.ingest(reduced, calculate_course(reduced), taken_at=2.0)
+
+    assert history.assignments_at(full.course_name, 1.0) == assignment_rows(full)
+    assert history.assignments_at(full.course_name, 2.0) == assignment_rows(reduced)
+    assert history.group_series(full.course_name, last_group["name"])[-1] == (2.0, None, None, None, None, None)
+    history.close()
+
+    history = GradeHistory(path)
+    assert history.ingest(reduced, calculate_course(reduced), taken_at=3.0) == 0
+    assert history.ingest(full, calculate_course(full), taken_at=4.0) == len(full.assignments) - len(
+        reduced.assignments)  # the assignments after the first one keep their history
+    assert history.assignments_at(full.course_name, 4.0) == assignment_rows(full)
+    assert history.group_series(full.course_name, last_group["name"])[-1].taken_at == 4.0
+    history.close()
+
+
+def test_assignment_history_follows_the_assignment(history):
+    course = make_course(1, 4, 10)
+    first = course["assignments"][0]
+    old = parse_grades_page(render_grades_page(course))
+    course["assignments"].insert(0, dict(first, id=999999, name="Published later", score=None, mean=None,
+                                         excused=False, dropped=False))
+    new = parse_grades_page(render_grades_page(course))
+    history.ingest(old, calculate_course(old), taken_at=1.0)
+
+    assert history.ingest(new, calculate_course(new), taken_at=2.0) == 1
+    assert [point.taken_at for point in history.assignment_series(new.course_name, first["id"])] == [1.0]
+
+
+def test_ungraded_to_zero_is_recorded(history):
+    grades = parse_grades_page(render_grades_page(make_course(1, 4, 10)))
+    a = grades.assignments
+    ungraded = next(i for i, flags in enumerate(a.flags) if flags & UNGRADED)
+    graded = grades._replace(assignments=a.with_scores(a.scores))  # same scores (0 for the ungraded ones)
+    history.ingest(grades, calculate_course(grades), taken_at=1.0)
+
+    assert history.ingest(graded, calculate_course(graded), taken_at=2.0) == sum(
+        1 for flags in a.flags if flags & UNGRADED)
+    assert [point.flags & UNGRADED for point in history.assignment_series(grades.course_name, a.ids[ungraded])] == \
+        [UNGRADED, 0]
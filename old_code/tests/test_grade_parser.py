@@ -0,0 +1,51 @@
+#!/usr/bin/env python
+
+"""test_grade_parser.py: Differential test of the lxml grades page parser against the BeautifulSoup scraper
+
+The corpus is the generated pages and the saved grades pages of tests/pages (copied from the markup of real Canvas
+grades pages). More saved pages can be added with the GRADES_PAGES environment variable (a glob pattern).
+"""
+
+__author__ = "Leo Shen, Dhruba Paul"
+__copyright__ = "Copyright 2022, Canvas Course Mean Project"
+
+import glob
+import os
+import pytest
+from grade_parser import parse_grades_page, scrape_grades_soup
+from stub_canvas import make_course, render_grades_page
+
+PAGES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "pages")
+SAVED_PAGES = sorted(glob.glob(os.path.join(PAGES_DIR, "*.html"))) + \
+    sorted(glob.glob(os.environ.get("GRADES_PAGES", "")))
+
+# What the checked-in pages hold: (course name, canvas grade, group weights, assignment ids, flags)
+EXPECTED = {
+    "weighted_course.html": ("MATH 340: Elementary Matrix & Linear Algebra (001) FA22", "85.81%",
+                             {"Homework": "25", "Exams": "75", "Total": "100"},
+                             [5550101, 5550102, 5550103, 5550201, 5550202], [0, 1, 6, 0, 4]),
+    "unweighted_course.html": ("COMP SCI 200: Programming I (002) FA22", None, None, [], []),
+}
+
+
+@pytest.mark.parametrize("n_groups, n_assignments", [(1, 1), (2, 5), (4, 10), (6, 25), (8, 70)])
+@pytest.mark.parametrize("course_id", range(1, 6))
+def test_generated_pages(course_id, n_groups, n_assignments):
+    page = render_grades_page(make_course(course_id, n_groups, n_assignments))
+    assert parse_grades_page(page) == scrape_grades_soup(page)
+
+
+@pytest.mark.parametrize("path", SAVED_PAGES)
+def test_saved_pages(path):
+    with open(path, encoding="utf-8") as f:
+        page = f.read()
+    assert parse_grades_page(page) == scrape_grades_soup(page)
+
+
+@pytest.mark.parametrize("name", sorted(EXPECTED))
+def test_checked_in_pages(name):
+    with open(os.path.join(PAGES_DIR, name), encoding="utf-8") as f:
+        grades = parse_grades_page(f.read())
+    course_name, canvas_grade, group_weights, ids, flags = EXPECTED[name]
+    assert (grades.course_name, grades.canvas_grade, grades.group_weights) == (course_name, canvas_grade, group_weights)
+    assert list(grades.assignments.ids) == ids and list(grades.assignments.flags) == flags
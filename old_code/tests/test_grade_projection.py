@@ -0,0 +1,43 @@
+#!/usr/bin/env python
+
+"""test_grade_projection.py: Tests of the incremental what-if projection against the full computation"""
+
+__author__ = "Leo Shen, Dhruba Paul"
+__copyright__ = "Copyright 2022, Canvas Course Mean Project"
+
+import numpy as np
+import pytest
+from grade_calc import calculate_course
+from grade_parser import parse_grades_page
+from grade_projection import Projection
+from stub_canvas import make_course, render_grades_page
+
+
+@pytest.fixture
+def grades():
+    return parse_grades_page(render_grades_page(make_course(1, 6, 40)))
+
+
+def test_edits_match_the_full_computation(grades):
+    rng = np.random.default_rng(0)
+    projection = Projection(grades)
+    scores = grades.assignments.scores.tolist()
+    for _ in range(500):
+        index = int(rng.integers(len(scores)))
+        scores[index] = float(rng.uniform(0, grades.assignments.totals[index]))
+        projection.set_score(index, scores[index])
+
+    expected = calculate_course(grades._replace(assignments=grades.assignments.with_scores(scores)))
+    assert projection.course_avg == pytest.approx(expected.course_avg, abs=1e-9)
+    assert projection.student_grade == pytest.approx(expected.student_grade, abs=1e-9)
+
+
+@pytest.mark.parametrize("target", [60.0, 90.0])
+def test_needed_score_reaches_the_target(grades, target):
+    projection = Projection(grades)
+    for group in projection.groups:
+        final = projection.add_assignment(group, 100)
+        needed = projection.needed_score(final, target)
+        projection.set_score(final, needed)
+        assert needed == 0.0 or projection.student_grade == pytest.approx(target, abs=1e-9), group
+        projection.set_score(final, 0.0)
@@ -0,0 +1,106 @@
+#!/usr/bin/env python
+
+"""test_grade_server.py: Tests of the JSON/HTTP service against a stub Canvas"""
+
+__author__ = "Leo Shen, Dhruba Paul"
+__copyright__ = "Copyright 2022, Canvas Course Mean Project"
+
+import asyncio
+import pytest
+import requests
+from canvas_api import CanvasAPI
+from grade_calc import calculate_course
+from grade_server import GradeServer, ServerThread
+from stub_canvas import StubCanvas, make_courses
+
+
+@pytest.fixture
+def served():
+    """
+    GradeServer over a stub Canvas answering every request after 50 ms
+    """
+    with StubCanvas(make_courses(4, 4, 10), latency=0.05) as stub:
+        api = CanvasAPI(stub.url, stub.cookies)
+        grade_server = GradeServer(api)
+        with ServerThread(grade_server) as server:
+            yield stub, api, grade_server, server
+        api.close()
+
+
+async def raw_request(url, request):
+    """
+    Helper Method.
+    Sends a request as is
+
+    :return: the status line of the response
+    """
+    host, port = url[len("http://"):].split(":")
+    reader, writer = await asyncio.open_connection(host, int(port))
+    writer.write(request)
+    status = (await reader.readline()).decode().strip()
+    await reader.read()  # the server closes the connection
+    writer.close()
+    return status
+
+
+async def burst(url, path, clients):
+    """
+    Helper Method.
+    GETs a path on as many connections at once
+
+    :return: list of the status lines
+    """
+    request = f"GET {path} HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\n\r\n".encode()
+    return await asyncio.gather(*(raw_request(url, request) for _ in range(clients)))
+
+
+def test_concurrent_requests_are_coalesced(served):
+    stub, api, grade_server, server = served
+    statuses = asyncio.run(burst(server.url, "/courses/1", 50))
+
+    assert statuses == ["HTTP/1.1 200 OK"] * 50
+    assert grade_server.upstream_fetches == 2  # course list + course
+
+
+def test_course_matches_the_computation(served):
+    stub, api, grade_server, server = served
+    record = requests.get(server.url + "/courses/2").json()
+    expected = calculate_course(api.get_course_grades("2"))
+
+    assert record["course_name"] == expected.course_name
+    assert record["student_grade"] == pytest.approx(expected.student_grade, abs=1e-9)
+    assert [group["group"] for group in requests.get(server.url + "/courses/2/groups").json()["groups"]] == \
+        list(expected.table.groups)
+
+
+def test_unchanged_course_is_not_modified(served):
+    stub, api, grade_server, server = served
+    response = requests.get(server.url + "/courses/1")
+    revalidated = requests.get(server.url + "/courses/1", headers={"If-None-Match": response.headers["ETag"]})
+
+    assert revalidated.status_code == 304 and revalidated.content == b""
+
+
+@pytest.mark.parametrize("if_none_match, status", [
+    ('"other", {etag}', 304), ('W/{etag}', 304), ('"other" ,W/{etag} , "more"', 304), ("*", 304),
+    ('"other"', 200), ('W/"other", "more"', 200), ('{etag}x', 200)])
+def test_if_none_match_lists_and_weak_tags(served, if_none_match, status):
+    stub, api, grade_server, server = served
+    etag = requests.get(server.url + "/courses/1").headers["ETag"]
+    revalidated = requests.get(server.url + "/courses/1", headers={"If-None-Match": if_none_match.format(etag=etag)})
+
+    assert revalidated.status_code == status
+
+
+@pytest.mark.parametrize("path, status", [("/courses/999", 404), ("/nothing", 404)])
+def test_errors(served, path, status):
+    stub, api, grade_server, server = served
+    response = requests.get(server.url + path)
+    assert response.status_code == status and "error" in response.json()
+
+
+@pytest.mark.parametrize("length", ["abc", "-1", "1e3"])
+def test_malformed_content_length(served, length):
+    stub, api, grade_server, server = served
+    request = f"GET /courses/1 HTTP/1.1\r\nHost: localhost\r\nContent-Length: {length}\r\n\r\n".encode()
+    assert asyncio.run(raw_request(server.url, request)) == "HTTP/1.1 400 Bad Request"
@@ -0,0 +1,39 @@
+#!/usr/bin/env python
+
+"""test_gradebook_stats.py: Tests of the streamed gradebook statistics"""
+
+__author__ = "Leo Shen, Dhruba Paul"
+__copyright__ = "Copyright 2022, Canvas Course Mean Project"
+
+import io
+import numpy as np
+import pytest
+from gradebook_stats import competition_ranks, gradebook_stats
+from stub_canvas import write_gradebook_csv
+
+N_STUDENTS = 300
+
+
+@pytest.fixture(scope="module")
+def export():
+    f = io.StringIO()
+    spec = write_gradebook_csv(f, N_STUDENTS, 4, 10)
+    return f.getvalue(), spec
+
+
+def test_chunks_give_the_same_statistics(export):
+    text, spec = export
+    streamed = gradebook_stats(io.StringIO(text), spec, chunk_size=37)
+    whole = gradebook_stats(io.StringIO(text), spec, chunk_size=N_STUDENTS + 1)
+
+    assert np.allclose(streamed.grades, whole.grades) and streamed.overall == whole.overall
+    assert streamed.group_stats == whole.group_stats
+    assert len(streamed.students) == N_STUDENTS  # student view account left out
+
+
+def test_ranks(export):
+    text, spec = export
+    stats = gradebook_stats(io.StringIO(text), spec, chunk_size=50)
+
+    assert stats.ranks[int(np.argmax(stats.grades))] == 1 and stats.ranks.max() <= N_STUDENTS
+    assert competition_ranks(np.array([90.0, 80.0, 90.0, 70.0])).tolist() == [1, 3, 1, 4]
@@ -0,0 +1,51 @@
+#!/usr/bin/env python
+
+"""test_pipeline.py: Tests of the staged pipeline (results, errors, backpressure, early stop)"""
+
+__author__ = "Leo Shen, Dhruba Paul"
+__copyright__ = "Copyright 2022, Canvas Course Mean Project"
+
+import threading
+import time
+from pipeline import Pipeline, Stage
+
+
+def test_every_item_comes_out():
+    pipeline = Pipeline([Stage("double", lambda x: 2 * x, 3), Stage("increment", lambda x: x + 1, 2)])
+    results = {item: (value, error) for item, value, error in pipeline.run(range(100))}
+
+    assert results == {item: (2 * item + 1, None) for item in range(100)}
+
+
+def test_failing_item_skips_the_next_stages():
+    calls = []
+
+    def check(x):
+        if x == 3:
+            raise ValueError(x)
+        return x
+
+    pipeline = Pipeline([Stage("check", check, 1), Stage("record", lambda x: calls.append(x) or x, 1)])
+    results = {item: (value, error) for item, value, error in pipeline.run(range(6))}
+
+    assert isinstance(results[3][1], ValueError) and results[3][0] is None
+    assert sorted(calls) == [0, 1, 2, 4, 5]
+
+
+def test_backpressure_bounds_the_items_in_flight():
+    pipeline = Pipeline([Stage("fetch", lambda x: x, 1), Stage("compute", lambda x: x, 1)], queue_size=2)
+    for _ in pipeline.run(range(200)):
+        time.sleep(0.001)  # slow consumer
+
+    assert pipeline.max_in_flight <= 1 + 1 + 3 * 2 + 1  # workers + queues + the item being fed
+
+
+def test_closing_the_results_stops_the_stages():
+    started = threading.active_count()
+    pipeline = Pipeline([Stage("slow", lambda x: time.sleep(0.01) or x, 2)])
+    results = pipeline.run(iter(range(10 ** 9)))
+    next(results)
+    results.close()
+
+    assert pipeline.stopped.is_set()
+    assert threading.active_count() == started
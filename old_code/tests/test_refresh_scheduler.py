@@ -0,0 +1,103 @@
+#!/usr/bin/env python
+
+"""test_refresh_scheduler.py: Tests of the refresh scheduler on a fake clock against a stub Canvas"""
+
+__author__ = "Leo Shen, Dhruba Paul"
+__copyright__ = "Copyright 2022, Canvas Course Mean Project"
+
+import copy
+import random
+import pytest
+from canvas_api import CanvasAPI
+from fake_driver import FakeClock
+from grade_cache import GradeCache
+from grade_parser import parse_grades_page
+from refresh_scheduler import (ASSIGNMENT_ADDED, ASSIGNMENT_DROPPED, GRADE_POSTED, MEAN_UPDATED, SCORE_CHANGED,
+                               RefreshScheduler, api_courses, diff_courses)
+from stub_canvas import StubCanvas, make_course, make_courses, render_grades_page
+
+INTERVAL = 600
+
+
+@pytest.fixture
+def watched():
+    """
+    Stub Canvas, and a scheduler on a fake clock checking it (every check revalidates)
+    """
+    rng = random.Random(0)
+    clock = FakeClock()
+    reported = []
+    with StubCanvas(make_courses(6, 4, 10)) as stub:
+        api = CanvasAPI(stub.url, stub.cookies, cache=GradeCache(":memory:", ttl=0))
+        scheduler = RefreshScheduler(api_courses(api), reported.append, INTERVAL, wait=clock.sleep, rand=rng.random,
+                                     clock=clock)
+        yield stub, scheduler, reported, clock, rng
+        api.close()
+
+
+def test_unchanged_courses_are_not_recomputed(watched):
+    stub, scheduler, reported, clock, rng = watched
+    scheduler.run(max_checks=5)
+
+    assert len(reported[0]) == len(stub.courses) and not any(reported[1:])
+    assert scheduler.recomputed == len(stub.courses)
+    assert INTERVAL * 0.9 * 4 <= clock() <= INTERVAL * 1.1 * 4  # 4 jittered intervals between 5 checks
+
+
+def test_changes_are_reported(watched):
+    stub, scheduler, reported, clock, rng = watched
+    scheduler.check()
+
+    # A grade posted, a mean updated, an assignment excused (in different courses)
+    expected = []
+    kinds = [GRADE_POSTED, MEAN_UPDATED, ASSIGNMENT_DROPPED]
+    for kind, course in zip(kinds, rng.sample(list(stub.courses.values()), len(kinds))):
+        if kind == GRADE_POSTED:
+            assignment = rng.choice([a for a in course["assignments"] if a["score"] is None])
+            assignment["score"] = assignment["points_possible"] * 0.9
+        elif kind == MEAN_UPDATED:
+            assignment = rng.choice([a for a in course["assignments"] if a["mean"] is not None])
+            assignment["mean"] = round(assignment["mean"] * 0.9, 2)
+        else:
+            assignment = rng.choice([a for a in course["assignments"] if not a["excused"] and not a["dropped"]])
+            assignment["excused"] = True
+        position = [a["id"] for a in course["assignments"]
+                    if a["group_id"] == assignment["group_id"]].index(assignment["id"])
+        expected.append((course["name"], kind, assignment["group_name"], position))
+    changed = scheduler.check()
+
+    found = {(c.course, c.kind, c.group, c.position) for _, _, changes in changed for c in changes}
+    assert set(expected) <= found
+    assert len(changed) == len(kinds)
+
+
+def test_zero_scores_are_told_from_ungraded_assignments():
+    course = make_course(1, 4, 10)
+    ungraded = next(a for a in course["assignments"] if a["score"] is None)
+    graded = next(a for a in course["assignments"] if a["score"] is not None and not a["excused"])
+    graded["score"] = 0.0
+    old = parse_grades_page(render_grades_page(course))
+
+    course = copy.deepcopy(course)
+    for assignment in course["assignments"]:
+        if assignment["id"] == ungraded["id"]:
+            assignment["score"] = 0.0
+        elif assignment["id"] == graded["id"]:
+            assignment["score"] = 5.0
+    changes = {(c.kind, c.old, c.new) for c in diff_courses(old, parse_grades_page(render_grades_page(course)))
+               if c.kind in (GRADE_POSTED, SCORE_CHANGED)}
+
+    assert changes == {(GRADE_POSTED, None, 0.0), (SCORE_CHANGED, 0.0, 5.0)}
+
+
+def test_assignment_published_ahead_of_others_changes_nothing_else():
+    course = make_course(1, 4, 10)
+    old = parse_grades_page(render_grades_page(course))
+
+    course = copy.deepcopy(course)
+    first = course["assignments"][0]
+    course["assignments"].insert(0, dict(first, id=999999, name="Published later", score=None, mean=None,
+                                         excused=False, dropped=False))
+    changes = diff_courses(old, parse_grades_page(render_grades_page(course)))
+
+    assert [(c.kind, c.group, c.position) for c in changes] == [(ASSIGNMENT_ADDED, first["group_name"], 0)]
@@ -0,0 +1,108 @@
+#!/usr/bin/env python
+
+"""test_session_store.py: Tests of the saved session (valid, expired, tampered, missing, other instance)"""
+
+__author__ = "Leo Shen, Dhruba Paul"
+__copyright__ = "Copyright 2022, Canvas Course Mean Project"
+
+import os
+import pytest
+from session_store import SessionStore, resume_session
+
+
+@pytest.fixture
+def store(tmp_path):
+    return SessionStore(os.path.join(tmp_path, "session.bin"), use_keyring=False)
+
+
+def test_no_saved_session(store, stub):
+    requests_before = stub.request_count
+    assert resume_session(store, stub.url) is None
+    assert stub.request_count == requests_before
+
+
+def test_valid_session_is_resumed(store, stub):
+    store.save(stub.cookies, stub.url)
+    assert resume_session(store, stub.url) == stub.cookies
+
+
+def test_cookies_are_not_stored_in_clear(store, stub):
+    store.save(stub.cookies, stub.url)
+    with open(store.path, "rb") as f:
+        assert stub.cookies[0]["value"].encode() not in f.read()
+
+
+def test_session_of_another_instance(store, stub):
+    store.save(stub.cookies, stub.url)
+    assert store.load("https://other.instructure.com") is None
+
+
+def test_tampered_session_is_rejected_without_a_request(store, stub):
+    store.save(stub.cookies, stub.url)
+    with open(store.path, "r+b") as f:
+        token = f.read()
+        f.seek(0)
+        f.write(token[:-5] + (b"A" if token[-5:-4] != b"A" else b"B") + token[-4:])
+
+    requests_before = stub.request_count
+    assert resume_session(store, stub.url) is None
+    assert stub.request_count == requests_before
+
+
+def test_expired_session_is_checked_once_and_cleared(store, stub):
+    store.save(stub.cookies, stub.url)
+    stub.expire_sessions()
+
+    requests_before = stub.request_count
+    assert resume_session(store, stub.url) is None
+    assert stub.request_count - requests_before == 1
+    assert store.load(stub.url) is None
+
+
+def test_old_session_is_not_tried(tmp_path, stub):
+    store = SessionStore(os.path.join(tmp_path, "session.bin"), max_age=-1, use_keyring=False)
+    store.save(stub.cookies, stub.url)
+    assert store.load(stub.url) is None
+
+
+class CredentialStore:
+    """
+    Stand-in for the keyring module over a dictionary (refusing every key when locked)
+    """
+
+    class errors:
+        class KeyringError(Exception):
+            pass
+
+    def __init__(self, locked=False):
+        self.passwords = {}
+        self.locked = locked
+
+    def get_password(self, service, name):
+        if self.locked:
+            raise self.errors.KeyringError("locked")
+        return self.passwords.get((service, name))
+
+    def set_password(self, service, name, password):
+        if self.locked:
+            raise self.errors.KeyringError("locked")
+        self.passwords[service, name] = password
+
+
+def test_key_is_kept_in_the_credential_store(tmp_path, stub, monkeypatch):
+    credentials = CredentialStore()
+    monkeypatch.setattr("session_store.os_keyring", lambda: credentials)
+    store = SessionStore(os.path.join(tmp_path, "first launch", "session.bin"))
+    store.save(stub.cookies, stub.url)
+
+    assert not os.path.exists(store.key_path) and len(credentials.passwords) == 1
+    assert store.load(stub.url) == stub.cookies
+
+
+def test_locked_credential_store_falls_back_to_the_key_file(tmp_path, stub, monkeypatch):
+    monkeypatch.setattr("session_store.os_keyring", lambda: CredentialStore(locked=True))
+    store = SessionStore(os.path.join(tmp_path, "first launch", "session.bin"))
+    store.save(stub.cookies, stub.url)
+
+    assert os.path.exists(store.key_path)
+    assert store.load(stub.url) == stub.cookies
@@ -0,0 +1,172 @@
+#!/usr/bin/env python
+
+"""tracing.py: Lightweight phase timing (login, navigation, fetch, parse, compute, render) with Chrome trace export
+
+Usage:
+    tracing.enable()
+    with tracing.span("fetch", course_id=course_id) as s:
+        html = ...
+        s.set(bytes=len(html))
+    tracing.export_chrome_trace("trace.json")  # open in chrome://tracing or https://ui.perfetto.dev
+    print(tracing.summary_table())
+
+When tracing is disabled (the default) span() returns a shared no-op object, so instrumented code costs one
+function call per span.
+"""
+
+__author__ = "Leo Shen, Dhruba Paul"
+__copyright__ = "Copyright 2022, Canvas Course Mean Project"
+
+import json
+import os
+import threading
+import time
+
+_enabled = False
+_spans = []  # finished spans (list.append is atomic, spans can end on any thread)
+_origin = time.perf_counter_ns()
+
+
+class Span:
+    """
+    A timed phase, with arguments such as the course id or the number of bytes handled
+    """
+    __slots__ = ("name", "category", "args", "start", "end", "thread_id")
+
+    def __init__(self, name, category, args):
+        self.name = name
+        self.category = category
+        self.args = args
+        self.start = self.end = None
+        self.thread_id = threading.get_ident()
+
+    def set(self, **args):
+        """
+        Adds arguments to the span (e.g. bytes once they are known)
+
+        :return: None
+        """
+        self.args.update(args)
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.end = time.perf_counter_ns()
+        if exc_type is not None:
+            self.args["error"] = exc_type.__name__
+        _spans.append(self)
+
+    @property
+    def duration(self):
+        """
+        :return: duration in seconds
+        """
+        return (self.end - self.start) / 1e9
+
+
+class _NullSpan:
+    """
+    Span used when tracing is disabled
+    """
+    __slots__ = ()
+
+    def set(self, **args):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return None
+
+
+_NULL_SPAN = _NullSpan()
+
+
+def span(name, category="app", **args):
+    """
+    Times a phase: use as a context manager
+
+    :param name: name of the phase ("login", "navigation", "fetch", "parse", "compute", "render", ...)
+    :param category: category of the phase (shown by trace viewers)
+    :param args: arguments of the span (course_id, bytes, ...)
+    :return: Span (or a no-op span when tracing is disabled)
+    """
+    if not _enabled:
+        return _NULL_SPAN
+    return Span(name, category, args)
+
+
+def enable():
+    global _enabled
+    _enabled = True
+
+
+def disable():
+    global _enabled
+    _enabled = False
+
+
+def is_enabled():
+    return _enabled
+
+
+def reset():
+    """
+    Forgets every recorded span
+
+    :return: None
+    """
+    del _spans[:]
+
+
+def spans():
+    """
+    :return: list of the recorded spans
+    """
+    return list(_spans)
+
+
+def export_chrome_trace(path):
+    """
+    Writes the recorded spans in the Chrome trace event format
+
+    :param path: path of the JSON file
+    :return: None
+    """
+    events = [{"name": s.name, "cat": s.category, "ph": "X", "ts": (s.start - _origin) / 1000,
+               "dur": (s.end - s.start) / 1000, "pid": os.getpid(), "tid": s.thread_id, "args": s.args}
+              for s in list(_spans)]
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f, default=str)
+
+
+def summary():
+    """
+    Per-phase breakdown of the recorded spans
+
+    :return: dictionary {phase name: {"count", "total", "mean", "max" (seconds), "bytes"}}, in order of first start
+    """
+    phases = {}
+    for s in sorted(_spans, key=lambda s: s.start):
+        phase = phases.setdefault(s.name, {"count": 0, "total": 0.0, "max": 0.0, "bytes": 0})
+        phase["count"] += 1
+        phase["total"] += s.duration
+        phase["max"] = max(phase["max"], s.duration)
+        phase["bytes"] += s.args.get("bytes", 0) or 0
+    for phase in phases.values():
+        phase["mean"] = phase["total"] / phase["count"]
+    return phases
+
+
+def summary_table():
+    """
+    :return: the per-phase breakdown as printable text
+    """
+    lines = [f"{'phase':14} {'count':>6} {'total (s)':>10} {'mean (ms)':>10} {'max (ms)':>10} {'KiB':>9}"]
+    for name, phase in summary().items():
+        lines.append(f"{name:14} {phase['count']:6} {phase['total']:10.3f} {phase['mean'] * 1000:10.1f} "
+                     f"{phase['max'] * 1000:10.1f} {phase['bytes'] / 1024:9.1f}")
+    return "\n".join(lines)